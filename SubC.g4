@@ -129,31 +129,7 @@ functionDefinition
     ;
 
 compoundStatement
-    : '{' loopBlockItems? '}'
-    ;
-
-loopBlockItems
-    : loopBlockItems loopStatement loopBlockItems # loopBothItemsAround
-    | loopBlockItems loopStatement                # loopNoSubsequentItems
-    | loopStatement loopBlockItems                # loopNoPrecedingItems
-    | loopStatement                               # loopNoItemsAround
-    | branchingItems loopBlockItems?              # justLoopBlockItems
-    ;
-
-branchingItems
-    : branchingItems branchingStatement branchingItems # branchingBothItemsAround
-    | branchingItems branchingStatement                # branchingNoSubsequentItems
-    | branchingStatement branchingItems                # branchingNoPrecedingItems
-    | branchingStatement                               # branchingNoItemsAround
-    | funCallItems branchingItems?                     # justBranchingItems
-    ;
-
-funCallItems
-    : funCallItems funCallStatement funCallItems # funCallBothItemsAround
-    | funCallItems funCallStatement              # funCallNoSubsequentItems
-    | funCallStatement funCallItems              # funCallNoPrecedingItems
-    | funCallStatement                           # funCallNoItemsAround
-    | blockItem funCallItems?                    # justFunCallItems
+    : '{' blockItem* '}'
     ;
 
 blockItem
@@ -272,99 +248,28 @@ assignmentOperator
     ;
 
 expression
-    : conditionalExpression
-    ;
-
-conditionalExpression
-    : logicalOrExpression '?' expression ':' conditionalExpression # ternaryExpression
-    | logicalOrExpression # baseConditionalExpression
-    ;
-
-logicalOrExpression
-    : logicalAndExpression '||' logicalOrExpression # disjunctionExpression
-    | logicalAndExpression                          # baseLogicalOrExpression
-    ;
-
-logicalAndExpression
-    : bitwiseExpression '&&' logicalAndExpression # conjuctionExpression
-    | bitwiseExpression                           # baseLogicalAndExpression
-    ;
-
-bitwiseExpression
-    : equalityExpression '|' bitwiseExpression # inclusiveOrExpression
-    | equalityExpression '^' bitwiseExpression # exclusiveOrExpression
-    | equalityExpression '&' bitwiseExpression # andExpression
-    | equalityExpression                       # baseBitwiseExpression
-    ;
-
-equalityExpression
-    : relationalExpression '==' equalityExpression # equalExpression
-    | relationalExpression '!=' equalityExpression # unequalExpression
-    | relationalExpression                         # baseEqualityExpression
-    ;
-
-relationalExpression
-    : shiftExpression '<' relationalExpression  # lessThanExpression
-    | shiftExpression '>' relationalExpression  # greaterThanExpression
-    | shiftExpression '<=' relationalExpression # lessOrEqualsExpression
-    | shiftExpression '>=' relationalExpression # greaterOrEqualsExpression
-    | shiftExpression                           # baseRelationalExpression
-    ;
-
-shiftExpression
-    : additiveExpression '<<' shiftExpression # leftShiftExpression
-    | additiveExpression '>>' shiftExpression # rightShiftExpression
-    | additiveExpression                      # baseShiftExpression
-    ;
-
-additiveExpression
-    : multiplicativeExpression '+' additiveExpression # additionExpression
-    | multiplicativeExpression '-' additiveExpression # subtractionExpression
-    | multiplicativeExpression                        # baseAdditiveExpression
-    ;
-
-multiplicativeExpression
-    : castExpression '*' multiplicativeExpression # multiplyExpression
-    | castExpression '/' multiplicativeExpression # divisionExpression
-    | castExpression '%' multiplicativeExpression # moduloExpression
-    | castExpression                              # baseMultiplicativeExpression
-    ;
-
-castExpression
-    : '(' typeSpecifier ')' castExpression # cast2TypeExpression
-    | unaryExpression                      # baseCastExpression
-    ;
-
-unaryExpression
-    : '&' unaryExpression              # addressOfExpression
-    | '*' unaryExpression              # dereferenceExpression
-    | '+' unaryExpression              # unaryPlusExpression
-    | '-' unaryExpression              # unaryMinusExpression
-    | '~' unaryExpression              # bitwiseNotExpression
-    | '!' unaryExpression              # logicalNotExpression
-    | 'sizeof' '(' unaryExpression ')' # sizeofExpression
-    | postfixExpression                # baseUnaryExpression
-    ;
-
-postfixExpression
-    // | postfixExpression '[' expression ']'               # arrayIndexingExpression
-    // | postfixExpression '.' Identifier                   # memberAccessExpression
-    // | postfixExpression '->' Identifier                  # memberAccessFromPointerExpression
-    : postfixExpression '++' # postIncrementExpression
-    | postfixExpression '--' # postDecrementExpression
-    | functionCall           # functionCallExpression
-    | parenthesisExpression  # basePostfixExpression
+    : expression op=('++' | '--')                               # postfixExpression
+    | functionCall                                              # functionCallExpression
+    | '(' expression ')'                                        # parenthesisExpression
+    | primaryExpression                                         # baseExpression
+    | 'sizeof' '(' expression ')'                               # sizeofExpression
+    | '(' typeSpecifier ')' expression                          # cast2TypeExpression
+    | op=('&' | '*' | '+' | '-' | '~' | '!') expression         # unaryExpression
+    | expression op=('*' | '/' | '%') expression                # multiplicativeExpression
+    | expression op=('+' | '-') expression                      # additiveExpression
+    | expression op=('<<' | '>>') expression                    # shiftExpression
+    | expression op=('<' | '>' | '<=' | '>=') expression        # relationalExpression
+    | expression op=('==' | '!=') expression                    # equalityExpression
+    | expression op=('|' | '^' | '&') expression                # bitwiseExpression
+    | expression op='&&' expression                             # logicalAndExpression
+    | expression op='||' expression                             # logicalOrExpression
+    | <assoc=right> expression '?' expression ':' expression    # ternaryExpression
     ;
 
 functionCall
     : Identifier '(' (expression (',' expression)*)? ')'
     ;
 
-parenthesisExpression
-    : '(' expression ')'
-    | primaryExpression
-    ;
-
 primaryExpression
     : Identifier     # primaryExprIdentifier
     | Constant       # primaryExprConstant
@@ -1,30 +1,186 @@
 #!/usr/bin/env python3
+import io
+import os
 import sys
+import time
 import argparse
 import pathlib
-from typing import Optional
+import functools
+import itertools
+import traceback
+import contextlib
+import concurrent.futures
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Optional, \
+    TextIO
 
-from translator import Translator
+from predictions import PREDICTIONS, SLL_THEN_LL
 from lut import LookUpTable
+from optimizations import IO_FUNCTIONS, Optimizations
+from cache import Artifacts, DiskCache, default_cache_dir, tool_version
+from server import Message, Server, default_socket, failure, listening, \
+    request
+
+if TYPE_CHECKING:
+    from translator import Translator
+    from callgraph import CallGraph
+
+
+# path standing for stdin or stdout
+STDIO = pathlib.Path('-')
+
+# the snapshot of the parser DFA, loaded along with the parser, if any
+SNAPSHOT: Optional[pathlib.Path] = None
+_snapshot_states: Optional[int] = None # once loaded
+
+
+def load_translator() -> type['Translator']:
+    # The parser is loaded by the first translation only, so help, argument
+    # errors and outputs found among the artifacts don't wait for it.
+    global _snapshot_states
+    from translator import Translator
+    if SNAPSHOT is not None and _snapshot_states is None:
+        import dfa
+        _snapshot_states = dfa.preload(SNAPSHOT)
+    return Translator
+
+
+def update_snapshot():
+    if SNAPSHOT is not None and _snapshot_states is not None:
+        import dfa
+        dfa.update(SNAPSHOT, _snapshot_states)
+
+
+def with_table(optimizations: Optimizations,
+               lut: LookUpTable) -> Optimizations:
+    # the LUT may unroll the loops of some functions, the functions it
+    # substitutes are taken for ones doing I/O
+    unrolls = lut.unrolls()
+    if unrolls:
+        optimizations = optimizations._replace(
+            unrolled=tuple(sorted(unrolls.items())))
+    if optimizations.havoc and lut.substitutes():
+        optimizations = optimizations._replace(io=tuple(sorted(
+            set(optimizations.io) | lut.substitutes().keys())))
+    return optimizations
 
 
 class SubC2PV:
-    def __init__(self, translator: Translator, lut: LookUpTable):
+    def __init__(self, translator: Optional['Translator'], lut: LookUpTable):
         self.translator = translator
         self.lut = lut
+        self.pruned: list[str] = []
 
     def extract(self) -> str:
         return self.lut.apply_rules(self.translator.translate())
 
     @classmethod
-    def from_path(cls, implementation: pathlib.Path, table: pathlib.Path):
+    def from_path(cls, implementation: pathlib.Path, table: pathlib.Path,
+                  prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                  cache: Optional[DiskCache] = None, workers: int = 1,
+                  optimizations: Optimizations = Optimizations()):
         lut = LookUpTable.from_path(table)
         path = implementation if lut.file() is None else lut.file()
-        return cls(Translator.from_path(path), lut)
+        optimizations = with_table(optimizations, lut)
+        Translator = load_translator()
+        translated = Translator.from_stdin(prediction=prediction,
+                                           low_memory=low_memory,
+                                           cache=cache, workers=workers,
+                                           optimizations=optimizations) \
+            if path == STDIO else Translator.from_path(
+                path, prediction=prediction, low_memory=low_memory,
+                cache=cache, workers=workers, optimizations=optimizations)
+        subc2pv = cls(translated, lut)
+        subc2pv.select_reachable(translated.call_graph())
+        return subc2pv
+
+    def prune(self, graph: 'CallGraph') -> set[str]:
+        # the extracted functions need the ones they call, the others are
+        # never emitted
+        from callgraph import reachable
+        extracts = reachable(graph, self.lut.extracts(),
+                             self.lut.substitutes())
+        self.lut.add_extracts(extracts)
+        self.pruned = [name for name in graph if name not in extracts
+                       and self.lut.substitute(name) is None]
+        return extracts
+
+    def select_reachable(self, graph: 'CallGraph') -> set[str]:
+        # bodies of the functions never emitted are skipped
+        extracts = self.prune(graph)
+        self.translator.select(extracts)
+        return extracts
+
+    def report(self) -> str:
+        return f'pruned {len(self.pruned)} function(s) not reachable from' \
+            ' the extracted ones: ' + ', '.join(self.pruned)
+
+    def extract_to(self, out: TextIO):
+        # only the extracted functions are kept and not in memory
+        from model import SpooledFunctions
+        with SpooledFunctions(self.lut.extract) as functions:
+            self.lut.write_rules(self.translator.translate(functions), out)
 
     def extract_to_path(self, path: pathlib.Path):
+        if path == STDIO:
+            self.extract_to(sys.stdout)
+            return
         with open(path, 'w', encoding='utf-8') as out:
-            out.write(self.extract())
+            self.extract_to(out)
+
+    @classmethod
+    def extract_with_artifacts(cls, implementation: pathlib.Path,
+                               table: pathlib.Path, output: pathlib.Path,
+                               artifacts: Artifacts,
+                               prediction: str = SLL_THEN_LL,
+                               low_memory: bool = False,
+                               cache: Optional[DiskCache] = None,
+                               workers: int = 1,
+                               optimizations: Optimizations = Optimizations()) \
+            -> Optional['SubC2PV']:
+        # Takes the output, or the model at least, from the artifacts if the
+        # same implementation was translated before. Returns the instance
+        # extracting the output, if it isn't found.
+        lut_text = table.read_bytes() if table.is_file() else b''
+        lut = LookUpTable.from_line(lut_text.decode('utf-8'))
+        path = implementation if lut.file() is None else lut.file()
+        # the models differ by the optimizations the LUT sets as well
+        tabled = with_table(optimizations, lut)
+        options = b'' if tabled == optimizations \
+            else repr(tabled).encode('utf-8')
+        optimizations = tabled
+        source = sys.stdin.buffer.read() if path == STDIO \
+            else path.read_bytes()
+        text = artifacts.output(source, lut_text)
+        subc2pv = None
+        if text is None:
+            subc2pv = cls(None, lut)
+
+            def translating() -> 'Translator':
+                # made once the call graph or the model isn't found
+                if subc2pv.translator is None:
+                    subc2pv.translator = load_translator().from_line(
+                        source.decode('utf-8'), prediction=prediction,
+                        low_memory=low_memory, cache=cache, workers=workers,
+                        optimizations=optimizations)
+                return subc2pv.translator
+
+            graph = artifacts.call_graph(source)
+            if graph is None:
+                graph = translating().call_graph()
+                artifacts.put_call_graph(source, graph)
+            extracts = subc2pv.prune(graph)
+            model = artifacts.model(source, extracts, options)
+            if model is None:
+                translating().select(extracts)
+                model = translating().translate()
+                artifacts.put_model(source, extracts, model, options)
+            text = lut.apply_rules(model)
+            artifacts.put_output(source, lut_text, text)
+        if output == STDIO:
+            sys.stdout.write(text)
+        else:
+            output.write_text(text, encoding='utf-8')
+        return subc2pv
 
 
 def args_parser() -> argparse.ArgumentParser:
@@ -32,14 +188,91 @@ def args_parser() -> argparse.ArgumentParser:
 
     # Options:
     p.add_argument('-o', '--output', type=pathlib.Path, metavar='MODEL',
-                   help='Path to output file, default ${input_path/.c/.pv}')
+                   help='Path to output file or - for stdout, default'
+                   ' ${input_path/.c/.pv} (stdout for stdin), for a single'
+                   ' implementation only')
 
     p.add_argument('-l', '--lut', type=pathlib.Path, metavar='LUT',
-                   help='Path to look-up-table, default ${input_path/.c/.lut}')
+                   help='Path to look-up-table, default ${input_path/.c/.lut},'
+                   ' for a single implementation only')
+
+    p.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                   help='Translate N implementations at once, default 1')
+
+    p.add_argument('-p', '--prediction', choices=PREDICTIONS,
+                   default=SLL_THEN_LL,
+                   help='Parser prediction: SLL with fallback to LL (default),'
+                   ' SLL only or LL only')
+
+    p.add_argument('-m', '--low-memory', action='store_true',
+                   help='Parse and translate definitions one by one, releasing'
+                   ' intermediate results as soon as they are consumed')
+
+    p.add_argument('-c', '--cache', type=pathlib.Path, metavar='DIR',
+                   nargs='?', const=default_cache_dir() / 'functions',
+                   help='Reuse translations of unchanged functions kept in'
+                   f' the directory, default {default_cache_dir()}/functions')
+
+    p.add_argument('-a', '--artifacts', type=pathlib.Path, metavar='DIR',
+                   nargs='?', const=default_cache_dir() / 'artifacts',
+                   help='Reuse models and outputs of unchanged implementations'
+                   ' and LUTs kept in the directory, default'
+                   f' {default_cache_dir()}/artifacts')
+
+    p.add_argument('--cache-size', type=int, default=64, metavar='MIB',
+                   help='Size limit of each cache, the least recently used'
+                   ' entries are evicted beyond it, default 64 MiB')
+
+    p.add_argument('-w', '--workers', type=int, default=1, metavar='N',
+                   help='Translate function definitions in N processes,'
+                   ' default 1')
+
+    p.add_argument('--no-daemon', action='store_true',
+                   help='Translate here even if the daemon is running, see'
+                   ' subc2pv serve -h')
+
+    p.add_argument('--snapshot', action='store_true',
+                   help='Load the snapshot of the parser prediction DFA, kept'
+                   ' in the cache directory, and make or update it; off'
+                   ' unless given or SUBC2PV_SNAPSHOT is set')
+
+    p.add_argument('--inline', action='store_true',
+                   help='Inline the temporaries of expressions into the terms'
+                   ' using them, if used once or renaming a name')
+
+    p.add_argument('--fold', action='store_true',
+                   help='Compute the expressions of constants, such as'
+                   ' 4 * 4 + 2, instead of binding every operation')
+
+    p.add_argument('--fold-comments', action='store_true',
+                   help='Fold as --fold does, keeping the C text of the'
+                   ' computed expressions in comments')
+
+    p.add_argument('--sequential-ifs', action='store_true',
+                   help='Translate ifs without loops in their branches to'
+                   ' if c then (P; K) else (Q; K) instead of synchronising'
+                   ' on a channel, large continuations K become macros')
+
+    p.add_argument('--unroll', type=int, default=0, metavar='K',
+                   help='Unroll every loop into K guarded copies of its body'
+                   ' instead of replicating it, default 0: replicate; the'
+                   ' LUT directive %%U <fname> <K> sets K for a function;'
+                   ' the loops --havoc summarises aren\'t unrolled')
+
+    p.add_argument('--havoc', action='store_true',
+                   help='Summarise the loops calling no function doing I/O,'
+                   ' directly or not, by binding the variables they assign'
+                   ' to fresh names; takes precedence over --unroll')
+
+    p.add_argument('--io', action='append', default=[], metavar='FUNC',
+                   help='Take FUNC for a function doing I/O with --havoc,'
+                   f' besides {", ".join(IO_FUNCTIONS)} and the functions'
+                   ' the LUT substitutes; may be repeated')
 
     # Arguments:
-    p.add_argument('file', metavar='IMPL', type=pathlib.Path,
-                   help='Path to implementation')
+    p.add_argument('files', metavar='IMPL', type=pathlib.Path, nargs='+',
+                   help='Path to implementation, directory to translate all'
+                   ' the *.c in, or - for stdin')
     return p
 
 
@@ -47,19 +280,240 @@ def path_or_default(path: Optional[pathlib.Path], default: str) -> pathlib.Path:
     return path or pathlib.Path(default)
 
 
-def main() -> int:
-    args = args_parser().parse_args()
+def implementations(paths: Iterable[pathlib.Path]) -> Iterator[pathlib.Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.rglob('*.c'))
+        else:
+            yield path
 
-    infile: pathlib.Path = args.file
+
+def optimizations_of(args: argparse.Namespace) -> Optimizations:
+    return Optimizations(args.inline, args.fold or args.fold_comments,
+                         args.fold_comments, args.sequential_ifs, args.unroll,
+                         havoc=args.havoc, io=IO_FUNCTIONS + tuple(args.io))
+
+
+def translate(infile: pathlib.Path, output: Optional[pathlib.Path],
+              lut: Optional[pathlib.Path],
+              args: argparse.Namespace) -> Optional[str]:
+    # returns the report of pruned functions, if any
     basename: str = str(infile).removesuffix('.c')
-    outfile: pathlib.Path = path_or_default(args.output, basename + '.pv')
-    lut: pathlib.Path = path_or_default(args.lut, basename + '.lut')
+    outfile: pathlib.Path = path_or_default(output, '-' if infile == STDIO
+                                            else basename + '.pv')
+    lut = path_or_default(lut, basename + '.lut')
+
+    limit = args.cache_size * 2 ** 20
+    cache = None if args.cache is None else DiskCache(args.cache, limit)
+    optimizations = optimizations_of(args)
+    if args.artifacts is None:
+        subc2pv = SubC2PV.from_path(infile, lut, args.prediction,
+                                    args.low_memory, cache, args.workers,
+                                    optimizations)
+        subc2pv.extract_to_path(outfile)
+    else:
+        # outputs and models differ by the optimizations
+        version = tool_version() if optimizations == Optimizations() \
+            else tool_version() + repr(optimizations)
+        subc2pv = SubC2PV.extract_with_artifacts(
+            infile, lut, outfile,
+            Artifacts(DiskCache(args.artifacts, limit, version)),
+            args.prediction, args.low_memory, cache, args.workers,
+            optimizations)
+    return subc2pv.report() if subc2pv and subc2pv.pruned else None
+
+
+Result = NamedTuple('Result', path=pathlib.Path, error=Optional[str],
+                    seconds=float, report=Optional[str])
+
+
+def translate_one_of_many(infile: pathlib.Path,
+                          args: argparse.Namespace) -> Result:
+    # run in the long-lived processes of the pool, where the parser stays warm
+    start = time.perf_counter()
+    report, error = None, None
+    try:
+        report = translate(infile, None, None, args)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    return Result(infile, error, time.perf_counter() - start, report)
+
+
+def translate_many(files: list[pathlib.Path], args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(args.jobs) if args.jobs > 1 \
+            else contextlib.nullcontext() as pool:
+        results = (map if pool is None else pool.map)(
+            translate_one_of_many, files, itertools.repeat(args))
+        for result in results:
+            status = 'ok' if result.error is None else 'failed'
+            details = '' if result.error is None else ': ' + result.error
+            print(f'{status:<6} {result.seconds:>8.2f}s  {result.path}{details}',
+                  file=sys.stderr)
+            if result.report is not None:
+                print(f'{"":<17}{result.report}', file=sys.stderr)
+            failed += result.error is not None
+    print(f'{len(files)} implementation(s): {len(files) - failed} translated,'
+          f' {failed} failed in {time.perf_counter() - start:.2f}s',
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+def single(args: argparse.Namespace) -> bool:
+    return len(args.files) == 1 and not args.files[0].is_dir()
+
+
+def run(args: argparse.Namespace) -> int:
+    if single(args):
+        report = translate(args.files[0], args.output, args.lut, args)
+        if report is not None:
+            print(report, file=sys.stderr)
+        return 0
+    return translate_many(list(implementations(args.files)), args)
+
+
+# arguments holding paths, which are sent to the daemon as strings
+PATH_ARGS = ('files', 'output', 'lut', 'cache', 'artifacts')
+# arguments an inline source may be translated with
+OPTIMIZATION_ARGS = ('inline', 'fold', 'fold_comments', 'sequential_ifs',
+                     'unroll', 'havoc', 'io')
+
 
-    subc2pv = SubC2PV.from_path(infile, lut)
-    subc2pv.extract_to_path(outfile)
+def handle(version: str, message: Message) -> Message:
+    # Handles a request to the daemon: either arguments of subc2pv, with the
+    # working directory and stdin, or an inline source and LUT, with the
+    # optimization arguments by name.
+    if message.get('version') != version:
+        return {'error': 'The daemon runs another version of subc2pv.'}
+    if 'source' in message:
+        options = message.get('optimizations', {})
+        unknown = set(options) - set(OPTIMIZATION_ARGS)
+        if unknown:
+            return {'error': 'Unknown optimizations: '
+                    + ', '.join(sorted(unknown))}
+        args = args_parser().parse_args(['-'])
+        for key, value in options.items():
+            setattr(args, key, value)
+        try:
+            lut = LookUpTable.from_line(message['lut'])
+            translated = load_translator().from_line(
+                message['source'],
+                optimizations=with_table(optimizations_of(args), lut))
+            subc2pv = SubC2PV(translated, lut)
+            subc2pv.select_reachable(translated.call_graph())
+            return {'output': subc2pv.extract(),
+                    'report': subc2pv.report() if subc2pv.pruned else None}
+        except Exception as e:
+            return failure(e)
+
+    args = argparse.Namespace(**message['args'])
+    for key in PATH_ARGS:
+        value = getattr(args, key)
+        if isinstance(value, list):
+            setattr(args, key, list(map(pathlib.Path, value)))
+        elif value is not None:
+            setattr(args, key, pathlib.Path(value))
+    stdout, stderr = io.StringIO(), io.StringIO()
+    stdin = sys.stdin
+    sys.stdin = io.TextIOWrapper(io.BytesIO(message['stdin'].encode('utf-8')),
+                                 encoding='utf-8')
+    try:
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            # a process of the daemon handles a request at a time
+            os.chdir(message['cwd'])
+            status = run(args)
+    except Exception:
+        traceback.print_exc(file=stderr)
+        status = 1
+    finally:
+        sys.stdin = stdin
+    return {'status': status, 'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue()}
+
+
+def snapshot(enabled: bool) -> Optional[pathlib.Path]:
+    # the snapshot is written to the cache directory, so only on demand
+    if enabled or os.environ.get('SUBC2PV_SNAPSHOT'):
+        return default_cache_dir() / 'dfa.pickle'
+    return None
+
+
+def serve_args_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser('subc2pv serve', description='Keep the'
+                                ' translator warm and translate for the'
+                                ' clients of a Unix socket, subc2pv uses it'
+                                ' while it is running')
+
+    p.add_argument('-s', '--socket', type=pathlib.Path,
+                   default=default_socket(), metavar='PATH',
+                   help=f'Path to the socket, default {default_socket()}'
+                   ' (set by SUBC2PV_SOCKET)')
+
+    p.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                   metavar='N', help='Handle N requests at once, default is'
+                   ' the number of processors')
+
+    p.add_argument('--snapshot', action='store_true',
+                   help='Start from the snapshot of the parser prediction DFA'
+                   ' as subc2pv --snapshot does')
+    return p
+
+
+def serve(argv: list[str]) -> int:
+    args = serve_args_parser().parse_args(argv)
+    import dfa
+    handler = functools.partial(handle, tool_version())
+    # the processes of the daemon start with the DFA of this one
+    path = snapshot(args.snapshot)
+    if path is None:
+        dfa.warm_up([dfa.WARM_UP])
+    else:
+        dfa.preload(path)
+    with Server(args.socket, handler, args.jobs) as server:
+        print(f'Serving on {args.socket}', file=sys.stderr)
+        server.serve_forever()
     return 0
 
 
+def main() -> int:
+    if sys.argv[1:2] == ['serve']:
+        return serve(sys.argv[2:])
+
+    p = args_parser()
+    args = p.parse_args()
+    if not single(args):
+        if args.output is not None or args.lut is not None:
+            p.error('-o/--output and -l/--lut take a single implementation')
+        if STDIO in args.files:
+            p.error('- is for a single implementation only')
+
+    socket = default_socket()
+    if not args.no_daemon and listening(socket):
+        stdin = sys.stdin.buffer.read() if STDIO in args.files else b''
+        reply = request(socket, {
+            'version': tool_version(), 'cwd': os.getcwd(), 'stdin':
+            stdin.decode('utf-8'), 'args': {
+                key: list(map(str, value)) if isinstance(value, list)
+                else str(value) if isinstance(value, pathlib.Path) else value
+                for key, value in vars(args).items()}})
+        if reply is not None and 'status' in reply:
+            sys.stdout.write(reply.get('stdout', ''))
+            sys.stderr.write(reply.get('stderr', ''))
+            if 'error' in reply:
+                print(f'subc2pv: the daemon failed: {reply["error"]}',
+                      file=sys.stderr)
+            return reply['status']
+        # translate here, stdin is already read
+        sys.stdin = io.TextIOWrapper(io.BytesIO(stdin), encoding='utf-8')
+    global SNAPSHOT
+    SNAPSHOT = snapshot(args.snapshot)
+    status = run(args)
+    update_snapshot()
+    return status
+
+
 if __name__ == '__main__':
     try:
         sys.exit(main())
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-from typing import Tuple, Iterable
+from typing import Tuple
 
+from lines import Lines
+from processes import Goto, In, Out, sequenced
 from auxilaries.LoopTranslator import LoopTranslator, \
     LoopsStatementsContexts
 
@@ -10,23 +12,27 @@ class DoWhileLoopTranslator(LoopTranslator):
     def _counters(cls, listener) -> Tuple[str, str, str, str]:
         return tuple(listener._dowhiles.next())
 
+    @classmethod
+    def _unrolled(cls, ctx: LoopsStatementsContexts, listener, bound: int,
+                  subsequent: list[str]) -> Lines:
+        # the first iteration runs unconditionally, the guarded copies bind
+        # temporaries of their own
+        statement = listener._tree.get(ctx.statement(), [])
+        prelude = listener._tree.get(ctx.expression(), [])
+        return sequenced(statement, cls._guarded(
+            prelude, listener._exprs.pop(), statement, bound - 1, subsequent,
+            listener, True))
+
     @classmethod
     def _loop_body(cls, ctx: LoopsStatementsContexts, listener, begin: str,
-                   end: str, cond: str, var: str) -> Iterable[str]:
-        enter = listener.GOTO_TMPLT.format(begin)
-        exit = listener.GOTO_TMPLT.format(end)
-        body = listener._tree.get(ctx.statement(), [])
+                   end: str, cond: str, var: str) -> Tuple[Lines, Lines, Lines]:
+        statement = listener._tree.get(ctx.statement(), [])
         tvar0 = listener._tvars.next()
         tvar1 = listener._tvars.next()
-        update_cond: list[str] = listener._tree.get(ctx.expression(), [])
-        update_cond.append('out({}, {})'.format(cond, listener._exprs.pop()))
+        update_cond = listener._tree.get(ctx.expression(), [])
+        update_cond.append(Out(cond, listener._exprs.pop()))
 
-        lines = [
-            f'out({cond}, true))',
-            f'| !(in({cond}, {var}: bool); if {var} then {enter} else {exit})',
-            f'| !(in({begin}, {tvar0}: bool);'
-        ]
-        lines.extend(body)
-        lines.extend(update_cond)
-        lines.extend([')', f'| (in({end}, {tvar1}: bool);'])
-        return lines
+        body = Lines([In(begin, tvar0)])
+        body.extend(statement)
+        return Lines([Goto(cond)]), sequenced(body, update_cond), \
+            Lines([In(end, tvar1)])
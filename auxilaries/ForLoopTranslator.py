@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-from typing import Tuple, Iterable
+from typing import Tuple
 
+from lines import Lines
+from processes import In, Out, sequenced
 from auxilaries.LoopTranslator import LoopTranslator, \
     LoopsStatementsContexts
 
@@ -10,11 +12,28 @@ class ForLoopTranslator(LoopTranslator):
     def _counters(cls, listener) -> Tuple[str, str, str, str]:
         return tuple(listener._fors.next())
 
+    @classmethod
+    def _unrolled(cls, ctx: LoopsStatementsContexts, listener, bound: int,
+                  subsequent: list[str]) -> Lines:
+        iter_ctx = ctx.assignmentExpression()
+        update_iter = listener._tree.get(iter_ctx, [])
+        if iter_ctx is not None:
+            listener._exprs.pop()
+        cond_ctx = ctx.expression()
+        prelude, cond = (Lines(), 'true') if cond_ctx is None \
+            else (listener._tree.get(cond_ctx, []), listener._exprs.pop())
+
+        lines = Lines()
+        lines.extend(listener._tree.get(ctx.variableDeclaration()
+                                        or ctx.assignmentStatement(), []))
+        lines.extend(cls._guarded(prelude, cond, sequenced(
+            listener._tree.get(ctx.statement(), []), update_iter), bound,
+            subsequent, listener))
+        return lines
+
     @classmethod
     def _loop_body(cls, ctx: LoopsStatementsContexts, listener, begin: str,
-                   end: str, cond: str, var: str) -> Iterable[str]:
-        enter = listener.GOTO_TMPLT.format(begin)
-        exit = listener.GOTO_TMPLT.format(end)
+                   end: str, cond: str, var: str) -> Tuple[Lines, Lines, Lines]:
         tvar0 = listener._tvars.next()
         tvar1 = listener._tvars.next()
 
@@ -28,18 +47,14 @@ class ForLoopTranslator(LoopTranslator):
         cond_ctx = ctx.expression()
         update_cond, cond_expr = ([], 'true') if cond_ctx is None \
             else (listener._tree.get(cond_ctx, []), listener._exprs.pop())
-        update_cond.append('out({}, {})'.format(cond, cond_expr))
-
-        lines: list[str] = listener._tree.get(ctx.variableDeclaration() \
-                                              or ctx.assignmentStatement(), [])
-        lines.extend(update_cond)
-        lines.extend([
-            ')',
-            f'| !(in({cond}, {var}: bool); if {var} then {enter} else {exit})',
-            f'| !(in({begin}, {tvar0}: bool);'
-        ])
-        lines.extend(listener._tree.get(ctx.statement(), []))
-        lines.extend(update_iter)
-        lines.extend(update_cond)
-        lines.extend([')', f'| (in({end}, {tvar1}: bool);'])
-        return lines
+        update_cond.append(Out(cond, cond_expr))
+
+        start = Lines()
+        start.extend(listener._tree.get(ctx.variableDeclaration()
+                                        or ctx.assignmentStatement(), []))
+        start.extend(update_cond)
+
+        body = Lines([In(begin, tvar0)])
+        body.extend(listener._tree.get(ctx.statement(), []))
+        return start, sequenced(body, Lines([update_iter, update_cond])), \
+            Lines([In(end, tvar1)])
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 from abc import ABC, abstractmethod
-from typing import Optional, Union, Tuple, Iterable
+from typing import Collection, Iterable, Optional, Union, Tuple
 
+from lines import Lines
+from optimizations import Renaming, temporaries
+from processes import Bang, Comment, Continue, If, In, Jump, New, Par, Term, \
+    sequenced
 from libs.SubCParser import SubCParser
 
 
@@ -10,26 +14,122 @@ LoopsStatementsContexts = Union[SubCParser.WhileStatementContext,
                                 SubCParser.ForStatementContext]
 
 
+def assigned(ctx: LoopsStatementsContexts,
+             io: Collection[str]) -> Optional[list[str]]:
+    # the variables assigned in the loop and declared before it, None if it
+    # calls a function doing I/O
+    names: dict[str, None] = {}
+    declared = set()
+    stack = [ctx]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, SubCParser.FunctionCallContext):
+            if str(node.Identifier()) in io:
+                return None
+        elif isinstance(node, SubCParser.AssignmentExpressionContext):
+            names[str(node.Identifier())] = None
+        elif isinstance(node, SubCParser.VariableDeclarationContext):
+            declared.add(str(node.Identifier()))
+        stack.extend(reversed(getattr(node, 'children', None) or []))
+    return [name for name in names if name not in declared]
+
+
 class LoopTranslator(ABC):
     @classmethod
     def translate(cls, preceding: list[str],
                   ctx: LoopsStatementsContexts,
                   subsequent: list[str],
-                  listener) -> list[str]:
+                  listener) -> Lines:
+        if listener._optimizations.havoc:
+            summary = cls._summary(ctx, listener)
+            if summary is not None:
+                lines = Lines(preceding)
+                lines.extend(summary)
+                lines.extend(subsequent)
+                return lines
+        if listener._unroll > 0:
+            return cls._unroll(preceding, ctx, subsequent, listener,
+                               listener._unroll)
         begin, end, cond, var = cls._counters(listener)
 
-        lines = [
-            listener.NEW_VAR_TMPLT.format(begin, 'channel'),
-            listener.NEW_VAR_TMPLT.format(end, 'channel'),
-            listener.NEW_VAR_TMPLT.format(cond, 'channel'),
-            '((',
-        ]
+        start, body, exit = cls._loop_body(ctx, listener, begin, end, cond,
+                                           var)
+        first = Lines()
+        first.extend(preceding)
+        first.extend(start)
+        exit.extend(subsequent)
+        return Lines([
+            New(begin, 'channel'),
+            New(end, 'channel'),
+            New(cond, 'channel'),
+            Par([first,
+                 Bang([In(cond, var), Jump(var, begin, end)]),
+                 Bang(body),
+                 exit])
+        ])
+
+    @classmethod
+    def _unroll(cls, preceding: list[str], ctx: LoopsStatementsContexts,
+                subsequent: list[str], listener, bound: int) -> Lines:
+        # no more than bound iterations, the loop is left after the last one
+        lines = Lines([Comment(f'loop unrolled, bound {bound}')])
         lines.extend(preceding)
-        lines.extend(cls._loop_body(ctx, listener, begin, end, cond, var))
-        lines.extend(subsequent)
-        lines.append('))')
+        lines.extend(cls._unrolled(ctx, listener, bound, subsequent))
         return lines
 
+    @staticmethod
+    def _summary(ctx: LoopsStatementsContexts, listener) -> Optional[Lines]:
+        # a loop doing no I/O binds the variables it assigns to fresh names,
+        # None if it does I/O or assigns a variable of unknown type
+        names = assigned(ctx, listener._optimizations.io)
+        if names is None \
+                or any(name not in listener._variables for name in names):
+            return None
+        # the condition and the update are not used
+        for child in ctx.getChildren():
+            if isinstance(child, (SubCParser.ExpressionContext,
+                                  SubCParser.AssignmentExpressionContext)):
+                listener._exprs.pop()
+        comment = 'loop summarised' if not names \
+            else 'loop summarised, havoc ' + ', '.join(names)
+        lines = Lines([Comment(comment)])
+        lines.extend(New(name, listener._variables[name]) for name in names)
+        return lines
+
+    @staticmethod
+    def _fresh(listener, *processes: Iterable) -> Renaming:
+        # a copy of the processes binds temporaries of its own
+        return Renaming({name: listener._tvars.next()
+                         for name in temporaries(*processes)})
+
+    @classmethod
+    def _guarded(cls, prelude: Lines, cond: Term, iteration: Lines,
+                 copies: int, subsequent: list[str], listener,
+                 fresh_first: bool = False) -> Lines:
+        # copies of the iteration, each one run if the condition holds; the
+        # copies after the first one are renamed apart
+        if not copies:
+            return Lines([subsequent])
+        renamings = [cls._fresh(listener, prelude, iteration)
+                     if i or fresh_first else None for i in range(copies)]
+        end = [Continue(subsequent)]
+        loop = Lines(end)
+        for renaming in reversed(renamings):
+            if renaming is None:
+                loop = Lines([prelude, If(cond, sequenced(iteration, loop),
+                                          end)])
+                continue
+            loop = Lines([renaming.process(prelude),
+                          If(renaming.term(cond), sequenced(
+                              renaming.process(iteration), loop), end)])
+        return loop
+
+    @classmethod
+    @abstractmethod
+    def _unrolled(cls, ctx: LoopsStatementsContexts, listener, bound: int,
+                  subsequent: list[str]) -> Lines:
+        raise NotImplementedError
+
     @classmethod
     @abstractmethod
     def _counters(cls, listener) -> Tuple[str, str, str, str]:
@@ -38,5 +138,6 @@ class LoopTranslator(ABC):
     @classmethod
     @abstractmethod
     def _loop_body(cls, ctx: LoopsStatementsContexts, listener, begin: str,
-                   end: str, cond: str, var: str) -> Iterable[str]:
+                   end: str, cond: str, var: str) -> Tuple[Lines, Lines, Lines]:
+        # (entering the loop, iteration, leaving the loop)
         raise NotImplementedError
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# Time to translate many implementations by a subc2pv process per file and by
+# a single batch run:
+#   python3 -m benchmarks.batch -n 20 -j 1 2
+import sys
+import time
+import pathlib
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.sources import wide_source
+
+
+PACKAGE = pathlib.Path(__file__).parent.parent
+
+
+def run_time(*args: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(PACKAGE), *args], check=True,
+                   stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-n', '--implementations', type=int, default=20)
+    argparser.add_argument('-f', '--functions', type=int, default=2)
+    argparser.add_argument('-s', '--statements', type=int, default=5)
+    argparser.add_argument('-j', '--jobs', type=int, nargs='+', default=[1, 2])
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for i in range(args.implementations):
+            path = pathlib.Path(directory) / f'impl{i}.c'
+            path.write_text(wide_source(args.functions, args.statements))
+            path.with_suffix('.lut').write_text('%X foo0\n')
+            files.append(str(path))
+        print(f'{"mode":>10} {"time":>10}')
+        separate = sum(run_time(path) for path in files)
+        print(f'{"separate":>10} {separate:>9.2f}s')
+        for jobs in args.jobs:
+            print(f'{"-j " + str(jobs):>10}'
+                  f' {run_time("-j", str(jobs), directory):>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
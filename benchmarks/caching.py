@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# Translation time of a file of many functions without the cache, with a cold
+# one, and with a warm one after a single function was edited:
+#   python3 -m benchmarks.caching
+import time
+import pathlib
+import argparse
+import tempfile
+from typing import Optional
+
+import antlr4
+
+from translator import Translator
+from cache import DiskCache
+from benchmarks.sources import wide_source
+
+
+def translate_time(source: str, cache: Optional[DiskCache]) -> float:
+    start = time.perf_counter()
+    Translator(antlr4.InputStream(source), cache=cache).translate()
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, default=160)
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    args = argparser.parse_args()
+
+    source = wide_source(args.functions, args.statements)
+    edited = source.replace('bar0(a, b);', 'bar0(b, a);')
+    # warm up the shared parser caches
+    Translator(antlr4.InputStream(wide_source(1, args.statements))).translate()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(pathlib.Path(directory))
+        print(f'{"cache":>10} {"time":>10}')
+        print(f'{"none":>10} {translate_time(source, None):>9.2f}s')
+        print(f'{"cold":>10} {translate_time(source, cache):>9.2f}s')
+        print(f'{"warm":>10} {translate_time(edited, cache):>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
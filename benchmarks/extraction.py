@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Peak traced memory of extracting all functions of a low-memory translation
+# joined into a string and written out through spooled functions:
+#   python3 -m benchmarks.extraction
+import os
+import argparse
+import tracemalloc
+from typing import Callable
+
+import antlr4
+
+from translator import Translator
+from lut import LookUpTable
+from model import SpooledFunctions
+from benchmarks.sources import wide_source
+
+
+def peak(extract: Callable[[Translator], None], source: str) -> int:
+    # the input stream holds the whole source anyway, leave it out
+    translator = Translator(antlr4.InputStream(source), low_memory=True)
+    tracemalloc.start()
+    extract(translator)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, nargs='+',
+                           default=[10, 40, 160])
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    args = argparser.parse_args()
+
+    # warm up the shared parser caches so they are not traced
+    Translator(antlr4.InputStream(wide_source(1, args.statements))).translate()
+    print(f'{"functions":>10} {"string":>12} {"streamed":>12}')
+    for functions in args.functions:
+        source = wide_source(functions, args.statements)
+        lut = LookUpTable.from_lines([f'%X foo{i}' for i in range(functions)])
+
+        def to_string(translator: Translator):
+            with open(os.devnull, 'w') as out:
+                out.write(lut.apply_rules(translator.translate()))
+
+        def streamed(translator: Translator):
+            with open(os.devnull, 'w') as out, \
+                    SpooledFunctions(lut.extract) as spool:
+                lut.write_rules(translator.translate(spool), out)
+
+        print(f'{functions:>10} {peak(to_string, source) / 2**20:>10.1f}MB'
+              f' {peak(streamed, source) / 2**20:>10.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
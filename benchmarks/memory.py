@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Peak traced memory of a translation in the default and the low-memory
+# mode, the latter after the call graph too as subc2pv does, for files of a
+# growing number of same-sized functions:
+#   python3 -m benchmarks.memory
+import argparse
+import tracemalloc
+
+import antlr4
+
+from translator import Translator
+from benchmarks.sources import wide_source
+
+
+def peak(source: str, low_memory: bool, graph: bool = False) -> int:
+    translator = Translator(antlr4.InputStream(source), low_memory=low_memory)
+    tracemalloc.start()
+    if graph:
+        # the tokens lexed for the call graph are kept for the translation
+        translator.call_graph()
+    translator.translate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, nargs='+',
+                           default=[1, 10, 40, 160])
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    args = argparser.parse_args()
+
+    # warm up the shared parser caches so they are not traced
+    Translator(antlr4.InputStream(wide_source(1, args.statements))).translate()
+    print(f'{"functions":>10} {"default":>12} {"low-memory":>12}'
+          f' {"with graph":>12}')
+    for functions in args.functions:
+        source = wide_source(functions, args.statements)
+        print(f'{functions:>10} {peak(source, False) / 2**20:>10.1f}MB'
+              f' {peak(source, True) / 2**20:>10.1f}MB'
+              f' {peak(source, True, True) / 2**20:>10.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Translation time of nested ifs, loops and switches for a growing nesting depth:
+#   python3 -m benchmarks.nesting
+import sys
+import time
+import argparse
+
+import antlr4
+
+from listeners.SubC2PVListener import SubC2PVListener
+from translator import Translator
+from walker import DispatchWalker
+from benchmarks.sources import deep_source, nested_loops_source, \
+    nested_switches_source
+
+
+def translate_time(source: str) -> float:
+    tree = Translator(antlr4.InputStream(source))._parse()
+    start = time.perf_counter()
+    DispatchWalker().walk(SubC2PVListener(), tree)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-d', '--depths', type=int, nargs='+',
+                           default=[250, 500, 1000, 2000])
+    args = argparser.parse_args()
+
+    # the parser itself is recursive descent
+    sys.setrecursionlimit(max(1000, 10 * max(args.depths)))
+    print(f'{"depth":>6} {"ifs":>10} {"loops":>10} {"switches":>10}')
+    for depth in args.depths:
+        ifs = translate_time(deep_source(depth))
+        loops = translate_time(nested_loops_source(depth))
+        switches = translate_time(nested_switches_source(depth))
+        print(f'{depth:>6} {ifs * 1000:>8.1f}ms {loops * 1000:>8.1f}ms'
+              f' {switches * 1000:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
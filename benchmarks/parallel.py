@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Translation time of a file of many functions by several worker processes:
+#   python3 -m benchmarks.parallel -w 1 2 4
+import os
+import time
+import argparse
+
+import antlr4
+
+from translator import Translator
+from benchmarks.sources import wide_source
+
+
+def translate_time(source: str, workers: int) -> float:
+    start = time.perf_counter()
+    Translator(antlr4.InputStream(source), workers=workers).translate()
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, default=160)
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    argparser.add_argument('-w', '--workers', type=int, nargs='+',
+                           default=[1, 2, os.cpu_count() or 1])
+    args = argparser.parse_args()
+
+    source = wide_source(args.functions, args.statements)
+    # warm up the shared parser caches
+    Translator(antlr4.InputStream(wide_source(1, args.statements))).translate()
+    print(f'{"workers":>10} {"time":>10}')
+    for workers in args.workers:
+        print(f'{workers:>10} {translate_time(source, workers):>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
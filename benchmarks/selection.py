@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Translation time of a file of many functions when all of them or only a few
+# have their bodies translated:
+#   python3 -m benchmarks.selection
+import time
+import argparse
+from typing import Collection, Optional
+
+import antlr4
+
+from translator import Translator
+from benchmarks.sources import wide_source
+
+
+def translate_time(source: str, selected: Optional[Collection[str]]) -> float:
+    start = time.perf_counter()
+    Translator(antlr4.InputStream(source), selected=selected).translate()
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, default=160)
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    argparser.add_argument('-x', '--extracted', type=int, nargs='+',
+                           default=[0, 2, 16])
+    args = argparser.parse_args()
+
+    source = wide_source(args.functions, args.statements)
+    # warm up the shared parser caches
+    Translator(antlr4.InputStream(wide_source(1, args.statements))).translate()
+    print(f'{"extracted":>10} {"time":>10}')
+    print(f'{"all":>10} {translate_time(source, None):>9.2f}s')
+    for extracted in args.extracted:
+        selected = {f'foo{i}' for i in range(extracted)}
+        print(f'{extracted:>10} {translate_time(source, selected):>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
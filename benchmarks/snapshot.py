@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Time of subc2pv processes translating an implementation each, with and
+# without the snapshot of the prediction DFA:
+#   python3 -m benchmarks.snapshot -r 5 examples/*.c
+import os
+import sys
+import time
+import pathlib
+import argparse
+import tempfile
+import subprocess
+
+
+PACKAGE = pathlib.Path(__file__).parent.parent
+
+
+def run_time(env: dict[str, str], files: list[str], *args: str) -> float:
+    start = time.perf_counter()
+    for path in files:
+        subprocess.run([sys.executable, str(PACKAGE), '--no-daemon', *args,
+                        '-o', os.devnull, path],
+                       check=True, stderr=subprocess.DEVNULL, env=env)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-r', '--runs', type=int, default=5)
+    argparser.add_argument('files', nargs='+')
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, XDG_CACHE_HOME=directory)
+        print(f'{"mode":>10} {"time":>10}')
+        cold = min(run_time(env, args.files)
+                   for _ in range(args.runs))
+        print(f'{"cold":>10} {cold:>9.2f}s')
+        making = run_time(env, args.files[:1], '--snapshot')
+        print(f'{"making":>10} {making:>9.2f}s')
+        loaded = min(run_time(env, args.files, '--snapshot')
+                     for _ in range(args.runs))
+        print(f'{"loaded":>10} {loaded:>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# Synthetic SubC sources for the benchmarks
+
+
+def wide_source(functions: int, statements: int) -> str:
+    # many functions with long flat bodies
+    body = '\n'.join(
+        f'    a = (a + {i}) * b - c / {i + 1};\n'
+        f'    if (a > {i}) b = b + 1; else c = c - 1;'
+        for i in range(statements))
+    return '\n'.join(
+        f'void foo{j}(int a, int b, int c)\n{{\n{body}\n    bar{j}(a, b);\n}}'
+        for j in range(functions))
+
+
+def deep_source(depth: int) -> str:
+    # single function with nested ifs
+    return 'void foo(int a)\n{\n' + 'if (a) ' * depth + 'a = 1;\n}'
+
+
+def long_expression_source(terms: int) -> str:
+    # left-leaning expression tree as deep as the number of terms
+    return 'void foo(int a)\n{\n    a = ' \
+        + ' + '.join(map(str, range(terms))) + ';\n}'
+
+
+def nested_loops_source(depth: int) -> str:
+    # single function with nested whiles
+    return 'void foo(int a)\n{\n' + 'while (a) ' * depth + 'a = 1;\n}'
+
+
+def nested_switches_source(depth: int) -> str:
+    # single function with nested single case switches
+    return 'void foo(int a)\n{\n' + 'switch (a) case 1: ' * depth + 'a = 1;\n}'
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# Cold-start latency of subc2pv processes: help, an argument error, outputs
+# and models found among the artifacts and a translation:
+#   python3 -m benchmarks.startup -r 10
+import os
+import sys
+import time
+import pathlib
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.sources import wide_source
+
+
+PACKAGE = pathlib.Path(__file__).parent.parent
+
+
+def run_time(env: dict[str, str], *args: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(PACKAGE), *args], env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-r', '--runs', type=int, default=10)
+    argparser.add_argument('-f', '--functions', type=int, default=2)
+    argparser.add_argument('-s', '--statements', type=int, default=5)
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, XDG_CACHE_HOME=directory)
+        path = pathlib.Path(directory) / 'impl.c'
+        path.write_text(wide_source(args.functions, args.statements))
+        lut = path.with_suffix('.lut')
+        lut.write_text('%X foo0\n')
+        translate = ('--no-daemon', '-a', '-o', os.devnull, str(path))
+        run_time(env, *translate) # fills the artifacts and the snapshot
+
+        def edit_lut():
+            # the model is found, only the LUT is applied
+            lut.write_text(f'%X foo0\n%P (* {time.time_ns()} *)\n')
+            return run_time(env, *translate)
+
+        modes = {
+            'help': lambda: run_time(env, '--help'),
+            'bad args': lambda: run_time(env, '-j'),
+            'output hit': lambda: run_time(env, *translate),
+            'lut edit': edit_lut,
+            'translate': lambda: run_time(env, '--no-daemon', '-o',
+                                          os.devnull, str(path)),
+        }
+        print(f'{"mode":>10} {"time":>10}')
+        for mode, timed in modes.items():
+            best = min(timed() for _ in range(args.runs))
+            print(f'{mode:>10} {best * 1000:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
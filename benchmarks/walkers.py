@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Compares antlr4.ParseTreeWalker with the table driven DispatchWalker on
+# wide and deep trees:
+#   python3 -m benchmarks.walkers
+import timeit
+import argparse
+
+import antlr4
+
+from libs.SubCListener import SubCListener
+from listeners.SubC2PVListener import SubC2PVListener
+from translator import Translator
+from walker import DispatchWalker
+from benchmarks.sources import wide_source, deep_source, \
+    long_expression_source
+
+
+def count_nodes(t) -> int:
+    nodes, stack = 0, [t]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        stack.extend(getattr(node, 'children', None) or [])
+    return nodes
+
+
+def parse(source: str):
+    return Translator(antlr4.InputStream(source))._parse()
+
+
+def bench(walker, listener_cls: type, tree, repeat: int) -> str:
+    try:
+        elapsed = min(timeit.repeat(lambda: walker.walk(listener_cls(), tree),
+                                    number=1, repeat=repeat))
+    except RecursionError:
+        return 'RecursionError'
+    return f'{elapsed * 1000:8.2f} ms, {elapsed / count_nodes(tree) * 1e9:6.0f} ns/node'
+
+
+def report(title: str, tree, listeners: tuple, repeat: int):
+    print(f'{title}: {count_nodes(tree)} nodes')
+    for listener_cls in listeners:
+        for walker in (antlr4.ParseTreeWalker(), DispatchWalker()):
+            print(f'{listener_cls.__name__:>16} {type(walker).__name__:>16}:'
+                  f' {bench(walker, listener_cls, tree, repeat)}')
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-f', '--functions', type=int, default=20)
+    argparser.add_argument('-s', '--statements', type=int, default=50)
+    argparser.add_argument('-d', '--depth', type=int, default=200)
+    argparser.add_argument('-t', '--terms', type=int, default=20000)
+    argparser.add_argument('-r', '--repeat', type=int, default=5)
+    args = argparser.parse_args()
+
+    listeners = (SubCListener, SubC2PVListener)
+    report('wide', parse(wide_source(args.functions, args.statements)),
+           listeners, args.repeat)
+    report('nested ifs', parse(deep_source(args.depth)), listeners,
+           args.repeat)
+    report('long expression', parse(long_expression_source(args.terms)),
+           listeners, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
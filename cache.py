@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import pathlib
+import tempfile
+from typing import TYPE_CHECKING, Collection, Iterable, Optional
+
+# the CLI looks the outputs up without loading the lexer
+if TYPE_CHECKING:
+    from antlr4.Token import Token
+
+    from callgraph import CallGraph
+    from model import Model
+
+
+def tool_version() -> str:
+    # digest of the translator sources, changing any of them drops the cache
+    root = pathlib.Path(__file__).parent
+    digest = hashlib.sha256()
+    for pattern in ('*.py', 'listeners/*.py', 'auxilaries/*.py',
+                    'libs/SubC*.py'):
+        for path in sorted(root.glob(pattern)):
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> pathlib.Path:
+    base = os.environ.get('XDG_CACHE_HOME') or pathlib.Path.home() / '.cache'
+    return pathlib.Path(base) / 'subc2pv'
+
+
+def function_keys(tokens: Iterable['Token'],
+                  version: str) -> dict[str, str]:
+    # a function is keyed by the text of its definition, the text of all the
+    # top-level declarations (the types it may use) and the tool version
+    from lexers import top_level_items
+    declarations = hashlib.sha256(version.encode('utf-8'))
+    definitions: dict[str, str] = {}
+    for function, item in top_level_items(tokens):
+        text = ' '.join(token.text for token in item)
+        if function is None:
+            declarations.update(text.encode('utf-8') + b'\n')
+        else:
+            definitions[function] = text
+    digest = declarations.digest()
+    return {name: hashlib.sha256(digest + text.encode('utf-8')).hexdigest()
+            for name, text in definitions.items()}
+
+
+# On-disk cache of texts, such as translated functions. Once the entries take
+# more than limit bytes, the least recently used ones are evicted.
+class DiskCache:
+    def __init__(self, directory: pathlib.Path, limit: int = 64 * 2 ** 20,
+                 version: Optional[str] = None):
+        self.directory = directory
+        self.limit = limit
+        self.version = tool_version() if version is None else version
+        directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(entry.stat().st_size
+                         for entry in os.scandir(directory) if entry.is_file())
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.directory / key
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        os.utime(path) # recently used
+        return text
+
+    def put(self, key: str, text: str):
+        data = text.encode('utf-8')
+        # written aside and moved, so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.')
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp, self.directory / key)
+        self._size += len(data)
+        if self._size > self.limit:
+            self._evict()
+
+    def _evict(self):
+        entries = sorted((entry for entry in os.scandir(self.directory)
+                          if entry.is_file()),
+                         key=lambda entry: entry.stat().st_mtime)
+        self._size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._size <= self.limit:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+# Content-addressed outputs of the translator. The output is kept by the
+# implementation and the LUT; the model by the implementation, the functions
+# whose bodies were translated and the options the LUT sets, so editing a LUT
+# doesn't always need a translation; the call graph, which the selection
+# comes from, by the implementation.
+class Artifacts:
+    def __init__(self, cache: DiskCache):
+        self._cache = cache
+
+    def _key(self, kind: str, *parts: bytes) -> str:
+        digest = hashlib.sha256(self._cache.version.encode('utf-8'))
+        digest.update(kind.encode('utf-8'))
+        for part in parts:
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def output(self, source: bytes, table: bytes) -> Optional[str]:
+        return self._cache.get(self._key('output', source, table))
+
+    def put_output(self, source: bytes, table: bytes, text: str):
+        self._cache.put(self._key('output', source, table), text)
+
+    def call_graph(self, source: bytes) -> Optional['CallGraph']:
+        text = self._cache.get(self._key('graph', source))
+        return None if text is None else {
+            name: set(callees) for name, callees in json.loads(text).items()}
+
+    def put_call_graph(self, source: bytes, graph: 'CallGraph'):
+        self._cache.put(self._key('graph', source), json.dumps(
+            {name: sorted(callees) for name, callees in graph.items()}))
+
+    def _model_key(self, source: bytes, selected: Collection[str],
+                   options: bytes) -> str:
+        parts = [source, '\n'.join(sorted(selected)).encode('utf-8')]
+        if options:
+            parts.append(options)
+        return self._key('model', *parts)
+
+    def model(self, source: bytes, selected: Collection[str],
+              options: bytes = b'') -> Optional['Model']:
+        from model import Model
+        text = self._cache.get(self._model_key(source, selected, options))
+        if text is None:
+            return None
+        model = json.loads(text)
+        return Model(model['preamble'], list(map(tuple, model['functions'])))
+
+    def put_model(self, source: bytes, selected: Collection[str],
+                  model: 'Model', options: bytes = b''):
+        self._cache.put(self._model_key(source, selected, options), json.dumps(
+            {'preamble': model.preamble, 'functions': list(model.functions)}))
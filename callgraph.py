@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from typing import TYPE_CHECKING, Collection, Iterable, Optional
+
+# reachable() is used with call graphs found among the artifacts, without
+# loading the lexer
+if TYPE_CHECKING:
+    from antlr4.Token import Token
+
+
+CallGraph = dict[str, set[str]] # function -> functions called in its body
+
+
+def call_graph(tokens: Iterable['Token']) -> CallGraph:
+    # every identifier followed by '(' inside a body is taken for a call
+    from antlr4.Token import Token
+    from libs.SubCLexer import SubCLexer
+    from lexers import FunctionBodies, LPAREN
+    graph: CallGraph = {}
+    bodies = FunctionBodies()
+    calls: Optional[set[str]] = None
+    previous: Optional['Token'] = None
+    for token in tokens:
+        function = bodies.feed(token)
+        if function is not None:
+            calls = graph.setdefault(function, set())
+        elif not bodies.braces:
+            calls = None
+        elif calls is not None and token.channel == Token.DEFAULT_CHANNEL:
+            if token.type == LPAREN and previous is not None \
+                    and previous.type == SubCLexer.Identifier:
+                calls.add(previous.text)
+            previous = token
+    return graph
+
+
+def reachable(graph: CallGraph, roots: Iterable[str],
+              excluded: Collection[str] = ()) -> set[str]:
+    # excluded functions are neither reached nor followed, unless they are
+    # among the roots
+    seen = set(roots)
+    stack = list(seen)
+    while stack:
+        for callee in graph.get(stack.pop(), ()):
+            if callee not in seen and callee not in excluded:
+                seen.add(callee)
+                stack.append(callee)
+    return seen
+
+
+def callers(graph: CallGraph, callees: Iterable[str]) -> set[str]:
+    # the callees and the functions calling them, directly or not
+    reverse: CallGraph = {}
+    for caller, called in graph.items():
+        for callee in called:
+            reverse.setdefault(callee, set()).add(caller)
+    return reachable(reverse, callees)
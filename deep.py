@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+# The parser is recursive descent, a few frames per nesting level of the
+# statements, so deeply nested code is parsed (and translated) on a thread
+# with a stack and a recursion limit large enough for ~100k levels. The
+# stack is only reserved, the pages are used as the recursion goes.
+STACK_SIZE = 512 * 2**20
+RECURSION_LIMIT = 1_000_000
+
+# the limit is the interpreter's, it's raised while any deep thread runs
+_lock = threading.Lock()
+_running = 0
+_limit = sys.getrecursionlimit()
+
+
+def _after_fork():
+    # a process forked by a deep thread, e.g. a worker of the parallel
+    # translation, may copy the lock held
+    global _lock, _running
+    _lock = threading.Lock()
+    if _running:
+        sys.setrecursionlimit(_limit)
+        _running = 0
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def deeply(func: Callable[..., Any], *args) -> Any:
+    # func(*args) run on a deep thread, its exception raised here
+    global _running, _limit
+    outcome: list[Tuple[Any, Optional[BaseException]]] = []
+
+    def run():
+        try:
+            outcome.append((func(*args), None))
+        except BaseException as e:
+            outcome.append((None, e))
+
+    with _lock:
+        if not _running:
+            _limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(_limit, RECURSION_LIMIT))
+        _running += 1
+    try:
+        with _lock:
+            size = threading.stack_size(STACK_SIZE)
+            try:
+                # a daemon, so an interrupted translation doesn't keep the
+                # process alive
+                thread = threading.Thread(target=run, daemon=True)
+                thread.start()
+            finally:
+                threading.stack_size(size)
+        thread.join()
+    finally:
+        with _lock:
+            _running -= 1
+            if not _running:
+                sys.setrecursionlimit(_limit)
+    result, error = outcome[0]
+    if error is not None:
+        raise error
+    return result
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import io
+import os
+import pickle
+import hashlib
+import pathlib
+import tempfile
+from typing import Any, Iterable
+
+from antlr4 import Recognizer
+from antlr4.PredictionContext import PredictionContext
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.SemanticContext import SemanticContext
+
+from libs.SubCLexer import SubCLexer, serializedATN as lexer_atn
+from libs.SubCParser import SubCParser, serializedATN as parser_atn
+from translator import Translator
+
+
+# The recognizers learn their prediction DFA while parsing, the DFA is shared
+# by every instance in a process. It's snapshotted after a warm-up, loaded at
+# startup and updated with the states learned since, so a short run parses at
+# about the speed of a long one.
+
+RECOGNIZERS = (SubCLexer, SubCParser)
+
+# translated when there is no snapshot, it has most of the constructs
+WARM_UP = '''enum E { A, B = 2 };
+struct S { int x; char *s; };
+union U { int i; long l; };
+int g(int x, char *s);
+void h(void);
+int f(int x, int *p, struct S s)
+{
+    int i = 0;
+    int j;
+    char *c = "text";
+    h();
+    j = (x + 1) * 2 - x / 3 % 4;
+    if (x > 0 && !j || x <= -1) {
+        x = g(x, c);
+    } else if (x == 2) {
+        x = 5;
+    } else {
+        x = ~x << 1 | x >> 2 & 3 ^ 4;
+    }
+    while (x != 0) {
+        x = x - 1;
+    }
+    do {
+        x += 1;
+    } while (x < 10);
+    for (i = 0; i < 4; i += 1) {
+        x = *p + (int) i;
+    }
+    switch (x) {
+    case 1:
+        x = 2;
+    default:
+        x = 3;
+    }
+    p = &x;
+    x = x ? 1 : 0;
+}
+'''
+
+
+def grammar_hash() -> str:
+    # the snapshot is valid for the same grammar and runtime only
+    # the module of the recognizers has the version of the runtime
+    digest = hashlib.sha256(pathlib.Path(Recognizer.__file__).read_bytes())
+    for atn in (lexer_atn(), parser_atn()):
+        digest.update(repr(atn).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# objects of the runtime which are compared by identity and the states of the
+# ATNs, which are the same in every process, are pickled as references
+SINGLETONS = {
+    'empty_context': PredictionContext.EMPTY,
+    'none_predicate': SemanticContext.NONE,
+    'error_state': ATNSimulator.ERROR,
+}
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj: Any) -> Any:
+        if isinstance(obj, ATNState):
+            return ('state', self._recognizer_of(obj), obj.stateNumber)
+        for name, singleton in SINGLETONS.items():
+            if obj is singleton:
+                return name
+        return None
+
+    @staticmethod
+    def _recognizer_of(state: ATNState) -> int:
+        for i, recognizer in enumerate(RECOGNIZERS):
+            if state.atn is recognizer.atn:
+                return i
+        raise ValueError(f'State {state} is not of the grammar.')
+
+
+class _Unpickler(pickle.Unpickler):
+    # only the classes of the runtime are made, a snapshot is no code
+    def find_class(self, module: str, name: str) -> Any:
+        if not module.startswith('antlr4.'):
+            raise pickle.UnpicklingError(f'{module}.{name} is forbidden.')
+        cls = super().find_class(module, name)
+        if not isinstance(cls, type):
+            raise pickle.UnpicklingError(f'{module}.{name} is forbidden.')
+        return cls
+
+    def persistent_load(self, pid: Any) -> Any:
+        if isinstance(pid, tuple):
+            _, recognizer, number = pid
+            return RECOGNIZERS[recognizer].atn.states[number]
+        return SINGLETONS[pid]
+
+
+# the snapshot is the hash of the grammar on a line, then the pickled DFA
+def save(path: pathlib.Path):
+    data = io.BytesIO()
+    data.write(grammar_hash().encode('ascii') + b'\n')
+    _Pickler(data, pickle.HIGHEST_PROTOCOL).dump(
+        [recognizer.decisionsToDFA for recognizer in RECOGNIZERS])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.')
+    with os.fdopen(fd, 'wb') as out:
+        out.write(data.getvalue())
+    os.replace(tmp, path)
+
+
+def load(path: pathlib.Path) -> bool:
+    # must be called before the first recognizer is made, False if there is
+    # no snapshot for the grammar
+    try:
+        with open(path, 'rb') as snapshot:
+            # the body of another grammar or runtime isn't even unpickled
+            if snapshot.readline() != grammar_hash().encode('ascii') + b'\n':
+                return False
+            dfas = _Unpickler(snapshot).load()
+        if not isinstance(dfas, list) or len(dfas) != len(RECOGNIZERS) \
+                or any(not isinstance(dfa, list) for dfa in dfas):
+            return False
+    except Exception:
+        # unreadable, corrupted or made by something else: missing
+        return False
+    for recognizer, dfa in zip(RECOGNIZERS, dfas):
+        recognizer.decisionsToDFA[:] = dfa
+    return True
+
+
+def states() -> int:
+    return sum(len(dfa.states) for recognizer in RECOGNIZERS
+               for dfa in recognizer.decisionsToDFA)
+
+
+def warm_up(sources: Iterable[str]):
+    for source in sources:
+        Translator.from_line(source).translate()
+
+
+def update(path: pathlib.Path, known: int):
+    # saves the DFA if it has more than the known number of states
+    if states() <= known:
+        return
+    try:
+        save(path)
+    except OSError:
+        pass
+
+
+def preload(path: pathlib.Path,
+            sources: Iterable[str] = (WARM_UP,)) -> int:
+    # loads the snapshot, otherwise makes one out of the sources; returns the
+    # number of states in it
+    if not load(path):
+        warm_up(sources)
+        update(path, 0)
+    return states()
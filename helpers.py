@@ -21,3 +21,12 @@ def list_extended(acc: list, iterable: Iterable) -> list:
 
 def shadow_name(name: str, prefix: Optional[str] = DEFAULT_COMMON_PREFIX) -> str:
     return (prefix or DEFAULT_COMMON_PREFIX) + name
+
+
+class ConsumingDict(dict):
+    # every value is released as soon as it is read
+    def __getitem__(self, key):
+        return self.pop(key)
+
+    def get(self, key, default=None):
+        return self.pop(key, default)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+import antlr4
+from antlr4.Token import Token
+
+from libs.SubCLexer import SubCLexer
+
+
+def literal_type(literal: str) -> int:
+    return SubCLexer.literalNames.index(f"'{literal}'")
+
+
+LBRACE, RBRACE = literal_type('{'), literal_type('}')
+LPAREN, RPAREN = literal_type('('), literal_type(')')
+SEMI = literal_type(';')
+
+
+# Finds function bodies among the tokens fed in order: a top-level '{' right
+# after the ')' closing the parameters of an identifier.
+class FunctionBodies:
+    def __init__(self):
+        self.braces = 0
+        self._parens = 0
+        self._previous: Optional[Token] = None
+        self._function: Optional[str] = None # last identifier called at top
+
+    def feed(self, token: Token) -> Optional[str]:
+        # returns the name of the function whose body the token opens
+        if token.channel != Token.DEFAULT_CHANNEL:
+            return None
+        if self.braces:
+            if token.type == LBRACE:
+                self.braces += 1
+            elif token.type == RBRACE:
+                self.braces -= 1
+            return None
+
+        function = None
+        if token.type == LPAREN:
+            if not self._parens:
+                self._function = self._previous.text \
+                    if self._previous is not None \
+                    and self._previous.type == SubCLexer.Identifier else None
+            self._parens += 1
+        elif token.type == RPAREN:
+            self._parens -= 1
+        elif token.type == LBRACE:
+            self.braces += 1
+            if not self._parens and self._previous is not None \
+                    and self._previous.type == RPAREN:
+                function = self._function
+        self._previous = token
+        return function
+
+
+# splits default channel tokens into top-level declarations and definitions,
+# the name is given for function definitions only
+def top_level_items(tokens: Iterable[Token]) \
+        -> Iterator[Tuple[Optional[str], list[Token]]]:
+    bodies = FunctionBodies()
+    function: Optional[str] = None
+    item: list[Token] = []
+    for token in tokens:
+        if token.channel != Token.DEFAULT_CHANNEL or token.type == Token.EOF:
+            continue
+        opened = bodies.feed(token)
+        if opened is not None:
+            function = opened
+        item.append(token)
+        if bodies.braces or (function is None and token.type != SEMI):
+            continue
+        yield function, item
+        function = None
+        item = []
+    if item:
+        yield None, item
+
+
+def lexed(lexer: SubCLexer) -> Iterator[Token]:
+    token = lexer.nextToken()
+    while token.type != Token.EOF:
+        yield token
+        token = lexer.nextToken()
+    yield token
+
+
+# drops the tokens of bodies of the functions which are not selected, up to
+# the closing '}', so they are parsed and translated as empty ones
+def skip_bodies(tokens: Iterable[Token],
+                selected: Callable[[str], bool]) -> Iterator[Token]:
+    bodies = FunctionBodies()
+    tokens = iter(tokens)
+    for token in tokens:
+        yield token
+        function = bodies.feed(token)
+        if function is None or selected(function):
+            continue
+        for token in tokens:
+            bodies.feed(token)
+            if not bodies.braces or token.type == Token.EOF:
+                yield token
+                break
+
+
+class BodiesSkippingLexer(SubCLexer):
+    def __init__(self, input: antlr4.InputStream,
+                 selected: Callable[[str], bool]):
+        super().__init__(input)
+        self._tokens = skip_bodies(self._lexed(), selected)
+
+    def _lexed(self) -> Iterator[Token]:
+        while True:
+            yield super().nextToken()
+
+    def nextToken(self) -> Token:
+        return next(self._tokens)
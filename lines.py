@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+from typing import Any, Iterable, Iterator, Tuple
+
+
+# Buffer of translated lines (or processes). Extending it with another buffer
+# (or list) links that one instead of copying its lines, so nesting
+# constructs costs O(1) per level. Lines are only flattened when iterated,
+# e.g. on join. A linked buffer must not be changed afterwards.
+class Lines:
+    __slots__ = ('_chunks',)
+
+    def __init__(self, lines: Iterable[Any] = ()):
+        self._chunks: list[Any] = list(lines)
+
+    def append(self, line: Any):
+        self._chunks.append(line)
+
+    def extend(self, lines: Iterable[Any]):
+        if isinstance(lines, (Lines, list)):
+            self._chunks.append(lines)
+        else:
+            self._chunks.extend(lines)
+
+    def __iter__(self) -> Iterator[Any]:
+        stack = [iter(self._chunks)]
+        while stack:
+            for chunk in stack[-1]:
+                if not isinstance(chunk, (Lines, list)):
+                    yield chunk
+                    continue
+                stack.append(iter(chunk._chunks if isinstance(chunk, Lines)
+                                  else chunk))
+                break
+            else:
+                stack.pop()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Lines, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f'Lines({list(self)!r})'
+
+
+def split_last(lines: Iterable[Any]) -> Tuple[Lines, Any]:
+    # the buffer without its last line, and the line (None if there are no
+    # lines); only the chunks on the way to the last line are copied
+    path: list[Tuple[list, int]] = []
+    chunks = lines._chunks if isinstance(lines, Lines) else lines
+    i = len(chunks) - 1
+    while True:
+        if i < 0:
+            if not path:
+                return Lines(), None
+            chunks, i = path.pop()
+            i -= 1
+            continue
+        chunk = chunks[i]
+        if isinstance(chunk, (Lines, list)):
+            path.append((chunks, i))
+            chunks = chunk._chunks if isinstance(chunk, Lines) else chunk
+            i = len(chunks) - 1
+            continue
+        rest = Lines(chunks[:i])
+        for outer, j in reversed(path):
+            rest = Lines(outer[:j] + [rest])
+        return rest, chunk
@@ -1,191 +1,174 @@
 #!/usr/bin/env python3
-from typing import Any
+from typing import Any, Callable, Tuple
 
+from optimizations import BINARY_FOLDINGS, constant, fold
+from processes import Call, Let, Name, Term, applied, infix
 from libs.SubCParser import SubCParser
 from listeners.UnaryExpressionsListener import UnaryExpressionsListener
 
 
-class BinaryExpressionsListener(UnaryExpressionsListener):
-    def exitBaseMultiplicativeExpression(self,
-            ctx: SubCParser.BaseMultiplicativeExpressionContext):
-        self._pass_state_to_parent(ctx.castExpression(), ctx)
-        return super().exitBaseMultiplicativeExpression(ctx)
+# operator -> (return type, builder of the term)
+MULTIPLICATIVE_OPERATORS = {
+    '*': ('nat', applied("u'mul")),
+    '/': ('nat', applied("u'div")),
+    '%': ('nat', applied("u'mod")),
+}
+
+ADDITIVE_OPERATORS = {
+    '+': ('nat', infix('+')),
+    '-': ('nat', infix('-')),
+}
+
+SHIFT_OPERATORS = {
+    '<<': ('nat', applied("u'shl")),
+    '>>': ('nat', applied("u'shr")),
+}
+
+RELATIONAL_OPERATORS = {
+    '<':  ('bool', infix('<')),
+    '>':  ('bool', infix('>')),
+    '<=': ('bool', infix('<=')),
+    '>=': ('bool', infix('>=')),
+}
+
+EQUALITY_OPERATORS = {
+    '==': ('bool', infix('=')),
+    '!=': ('bool', infix('<>')),
+}
+
+BITWISE_OPERATORS = {
+    '|': ('nat', applied("u'or")),
+    '^': ('nat', applied("u'xor")),
+    '&': ('nat', applied("u'and")),
+}
 
+LOGICAL_AND_OPERATORS = {'&&': ('bool', infix('&&'))}
+
+LOGICAL_OR_OPERATORS = {'||': ('bool', infix('||'))}
+
+
+class BinaryExpressionsListener(UnaryExpressionsListener):
     def _binary_expr(self, parent: Any, left: Any, right: Any, rtype: str,
-                     tmplt: str):
+                     build: Callable[[Term, Term], Term]):
         rarg, prer = self._exprs.pop(), self._tree.get(right, [])
         larg, prel = self._exprs.pop(), self._tree.get(left, [])
-        # TODO: consider order of prepends
+        # C doesn't sequence the operands, the right one is evaluated first;
+        # folding doesn't depend on it, a folded operand has no lines
         lines = prer
         lines.extend(prel)
 
         target = self._tvars.next()
-        lines.append(self.LET_PAT_TMPLT.format(
-            self.TYPED_VAR_TMPLT.format(target, rtype),
-            tmplt.format(larg, rarg)))
+        lines.append(Let(target, build(larg, rarg), rtype))
         self._tree[parent] = lines
-        self._exprs.append(target)
-
-    def exitModuloExpression(self, ctx: SubCParser.ModuloExpressionContext):
-        self._binary_expr(ctx, ctx.castExpression(),
-                          ctx.multiplicativeExpression(), 'nat', "u'mod({}, {})")
-        return super().exitModuloExpression(ctx)
-
-    def exitDivisionExpression(self, ctx: SubCParser.DivisionExpressionContext):
-        self._binary_expr(ctx, ctx.castExpression(),
-                          ctx.multiplicativeExpression(), 'nat', "u'div({}, {})")
-        return super().exitDivisionExpression(ctx)
-
-    def exitMultiplyExpression(self, ctx: SubCParser.MultiplyExpressionContext):
-        self._binary_expr(ctx, ctx.castExpression(),
-                          ctx.multiplicativeExpression(), 'nat', "u'mul({}, {})")
-        return super().exitMultiplyExpression(ctx)
-
-    def exitBaseAdditiveExpression(self,
-            ctx: SubCParser.BaseAdditiveExpressionContext):
-        self._pass_state_to_parent(ctx.multiplicativeExpression(), ctx)
-        return super().exitBaseAdditiveExpression(ctx)
-
-    def exitSubtractionExpression(self,
-            ctx: SubCParser.SubtractionExpressionContext):
-        self._binary_expr(ctx, ctx.multiplicativeExpression(),
-                          ctx.additiveExpression(), 'nat', '{} - {}')
-        return super().exitSubtractionExpression(ctx)
-
-    def exitAdditionExpression(self, ctx: SubCParser.AdditionExpressionContext):
-        self._binary_expr(ctx, ctx.multiplicativeExpression(),
-                          ctx.additiveExpression(), 'nat', '{} + {}')
-        return super().exitAdditionExpression(ctx)
-
-    def exitBaseShiftExpression(self,
-            ctx: SubCParser.BaseShiftExpressionContext):
-        self._pass_state_to_parent(ctx.additiveExpression(), ctx)
-        return super().exitBaseShiftExpression(ctx)
-
-    def exitRightShiftExpression(self,
-            ctx: SubCParser.RightShiftExpressionContext):
-        self._binary_expr(ctx, ctx.additiveExpression(), ctx.shiftExpression(),
-                          'nat', "u'shr({}, {})")
-        return super().exitRightShiftExpression(ctx)
-
-    def exitLeftShiftExpression(self,
-            ctx: SubCParser.LeftShiftExpressionContext):
-        self._binary_expr(ctx, ctx.additiveExpression(), ctx.shiftExpression(),
-                          'nat', "u'shl({}, {})")
-        return super().exitLeftShiftExpression(ctx)
-
-    def exitBaseRelationalExpression(self,
-            ctx: SubCParser.BaseRelationalExpressionContext):
-        self._pass_state_to_parent(ctx.shiftExpression(), ctx)
-        return super().exitBaseRelationalExpression(ctx)
-
-    def exitGreaterOrEqualsExpression(self,
-            ctx: SubCParser.GreaterOrEqualsExpressionContext):
-        self._binary_expr(ctx, ctx.shiftExpression(),
-                          ctx.relationalExpression(), 'bool', '{} >= {}')
-        return super().exitGreaterOrEqualsExpression(ctx)
-
-    def exitLessOrEqualsExpression(self,
-            ctx: SubCParser.LessOrEqualsExpressionContext):
-        self._binary_expr(ctx, ctx.shiftExpression(),
-                          ctx.relationalExpression(), 'bool', '{} <= {}')
-        return super().exitLessOrEqualsExpression(ctx)
-
-    def exitGreaterThanExpression(self,
-            ctx: SubCParser.GreaterThanExpressionContext):
-        self._binary_expr(ctx, ctx.shiftExpression(),
-                          ctx.relationalExpression(), 'bool', '{} > {}')
-        return super().exitGreaterThanExpression(ctx)
-
-    def exitLessThanExpression(self, ctx: SubCParser.LessThanExpressionContext):
-        self._binary_expr(ctx, ctx.shiftExpression(),
-                          ctx.relationalExpression(), 'bool', '{} < {}')
-        return super().exitLessThanExpression(ctx)
-
-    def exitBaseEqualityExpression(self,
-            ctx: SubCParser.BaseEqualityExpressionContext):
-        self._pass_state_to_parent(ctx.relationalExpression(), ctx)
-        return super().exitBaseEqualityExpression(ctx)
-
-    def exitUnequalExpression(self, ctx: SubCParser.UnequalExpressionContext):
-        self._binary_expr(ctx, ctx.relationalExpression(),
-                          ctx.equalityExpression(), 'bool', '{} <> {}')
-        return super().exitUnequalExpression(ctx)
-
-    def exitEqualExpression(self, ctx: SubCParser.EqualExpressionContext):
-        self._binary_expr(ctx, ctx.relationalExpression(),
-                          ctx.equalityExpression(), 'bool', '{} = {}')
-        return super().exitEqualExpression(ctx)
-
-    def exitBaseBitwiseExpression(self,
-            ctx: SubCParser.BaseBitwiseExpressionContext):
-        self._pass_state_to_parent(ctx.equalityExpression(), ctx)
-        return super().exitBaseBitwiseExpression(ctx)
-
-    def exitAndExpression(self, ctx: SubCParser.AndExpressionContext):
-        self._binary_expr(ctx, ctx.equalityExpression(),
-                          ctx.bitwiseExpression(), 'nat', "u'and({}, {})")
-        return super().exitAndExpression(ctx)
-
-    def exitExclusiveOrExpression(self,
-            ctx: SubCParser.ExclusiveOrExpressionContext):
-        self._binary_expr(ctx, ctx.equalityExpression(),
-                          ctx.bitwiseExpression(), 'nat', "u'xor({}, {})")
-        return super().exitExclusiveOrExpression(ctx)
-
-    def exitInclusiveOrExpression(self,
-            ctx: SubCParser.InclusiveOrExpressionContext):
-        self._binary_expr(ctx, ctx.equalityExpression(),
-                          ctx.bitwiseExpression(), 'nat', "u'or({}, {})")
-        return super().exitInclusiveOrExpression(ctx)
-
-    def exitBaseLogicalAndExpression(self,
-            ctx: SubCParser.BaseLogicalAndExpressionContext):
-        self._pass_state_to_parent(ctx.bitwiseExpression(), ctx)
-        return super().exitBaseLogicalAndExpression(ctx)
-
-    def exitConjuctionExpression(self,
-            ctx: SubCParser.ConjuctionExpressionContext):
-        self._binary_expr(ctx, ctx.bitwiseExpression(),
-                          ctx.logicalAndExpression(), 'bool', '{} && {}')
-        return super().exitConjuctionExpression(ctx)
-
-    def exitBaseLogicalOrExpression(self,
-            ctx: SubCParser.BaseLogicalOrExpressionContext):
-        self._pass_state_to_parent(ctx.logicalAndExpression(), ctx)
-        return super().exitBaseLogicalOrExpression(ctx)
-
-    def exitDisjunctionExpression(self,
-            ctx: SubCParser.DisjunctionExpressionContext):
-        self._binary_expr(ctx, ctx.logicalAndExpression(),
-                          ctx.logicalOrExpression(), 'bool', '{} || {}')
-        return super().exitDisjunctionExpression(ctx)
-
-    def exitBaseConditionalExpression(self,
-            ctx: SubCParser.BaseConditionalExpressionContext):
-        self._pass_state_to_parent(ctx.logicalOrExpression(), ctx)
-        return super().exitBaseConditionalExpression(ctx)
-
-    def exitTernaryExpression(self, ctx):
-        cond = ctx.logicalOrExpression()
-        left = ctx.expression()
-        right = ctx.conditionalExpression()
+        self._exprs.append(Name(target))
+
+    def _fold_chain(self, spine: list) -> list:
+        # The leftmost operands of a chain, as long as they are constants,
+        # are folded as C groups them: to the left. Returns the spine of the
+        # rest of the chain, the folded part is its first operand.
+        nodes = spine[::-1]
+        start = len(self._exprs) - len(nodes) - 1
+        value, folded = constant(self._exprs[start]), 0
+        while value is not None and folded < len(nodes):
+            operand = constant(self._exprs[start + folded + 1])
+            result = None if operand is None else \
+                fold(BINARY_FOLDINGS[nodes[folded].op.text], value, operand)
+            if result is None:
+                break
+            value, folded = result, folded + 1
+        if not folded:
+            return spine
+        node = nodes[folded - 1]
+        self._exprs[start:start + folded + 1] = [self._constant(node, value)]
+        self._tree[node] = []
+        return spine[:len(spine) - folded]
+
+    def _binary_chain(self, ctx: Any,
+                      operators: dict[str, Tuple[str, Callable]]):
+        # Operators of the same precedence are parsed into a left-leaning
+        # chain, but are translated grouped to the right: a - b - c as
+        # a - (b - c). So the whole chain is folded at its topmost node.
+        parent = ctx.parentCtx
+        if isinstance(parent, type(ctx)) and parent.expression(0) is ctx:
+            return
+        spine = [ctx]
+        while isinstance(spine[-1].expression(0), type(ctx)):
+            spine.append(spine[-1].expression(0))
+        if self._optimizations.fold:
+            spine = self._fold_chain(spine)
+            if not spine:
+                return
+
+        right = ctx.expression(1)
+        for i, node in enumerate(spine):
+            left = node.expression(0) if i + 1 == len(spine) \
+                else spine[i + 1].expression(1)
+            target = spine[-1 - i]
+            self._binary_expr(target, left, right, *operators[node.op.text])
+            right = target
+
+    def exitMultiplicativeExpression(self,
+            ctx: SubCParser.MultiplicativeExpressionContext):
+        self._binary_chain(ctx, MULTIPLICATIVE_OPERATORS)
+        return super().exitMultiplicativeExpression(ctx)
+
+    def exitAdditiveExpression(self,
+            ctx: SubCParser.AdditiveExpressionContext):
+        self._binary_chain(ctx, ADDITIVE_OPERATORS)
+        return super().exitAdditiveExpression(ctx)
+
+    def exitShiftExpression(self, ctx: SubCParser.ShiftExpressionContext):
+        self._binary_chain(ctx, SHIFT_OPERATORS)
+        return super().exitShiftExpression(ctx)
+
+    def exitRelationalExpression(self,
+            ctx: SubCParser.RelationalExpressionContext):
+        self._binary_chain(ctx, RELATIONAL_OPERATORS)
+        return super().exitRelationalExpression(ctx)
+
+    def exitEqualityExpression(self,
+            ctx: SubCParser.EqualityExpressionContext):
+        self._binary_chain(ctx, EQUALITY_OPERATORS)
+        return super().exitEqualityExpression(ctx)
+
+    def exitBitwiseExpression(self, ctx: SubCParser.BitwiseExpressionContext):
+        self._binary_chain(ctx, BITWISE_OPERATORS)
+        return super().exitBitwiseExpression(ctx)
+
+    def exitLogicalAndExpression(self,
+            ctx: SubCParser.LogicalAndExpressionContext):
+        self._binary_chain(ctx, LOGICAL_AND_OPERATORS)
+        return super().exitLogicalAndExpression(ctx)
+
+    def exitLogicalOrExpression(self,
+            ctx: SubCParser.LogicalOrExpressionContext):
+        self._binary_chain(ctx, LOGICAL_OR_OPERATORS)
+        return super().exitLogicalOrExpression(ctx)
+
+    def exitTernaryExpression(self, ctx: SubCParser.TernaryExpressionContext):
+        cond, left, right = ctx.expression()
         rarg, prer = self._exprs.pop(), self._tree.get(right, [])
         larg, prel = self._exprs.pop(), self._tree.get(left, [])
         carg, prec = self._exprs.pop(), self._tree.get(cond, [])
-
-        # TODO: consider order of prepends
+        value = constant(carg) if self._optimizations.fold else None
+        if value is not None:
+            # only the chosen operand is evaluated
+            arg, lines = (larg, prel) if value else (rarg, prer)
+            choice = constant(arg)
+            prec.extend(lines)
+            self._tree[ctx] = prec
+            self._exprs.append(arg if choice is None
+                               else self._constant(ctx, choice))
+            return super().exitTernaryExpression(ctx)
+
+        # the condition, then both operands are evaluated, u'ternary picks
+        # the value; a folded condition evaluates the chosen operand only
         lines = prec
         lines.extend(prel)
         lines.extend(prer)
         target = self._tvars.next()
 
-        lines.append(self.LET_PAT_TMPLT.format(
-            target, f"u'ternary({carg}, {larg}, {rarg})"))
+        lines.append(Let(target, Call("u'ternary", [carg, larg, rarg])))
         self._tree[ctx] = lines
-        self._exprs.append(target)
+        self._exprs.append(Name(target))
         return super().exitTernaryExpression(ctx)
-
-    def exitExpression(self, ctx):
-        self._pass_state_to_parent(ctx.getChild(0), ctx)
-        return super().exitExpression(ctx)
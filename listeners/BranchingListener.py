@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
-from typing import Tuple
+from typing import Any, Optional, Tuple
 
+from lines import Lines
 from objects_counters import ObjectsCounter
+from processes import Continue, Goto, If, In, New, Par, Select, sequenced
 from libs.SubCParser import SubCParser
+from listeners.StatementsListener import BlockItems
 from listeners.BinaryExpressionsListener import BinaryExpressionsListener
 
 
+def has_loop(ctx: Any) -> bool:
+    stack = [ctx]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, SubCParser.LoopStatementContext):
+            return True
+        stack.extend(getattr(node, 'children', None) or [])
+    return False
+
+
 class BranchingListener(BinaryExpressionsListener):
     def __init__(self):
         super().__init__()
@@ -13,83 +26,92 @@ class BranchingListener(BinaryExpressionsListener):
         self._switches = ObjectsCounter('sw')
         self._cases = ObjectsCounter('case', '_')
 
-    def _if(self, preceding: list[str], ctx: SubCParser.IfStatementContext,
-            subsequent: list[str]) -> str:
-        end = self._ifs.next()
-        goto_if_end = self.GOTO_TMPLT.format(end)
+    def _enter_function(self, name: str):
+        self._ifs.enter()
+        self._switches.enter()
+        super()._enter_function(name)
+
+    def _exit_function(self):
+        self._ifs.leave()
+        self._switches.leave()
+        super()._exit_function()
+
+    def _sequential_if(self, preceding: list[str],
+                       ctx: SubCParser.IfStatementContext,
+                       subsequent: list[str]) -> Lines:
+        # if c then (P; K) else (P'; K), the continuation is shared by the
+        # branches and made a macro with the function if it's large
         branches = ctx.statement()
         then_br = self._tree.get(branches[0], [])
-        then_br.append(goto_if_end)
         else_br = self._tree.get(branches[1], []) if len(branches) > 1 else []
-        else_br.append(goto_if_end)
+
+        first = Lines()
+        first.extend(preceding)
+        first.extend(self._tree.get(ctx.expression(), []))
+        end = [Continue(subsequent)]
+        first.append(If(self._exprs.pop(), sequenced(then_br, end),
+                        sequenced(else_br, end)))
+        return first
+
+    def _if(self, preceding: list[str], ctx: SubCParser.IfStatementContext,
+            subsequent: list[str]) -> Lines:
+        branches = ctx.statement()
+        if self._optimizations.sequential_ifs \
+                and not any(map(has_loop, branches)):
+            return self._sequential_if(preceding, ctx, subsequent)
+        end = self._ifs.next()
+        then_br = sequenced(self._tree.get(branches[0], []), [Goto(end)])
+        else_br = sequenced(self._tree.get(branches[1], [])
+                            if len(branches) > 1 else [], [Goto(end)])
         tvar = self._tvars.next()
 
-        lines = [
-            self.NEW_VAR_TMPLT.format(end, 'channel'),
-            '(('
-        ]
-        lines.extend(preceding)
-        lines.extend(self._tree.get(ctx.expression(), []))
-
-        lines.extend([
-            f'if {self._exprs.pop()} then'])
-        lines.extend(then_br)
-        lines.append('else')
-        lines.extend(else_br)
-        lines.extend([')', f'| (in({end}, {tvar}: bool);'])
-        lines.extend(subsequent)
-        lines.append('))')
-        return lines
+        first = Lines()
+        first.extend(preceding)
+        first.extend(self._tree.get(ctx.expression(), []))
+        first.append(If(self._exprs.pop(), then_br, else_br))
+        return Lines([New(end, 'channel'),
+                      Par([first, [In(end, tvar), subsequent]])])
 
     def _case(self, ctx: SubCParser.CaseStatementContext, switch: str,
-              next: str) -> Tuple[str, str, list[str], str]:
+              next: str) -> Tuple[str, Optional[str], Lines, str]:
         expr_ctx = ctx.primaryExpression()
         is_default = expr_ctx is None
         label = switch + ('_default' if is_default else self._cases.next())
+        # the selector is bound in _switch, once the switch value is known
+        value = None if is_default else self._exprs.pop()
 
-        selector = 'else ' \
-            + ('' if is_default else 'if {expr} = ' + self._exprs.pop() + ' then ')
-        selector += self.GOTO_TMPLT.format(label)
-
-        body = ['| (in({}, {}: bool);'.format(label, self._tvars.next())]
+        body = Lines([In(label, self._tvars.next())])
         body.extend(self._tree.get(ctx.statement(), []))
-        body.append(self.GOTO_TMPLT.format(next) + ')')
-        return (label, selector, body, label)
+        return (label, value, sequenced(body, [Goto(next)]), label)
 
     def _switch(self, preceding: list[str],
                 ctx: SubCParser.SwitchStatementContext,
-                subsequent: list[str]) -> str:
+                subsequent: list[str]) -> Lines:
         self._cases.reset()
         sw = self._switches.next()
         end = sw + '_end'
-        lines = [self.NEW_VAR_TMPLT.format(end, 'channel')]
+        lines = Lines([New(end, 'channel')])
 
         next = end
-        selectors: list[str] = []
-        cases: list[list[str]] = []
+        selectors: list[Tuple[Optional[str], str]] = []
+        cases: list[Lines] = []
         for case in reversed(ctx.caseStatement()):
-            label, selector, body, next = self._case(case, sw, next)
-            lines.append(self.NEW_VAR_TMPLT.format(label, 'channel'))
+            label, value, body, next = self._case(case, sw, next)
+            lines.append(New(label, 'channel'))
             cases.append(body)
-            selectors.append(selector)
-
-        lines.append('((')
-        lines.extend(preceding)
-        lines.extend(self._tree.get(ctx.expression(), []))
-
-        selectors[-1] = selectors[-1].removeprefix('else ')
-        # has default branch?
-        if not selectors[0].endswith(self.GOTO_TMPLT.format(sw + '_default')):
-            selectors[0] += ' else ' + self.GOTO_TMPLT.format(end)
-        selectors[0] += ')'
-        lines.extend(selectors[::-1])
-        for case in cases[::-1]:
-            lines.extend(case)
-
-        lines.append(f'| (in({end}, {self._tvars.next()}: bool);')
-        lines.extend(subsequent)
-        lines.append('))')
-        return ('\n'.join(lines).format(expr=self._exprs.pop())).split('\n')
+            selectors.append((value, label))
+
+        first = Lines()
+        first.extend(preceding)
+        first.extend(self._tree.get(ctx.expression(), []))
+        # case values lie above the switch value on the stack
+        first.append(Select(self._exprs.pop(), selectors[::-1], end))
+
+        branches = [first]
+        branches.extend(cases[::-1])
+        branches.append([In(end, self._tvars.next()), subsequent])
+        lines.append(Par(branches))
+        return lines
 
     def _branching(self, preceding: list[str],
                    ctx: SubCParser.BranchingStatementContext,
@@ -102,36 +124,9 @@ class BranchingListener(BinaryExpressionsListener):
             return self._switch(preceding, branching_ctx, subsequent)
         raise NotImplementedError
 
-    def exitBranchingNoSubsequentItems(self,
-            ctx: SubCParser.BranchingNoSubsequentItemsContext):
-        self._tree[ctx] = self._branching(self._tree[ctx.branchingItems()],
-                                   ctx.branchingStatement(), [])
-        return super().exitBranchingNoSubsequentItems(ctx)
-
-    def exitBranchingNoPrecedingItems(self,
-            ctx: SubCParser.BranchingNoPrecedingItemsContext):
-        self._tree[ctx] = self._branching([], ctx.branchingStatement(),
-                                   self._tree[ctx.branchingItems()])
-        return super().exitBranchingNoPrecedingItems(ctx)
-
-    def exitBranchingBothItemsAround(self,
-            ctx: SubCParser.BranchingBothItemsAroundContext):
-        preceding, subsequent = ctx.branchingItems()
-        preceding, subsequent = self._tree[preceding], self._tree[subsequent]
-        self._tree[ctx] = self._branching(preceding, ctx.branchingStatement(),
-                                          subsequent)
-        return super().exitBranchingBothItemsAround(ctx)
-
-    def exitBranchingNoItemsAround(self,
-            ctx: SubCParser.BranchingNoItemsAroundContext):
-        self._tree[ctx] = self._branching([], ctx.branchingStatement(), [])
-        return super().exitBranchingNoItemsAround(ctx)
-
-    def exitJustBranchingItems(self, ctx: SubCParser.JustBranchingItemsContext):
-        self._just_concat_items(ctx, ctx.funCallItems(), ctx.branchingItems())
-        return super().exitJustBranchingItems(ctx)
-
     def exitNestedBranchingStatement(self,
             ctx: SubCParser.NestedBranchingStatementContext):
-        self._tree[ctx] = self._branching([], ctx.branchingStatement(), [])
+        if not self._chain_block_item(ctx, BlockItems.BRANCHINGS,
+                                      self._branching, ctx.branchingStatement()):
+            self._tree[ctx] = self._branching([], ctx.branchingStatement(), [])
         return super().exitNestedBranchingStatement(ctx)
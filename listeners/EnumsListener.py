@@ -26,6 +26,16 @@ class EnumsListener(SubCListener):
         self._globals: list[str] = []
         self._anon_types = ObjectsCounter('anon_t')
 
+    # Counters are scoped by function definitions, so the names a function
+    # gets don't depend on the other functions. Listeners with counters
+    # extend these.
+    def _enter_function(self, name: str):
+        # anonymous types are global, hence qualified with the function
+        self._anon_types.enter(name)
+
+    def _exit_function(self):
+        self._anon_types.leave()
+
     def exitEnumDeclaration(self, ctx: SubCParser.EnumDeclarationContext):
         self._globals.append(f'type {str(ctx.Identifier())}.')
         return super().exitEnumDeclaration(ctx)
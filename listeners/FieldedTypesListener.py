@@ -2,6 +2,7 @@
 from typing import Union, Iterable, Optional, Tuple, Any
 
 from helpers import Parameter, list_pop_n
+from processes import Call, Term
 from libs.SubCParser import SubCParser
 from listeners.EnumsListener import EnumsListener
 
@@ -14,7 +15,7 @@ INIT_TEMPLATE = "fun u'{name}_init({params}): {name}."
 class StructOrUnion:
     CALL_GETTER: str = "u'{}_get_{}(%s)"
     CALL_SETTER: str = "u'{}_set_{}(%s, %s)"
-    CALL_INIT: str = "u'{}_init(%s)"
+    CALL_INIT: str = "u'{}_init"
 
     def __init__(self, name: str, fields: list[Parameter] = []):
         self.name = name
@@ -27,27 +28,28 @@ class StructOrUnion:
         # self.setters: dict[str, str] = {}
         for ftype, fname in self.fields:
             self.field2itype[fname] = (len(self.init_params), ftype)
-            self.init_params.append('{' + fname + '}')
+            self.init_params.append(fname)
             # self.getters[fname] = self.CALL_GETTER.format(self.name, fname)
             # self.setters[fname] = self.CALL_SETTER.format(self.name, fname)
 
     def add_field(self, field: Parameter):
         ftype, fname = field
         self.field2itype[fname] = (len(self.init_params), ftype)
-        self.init_params.append('{' + fname + '}')
+        self.init_params.append(fname)
         # self.getters[fname] = self.CALL_GETTER.format(self.name, fname)
         # self.setters[fname] = self.CALL_SETTER.format(self.name, fname)
 
-    def _init(self, kwargs: dict[str, str]) -> str:
-        return self.initializer % (', '.join(self.init_params).format(**kwargs))
+    def _init(self, kwargs: dict[str, Term]) -> Call:
+        return Call(self.initializer,
+                    [kwargs[fname] for fname in self.init_params])
 
-    def _set_defaults(self, kwargs: dict[str, str]):
+    def _set_defaults(self, kwargs: dict[str, Term]):
         for _, fname in self.fields:
             if fname in kwargs:
                 continue
             kwargs[fname] = '0' # TODO: set defaults based on field type
 
-    def _set_via_initializers(self, kwargs: dict[str, str],
+    def _set_via_initializers(self, kwargs: dict[str, Term],
             lines: list[str], fields: list[SubCParser.FieldInitializerContext],
             listener: Any):
         i = 0
@@ -62,15 +64,15 @@ class StructOrUnion:
             kwargs[fname] = expr
 
     def init(self, ctx: Optional[SubCParser.FieldInitializerListContext],
-             listener: Any) -> str:
-        kwargs = {}
-        lines = []
+             listener: Any) -> Tuple[list, Call]:
+        # (the processes evaluating the fields, the term of the struct)
+        kwargs: dict[str, Term] = {}
+        lines: list = []
         if ctx is not None:
             self._set_via_initializers(kwargs, lines, ctx.fieldInitializer(),
                                        listener)
         self._set_defaults(kwargs)
-        lines.append(self._init(kwargs))
-        return '\n'.join(lines)
+        return lines, self._init(kwargs)
 
     # def get_field(self, _self: str, field: str) -> str:
     #     return self.getters[field] % (_self)
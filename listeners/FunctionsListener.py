@@ -1,10 +1,14 @@
-from typing import Union, Iterable, Optional, Any
+from typing import Iterable, Optional, Union
 from functools import reduce
 
 from helpers import Parameter, list_pop_n, list_extended, shadow_name
+from lines import Lines, split_last
 from objects_counters import ObjectsGroupCounter
+from processes import Call, Define, Fun, Goto, If, In, Let, Name, New, Par, \
+    render, sequenced
+from optimizations import Optimizations, continuations, inline
 from libs.SubCParser import SubCParser
-from listeners.StatementsListener import StatementsListener
+from listeners.StatementsListener import StatementsListener, BlockItems
 
 
 FunctionParamsContexts = Union[SubCParser.FunctionParamsDefinitionContext,
@@ -15,17 +19,9 @@ FunctionDefinitionContexts = Union[SubCParser.VoidFunctionDefinitionContext,
                                    SubCParser.NonVoidFunctionDefinitionContext]
 
 
-FUN_TMPLT: str = 'fun {}({}): {}.'
-FUN_MACRO_TMPLT: str = 'let {}({}) = {}.'
-
-
 def anonymous_args(types: Iterable[str]) -> Iterable[Parameter]:
     return [(_type, shadow_name(f'p{i}')) for i, _type in enumerate(types)]
 
-def arg2pv(param: Parameter) -> str:
-    _type, name = param
-    return name + ': ' + _type
-
 def protect_from_redeclaration(function):
     def wrapper(self, ctx: FunctionDeclarationContexts):
         fname = str(ctx.Identifier())
@@ -36,19 +32,46 @@ def protect_from_redeclaration(function):
 
 
 class FunctionsListener(StatementsListener):
-    GOTO_TMPLT: str = 'out({}, true)'
-
     def __init__(self):
         super().__init__()
         self._functions: dict[str, str] = {}
         self._fcalls = ObjectsGroupCounter('fcall', ['begin', 'end'])
         # TODO: maybe need for '_fcall_ret%i'
+        # cached translations of functions, their bodies aren't walked
+        self._cached: dict[str, str] = {}
+        # translations to cache, if collected: only of functions which
+        # neither used nor added file-wide definitions
+        self._fresh: Optional[dict[str, str]] = None
+        self._shared = False
+        self._globals_count = 0
+        self._optimizations = Optimizations()
+
+    def _enter_function(self, name: str):
+        self._fcalls.enter()
+        self._shared = False
+        self._globals_count = len(self._globals)
+        super()._enter_function(name)
+
+    def _exit_function(self):
+        self._fcalls.leave()
+        super()._exit_function()
+
+    def enterVoidFunctionDefinition(self,
+            ctx: SubCParser.VoidFunctionDefinitionContext):
+        self._enter_function(str(ctx.Identifier()))
+        return super().enterVoidFunctionDefinition(ctx)
+
+    def enterNonVoidFunctionDefinition(self,
+            ctx: SubCParser.NonVoidFunctionDefinitionContext):
+        self._enter_function(str(ctx.Identifier()))
+        return super().enterNonVoidFunctionDefinition(ctx)
 
     def exitFunctionParamDefinition(self,
             ctx: SubCParser.FunctionParamDefinitionContext):
         _type = self._tree[ctx.typeSpecifier()] if ctx.arraySpecifier() is None \
             else 'bitstring'
         self._tree[ctx] = (_type, str(ctx.Identifier()))
+        self._variables[str(ctx.Identifier())] = _type
         return super().exitFunctionParamDefinition(ctx)
 
     def exitFunctionParamsDefinition(self,
@@ -81,55 +104,67 @@ class FunctionsListener(StatementsListener):
         name = str(ctx.Identifier())
         params = self._tree.get(ctx.functionParamsDeclaration(), [])
         params.append(('channel', "u'end"))
-        params = ', '.join(map(arg2pv, params))
-        self._functions[name] = FUN_MACRO_TMPLT.format(name, params,
-                                                       "out(u'end, true)")
+        self._functions[name] = render(Define(name, params, []))
         return super().exitVoidFunctionDeclaration(ctx)
 
     @protect_from_redeclaration
     def exitNonVoidFunctionDeclaration(self,
             ctx: SubCParser.NonVoidFunctionDeclarationContext):
         name = str(ctx.Identifier())
-        params = ', '.join(map(lambda p: p[0],
-                               self._tree.get(ctx.functionParamsDeclaration(),
-                                              [])))
+        params = [_type for _type, _ in
+                  self._tree.get(ctx.functionParamsDeclaration(), [])]
         rettype = self._tree[ctx.typeSpecifier()]
-        self._functions[name] = FUN_TMPLT.format(name, params, rettype)
+        self._functions[name] = render(Fun(name, params, rettype))
         return super().exitNonVoidFunctionDeclaration(ctx)
 
     def _define_function(self, ctx: FunctionDefinitionContexts,
                          is_void: bool = False):
         name = str(ctx.Identifier())
+        if name in self._cached:
+            self._functions[name] = self._cached[name]
+            return
         params = self._tree.get(ctx.functionParamsDefinition(), [])
         if not is_void:
             params.append(('channel', "u'ret"))
         params.append(('channel', "u'end"))
-        params = ', '.join(map(arg2pv, params))
-        body = '\n'.join(self._tree[ctx.compoundStatement()]) \
-            .removesuffix('0').rstrip(';')
-        body += (' ' if not body or body.endswith(' in') else '; ') \
-            + "out(u'end, true)"
-        body = FUN_MACRO_TMPLT.format(name, params, body.strip())
-        self._functions[name] = body
+        body = self._tree[ctx.compoundStatement()]
+        macros: list[Define] = []
+        if self._optimizations.sequential_ifs \
+                or self._optimizations.bound(name) > 0:
+            if isinstance(split_last(body)[1], If):
+                # the function returns at the end of both branches
+                body = sequenced(body, [Goto("u'end")])
+            macros, body = continuations(name, params, body)
+        macros.append(Define(name, params, body))
+        if self._optimizations.inline:
+            for macro in macros:
+                macro.body = inline(macro.body)
+        text = '\n'.join(map(render, macros))
+        self._functions[name] = text
+        if self._fresh is not None and not self._shared \
+                and self._globals_count == len(self._globals):
+            self._fresh[name] = text
 
     def exitVoidFunctionDefinition(self,
             ctx: SubCParser.VoidFunctionDefinitionContext):
         self._define_function(ctx, True)
+        self._exit_function()
         return super().exitVoidFunctionDefinition(ctx)
 
     def exitNonVoidFunctionDefinition(self,
             ctx: SubCParser.NonVoidFunctionDefinitionContext):
         self._define_function(ctx)
+        self._exit_function()
         return super().exitNonVoidFunctionDefinition(ctx)
 
     def exitFunctionCall(self, ctx: SubCParser.FunctionCallContext):
         func = str(ctx.Identifier())
         ctxes = ctx.expression() or []
-        args = ', '.join(list_pop_n(self._exprs, len(ctxes)))
+        args = list_pop_n(self._exprs, len(ctxes))
         # TODO: consider order or statements
         lines = reduce(lambda acc, _ctx: \
                        list_extended(acc, self._tree.get(_ctx, [])), ctxes, [])
-        lines.append(func + '(' + args + ')')
+        lines.append(Call(func, args))
         self._tree[ctx] = lines
         return super().exitFunctionCall(ctx)
 
@@ -138,77 +173,30 @@ class FunctionsListener(StatementsListener):
         target = self._tvars.next()
         # TODO: handle functions with definitions (process macros)
         lines = self._tree[ctx.functionCall()]
-        lines[-1] = self.LET_PAT_TMPLT.format(target, lines[-1])
+        lines[-1] = Let(target, lines[-1])
         self._tree[ctx] = lines
-        self._exprs.append(target)
+        self._exprs.append(Name(target))
         return super().exitFunctionCallExpression(ctx)
 
     def exitFunCallStatement(self, ctx: SubCParser.FunCallStatementContext):
         lines = self._tree[ctx.functionCall()]
-        # add end channel argument
-        func, args = lines[-1].split('(')
-        args = args.rstrip(')')
-        lines[-1] = func + '(' + args + ('' if not args else ', ') + '{})'
         self._tree[ctx] = lines
+        self._chain_block_item(ctx, BlockItems.FUNCALLS, self._funcall, lines)
         return super().exitFunCallStatement(ctx)
 
-    def _funcall(self, preceding: list[str],
-                 ctx: SubCParser.FunCallStatementContext,
-                 subsequent: list[str]) -> str:
+    def _funcall(self, preceding: list[str], fcall: list[str],
+                 subsequent: list[str]) -> Lines:
         begin, end = self._fcalls.next()
         tvar0 = self._tvars.next()
         tvar1 = self._tvars.next()
-        fcall = self._tree[ctx]
-        fcall[-1] = fcall[-1].format(end)
-
-        lines = [
-            self.NEW_VAR_TMPLT.format(begin, 'channel'),
-            self.NEW_VAR_TMPLT.format(end, 'channel'),
-            '(('
-        ]
-        if not (not preceding):
-            lines.extend(preceding)
-        lines.extend([f'out({begin}, true))',
-                      f'| (in({begin}, {tvar0}: bool);'])
-        lines.extend(fcall)
-        lines.extend([')', f'| (in({end}, {tvar1}: bool);'])
-        if not (not subsequent):
-            lines.extend(subsequent)
-        lines.append('))')
-        return lines
-
-    def exitFunCallNoSubsequentItems(self,
-            ctx: SubCParser.FunCallNoSubsequentItemsContext):
-        self._tree[ctx] = self._funcall(self._tree[ctx.funCallItems()],
-                                        ctx.funCallStatement(), [])
-        return super().exitFunCallNoSubsequentItems(ctx)
-
-    def exitFunCallNoPrecedingItems(self,
-            ctx: SubCParser.FunCallNoPrecedingItemsContext):
-        self._tree[ctx] = self._funcall([], ctx.funCallStatement(),
-                                        self._tree[ctx.funCallItems()])
-        return super().exitFunCallNoPrecedingItems(ctx)
-
-    def exitFunCallBothItemsAround(self,
-            ctx: SubCParser.FunCallBothItemsAroundContext):
-        preceding, subsequent = ctx.funCallItems()
-        preceding, subsequent = self._tree[preceding], self._tree[subsequent]
-        self._tree[ctx] = self._funcall(preceding, ctx.funCallStatement(),
-                                        subsequent)
-        return super().exitFunCallBothItemsAround(ctx)
-
-    def exitFunCallNoItemsAround(self,
-            ctx: SubCParser.FunCallNoItemsAroundContext):
-        self._tree[ctx] = self._funcall([], ctx.funCallStatement(), [])
-        return super().exitFunCallNoItemsAround(ctx)
-
-    def _just_concat_items(self, ctx: Any, first: Any, next: Optional[Any]):
-        items = [first] if next is None else [first, next]
-        self._tree[ctx] = reduce(lambda acc, item: \
-                                 list_extended(acc, self._tree.get(item, [])),
-                                 items, [])
-
-    def exitJustFunCallItems(self,
-            ctx: SubCParser.JustFunCallItemsContext):
-        self._just_concat_items(ctx, ctx.blockItem(), ctx.funCallItems())
-        return super().exitJustFunCallItems(ctx)
+        # add end channel argument
+        call = fcall[-1]
+        fcall[-1] = Call(call.func, call.args + [end])
+
+        return Lines([
+            New(begin, 'channel'),
+            New(end, 'channel'),
+            Par([[preceding, Goto(begin)],
+                 [In(begin, tvar0), fcall],
+                 [In(end, tvar1), subsequent]])
+        ])
@@ -3,6 +3,7 @@ from typing import Optional
 
 from objects_counters import ObjectsGroupCounter
 from libs.SubCParser import SubCParser
+from listeners.StatementsListener import BlockItems
 from listeners.BranchingListener import BranchingListener
 from auxilaries.WhileLoopTranslator import WhileLoopTranslator
 from auxilaries.DoWhileLoopTranslator import DoWhileLoopTranslator
@@ -16,6 +17,20 @@ class LoopsListener(BranchingListener):
         self._whiles = ObjectsGroupCounter('while', loops_groups)
         self._dowhiles = ObjectsGroupCounter('dowhile', loops_groups)
         self._fors = ObjectsGroupCounter('for', loops_groups)
+        self._unroll = 0 # copies of the loops of the function
+
+    def _enter_function(self, name: str):
+        self._unroll = self._optimizations.bound(name)
+        self._whiles.enter()
+        self._dowhiles.enter()
+        self._fors.enter()
+        super()._enter_function(name)
+
+    def _exit_function(self):
+        self._whiles.leave()
+        self._dowhiles.leave()
+        self._fors.leave()
+        super()._exit_function()
 
     def _loop(self, preceding: list[str],
                ctx: SubCParser.LoopStatementContext,
@@ -34,35 +49,9 @@ class LoopsListener(BranchingListener):
                                                subsequent, self)
         raise NotImplementedError
 
-    def exitLoopNoSubsequentItems(self,
-            ctx: SubCParser.LoopNoSubsequentItemsContext):
-        self._tree[ctx] = self._loop(self._tree[ctx.loopBlockItems()],
-                                     ctx.loopStatement(), [])
-        return super().exitLoopNoSubsequentItems(ctx)
-
-    def exitLoopNoPrecedingItems(self,
-            ctx: SubCParser.LoopNoPrecedingItemsContext):
-        self._tree[ctx] = self._loop([], ctx.loopStatement(),
-                                     self._tree[ctx.loopBlockItems()])
-        return super().exitLoopNoPrecedingItems(ctx)
-
-    def exitLoopBothItemsAround(self,
-            ctx: SubCParser.LoopBothItemsAroundContext):
-        preceding, subsequent = ctx.loopBlockItems()
-        preceding, subsequent = self._tree[preceding], self._tree[subsequent]
-        self._tree[ctx] = self._loop(preceding, ctx.loopStatement(), subsequent)
-        return super().exitLoopBothItemsAround(ctx)
-
-    def exitLoopNoItemsAround(self, ctx: SubCParser.LoopNoItemsAroundContext):
-        self._tree[ctx] = self._loop([], ctx.loopStatement(), [])
-        return super().exitLoopNoItemsAround(ctx)
-
-    def exitJustLoopBlockItems(self,
-            ctx: SubCParser.JustLoopBlockItemsContext):
-        self._just_concat_items(ctx, ctx.branchingItems(), ctx.loopBlockItems())
-        return super().exitJustLoopBlockItems(ctx)
-
     def exitNestedLoopStatement(self,
             ctx: SubCParser.NestedLoopStatementContext):
-        self._tree[ctx] = self._loop([], ctx.loopStatement(), [])
+        if not self._chain_block_item(ctx, BlockItems.LOOPS, self._loop,
+                                      ctx.loopStatement()):
+            self._tree[ctx] = self._loop([], ctx.loopStatement(), [])
         return super().exitNestedLoopStatement(ctx)
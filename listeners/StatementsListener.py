@@ -1,20 +1,24 @@
 #!/usr/bin/env python3
+from typing import Any, Callable, Optional, Tuple
+
 from helpers import shadow_name
+from lines import Lines
 from objects_counters import ObjectsCounter
+from processes import Let, Name, Nil, Term, applied, infix, sequenced
 from libs.SubCParser import SubCParser
 from listeners.VariablesListener import VariablesListener
 
 
-def call_binop(name: str) -> str:
-    return shadow_name(name) + '({}, {})'
+def call_binop(name: str) -> Callable[[Term, Term], Term]:
+    return applied(shadow_name(name))
 
 
 ASSIGN_OPERATORS = {
     '*':  call_binop('mul'),
     '/':  call_binop('div'),
     '%':  call_binop('mod'),
-    '+':  '{} + {}',
-    '-':  '{} - {}',
+    '+':  infix('+'),
+    '-':  infix('-'),
     '<<': call_binop('shl'),
     '>>': call_binop('shr'),
     '&':  call_binop('and'),
@@ -23,19 +27,76 @@ ASSIGN_OPERATORS = {
 }
 
 
+# (preceding, statement, subsequent) -> lines
+ChainTranslator = Callable[[list[str], Any, list[str]], list[str]]
+
+
+class BlockItems:
+    # Leading loops, then branchings and then any function calls of a block
+    # take the rest of the block as their subsequent items, other statements
+    # are translated in place and just concatenated.
+    LOOPS, BRANCHINGS, FUNCALLS = range(3)
+
+    def __init__(self):
+        self._level = self.LOOPS
+        self._chained: Optional[Tuple[ChainTranslator, Any]] = None
+        self._items: list[Tuple[Optional[ChainTranslator], Any]] = []
+
+    def chain(self, level: int, translate: ChainTranslator, ctx: Any) -> bool:
+        if level < self._level:
+            return False
+        self._level = level
+        self._chained = (translate, ctx)
+        return True
+
+    def push(self, lines: list[str]):
+        if self._chained is None:
+            self._level = self.FUNCALLS
+            self._items.append((None, lines))
+        else:
+            self._items.append(self._chained)
+            self._chained = None
+
+    def translate(self) -> Lines:
+        lines = Lines()
+        for translate, item in reversed(self._items):
+            if translate is None:
+                lines = sequenced(item, lines)
+            else:
+                lines = translate([], item, lines)
+        return lines
+
+
 class StatementsListener(VariablesListener):
     def __init__(self):
         super().__init__()
         self._tvars = ObjectsCounter('tvar')
+        self._blocks: list[BlockItems] = []
+
+    def _enter_function(self, name: str):
+        self._tvars.enter()
+        super()._enter_function(name)
+
+    def _exit_function(self):
+        self._tvars.leave()
+        super()._exit_function()
+
+    def _chain_block_item(self, ctx: Any, level: int,
+                          translate: ChainTranslator, item: Any) -> bool:
+        # only statements placed right in a block could be chained
+        if not isinstance(ctx.parentCtx.parentCtx, SubCParser.BlockItemContext):
+            return False
+        return self._blocks[-1].chain(level, translate, item)
 
     def exitStatement(self, ctx: SubCParser.StatementContext):
-        self._tree[ctx] = self._tree[ctx.getChild(0)]
+        self._tree[ctx] = self._tree.get(ctx.getChild(0), [])
         return super().exitStatement(ctx)
 
     def exitBlockItem(self, ctx: SubCParser.BlockItemContext):
         child_ctx = ctx.statement() or ctx.variableDeclaration()
         if child_ctx is not None:
             self._tree[ctx] = self._tree[child_ctx]
+        self._blocks[-1].push(self._tree.get(ctx, []))
         return super().exitBlockItem(ctx)
 
     def exitAssignmentExpression(self,
@@ -47,16 +108,16 @@ class StatementsListener(VariablesListener):
 
         lines = self._tree.get(ectx, [])
         if not op:
-            lines.append(self.LET_PAT_TMPLT.format(target, source))
+            lines.append(Let(target, source))
         else:
-            tmplt = ASSIGN_OPERATORS[op]
+            build = ASSIGN_OPERATORS[op]
             tmpvar = self._tvars.next()
             lines.extend([
-                self.LET_PAT_TMPLT.format(tmpvar, tmplt.format(target, source)),
-                self.LET_PAT_TMPLT.format(target, tmpvar)
+                Let(tmpvar, build(Name(target), source)),
+                Let(target, Name(tmpvar))
             ])
         self._tree[ctx] = lines
-        self._exprs.append(target)
+        self._exprs.append(Name(target))
         return super().exitAssignmentExpression(ctx)
 
     def exitAssignmentStatement(self,
@@ -65,6 +126,11 @@ class StatementsListener(VariablesListener):
         self._tree[ctx] = self._tree[ctx.assignmentExpression()]
         return super().exitAssignmentStatement(ctx)
 
+    def enterCompoundStatement(self, ctx: SubCParser.CompoundStatementContext):
+        self._blocks.append(BlockItems())
+        return super().enterCompoundStatement(ctx)
+
     def exitCompoundStatement(self, ctx: SubCParser.CompoundStatementContext):
-        self._tree[ctx] = self._tree.get(ctx.loopBlockItems(), ['0'])
+        block = self._blocks.pop()
+        self._tree[ctx] = block.translate() if ctx.blockItem() else [Nil()]
         return super().exitCompoundStatement(ctx)
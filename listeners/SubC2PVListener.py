@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
+from helpers import ConsumingDict
+from optimizations import Optimizations
 from listeners.ArraysListener import ArraysListener
 
 
 class SubC2PVListener(ArraysListener):
-    def __init__(self):
+    def __init__(self, low_memory: bool = False,
+                 optimizations: Optimizations = Optimizations()):
         super().__init__()
+        self._optimizations = optimizations
+        if low_memory:
+            # children results are dropped once their parent consumed them
+            self._tree = ConsumingDict()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-from typing import Any, NamedTuple
+from typing import Any, Callable, NamedTuple, Optional, Tuple
 
 from objects_counters import ObjectsCounter
+from optimizations import UNARY_FOLDINGS, Constant, Value, constant, fold
+from processes import Infix, Let, Name, Term, applied
 from libs.SubCParser import SubCParser
 from listeners.FunctionsListener import FunctionsListener
 
@@ -10,6 +12,21 @@ STRING_LIT_TMPLT: str = 'free {}: bitstring [private]. (* "{}" *)'
 CASTER_NAME_TMPLT: str = "u'cast2{}"
 CASTER_TMPLT: str = 'fun {}(any_type): {}.'
 
+# operator -> (return type, builder of the term)
+POSTFIX_OPERATORS: dict[str, Tuple[str, Callable[[Term], Term]]] = {
+    '++': ('nat', lambda term: Infix('+', term, '1')),
+    '--': ('nat', lambda term: Infix('-', term, '1')),
+}
+
+UNARY_OPERATORS: dict[str, Tuple[str, Callable[[Term], Term]]] = {
+    '&': ('bitstring', applied("u'addressof")),
+    '*': ('bitstring', applied("u'deref")),
+    '+': ('nat', lambda term: Infix('+', '0', term)),
+    '-': ('nat', lambda term: Infix('-', '0', term)),
+    '~': ('nat', applied("u'not")),
+    '!': ('bool', applied('not')),
+}
+
 
 def lit2str(literal: Any) -> str:
     return literal.getText().removeprefix('u8').removeprefix('u') \
@@ -21,12 +38,23 @@ StringLiterals = NamedTuple('StringLiterals', strings=dict[str, str],
 
 
 class UnaryExpressionsListener(FunctionsListener):
-    TYPED_VAR_TMPLT: str = '{}: {}'
-
     def __init__(self):
         super().__init__()
         self._strlits = StringLiterals({}, ObjectsCounter('strlit'))
-        self._casters: set[str] = set()
+        self._outer_strlits: list[StringLiterals] = []
+        self._casters: dict[str, str] = {} # caster -> its declaration
+
+    def _enter_function(self, name: str):
+        # string literals of a function are declared apart, under its name
+        self._outer_strlits.append(self._strlits)
+        self._strlits = StringLiterals({}, self._strlits.names)
+        self._strlits.names.enter(name)
+        super()._enter_function(name)
+
+    def _exit_function(self):
+        self._strlits.names.leave()
+        self._strlits = self._outer_strlits.pop()
+        super()._exit_function()
 
     def _declare_single_strlit(self, strlit: str) -> str:
         if strlit not in self._strlits.strings:
@@ -43,12 +71,12 @@ class UnaryExpressionsListener(FunctionsListener):
         for strlit in map(lit2str, ctx.StringLiteral()):
             _ = self._declare_single_strlit(strlit)
             merged_strlits += strlit
-        self._exprs.append(self._declare_single_strlit(merged_strlits))
+        self._exprs.append(Name(self._declare_single_strlit(merged_strlits)))
         return super().exitPrimaryExprStringLits(ctx)
 
     def exitPrimaryExprIdentifier(self,
             ctx: SubCParser.PrimaryExprIdentifierContext):
-        self._exprs.append(str(ctx.Identifier()))
+        self._exprs.append(Name(str(ctx.Identifier())))
         return super().exitPrimaryExprIdentifier(ctx)
 
     def exitPrimaryExprConstant(self,
@@ -62,87 +90,57 @@ class UnaryExpressionsListener(FunctionsListener):
 
     def exitParenthesisExpression(self,
             ctx: SubCParser.ParenthesisExpressionContext):
-        child_ctx = ctx.primaryExpression() or ctx.expression()
-        if child_ctx is not None:
-            self._pass_state_to_parent(child_ctx, ctx)
+        self._pass_state_to_parent(ctx.expression(), ctx)
         return super().exitParenthesisExpression(ctx)
 
-    def exitBasePostfixExpression(self,
-            ctx: SubCParser.BasePostfixExpressionContext):
-        self._pass_state_to_parent(ctx.parenthesisExpression(), ctx)
-        return super().exitBasePostfixExpression(ctx)
+    def _constant(self, ctx: Any, value: Value) -> Constant:
+        if not self._optimizations.fold_comments:
+            return Constant(value)
+        text = ctx.start.getInputStream().getText(ctx.start.start,
+                                                  ctx.stop.stop)
+        return Constant(value, ' '.join(text.split()))
+
+    def _unary_expr(self, parent: Any, child: Any, rtype: str,
+                    build: Callable[[Term], Term],
+                    folding: Optional[Callable] = None):
+        if folding is not None and self._optimizations.fold:
+            value = constant(self._exprs[-1])
+            value = None if value is None else fold(folding, value)
+            if value is not None:
+                self._exprs[-1] = self._constant(parent, value)
+                self._tree[parent] = self._tree.get(child, [])
+                return
 
-    def _unary_expr(self, parent: Any, child: Any, rtype: str, tmplt: str):
         tvar = self._tvars.next()
         expr = self._exprs.pop()
 
         lines = self._tree.get(child, [])
-        lines.append(self.LET_PAT_TMPLT.format(
-            self.TYPED_VAR_TMPLT.format(tvar, rtype), tmplt.format(expr)))
+        lines.append(Let(tvar, build(expr), rtype))
         self._tree[parent] = lines
-        self._exprs.append(tvar)
-
-    def exitPostIncrementExpression(self,
-            ctx: SubCParser.PostIncrementExpressionContext):
-        self._unary_expr(ctx, ctx.postfixExpression(), 'nat', '{} + 1')
-        return super().exitPostIncrementExpression(ctx)
-
-    def exitPostDecrementExpression(self,
-            ctx: SubCParser.PostDecrementExpressionContext):
-        self._unary_expr(ctx, ctx.postfixExpression(), 'nat', '{} - 1')
-        return super().exitPostDecrementExpression(ctx)
+        self._exprs.append(Name(tvar))
 
-    def exitBaseUnaryExpression(self,
-            ctx: SubCParser.BaseUnaryExpressionContext):
-        self._pass_state_to_parent(ctx.postfixExpression(), ctx)
-        return super().exitBaseUnaryExpression(ctx)
+    def exitPostfixExpression(self, ctx: SubCParser.PostfixExpressionContext):
+        rtype, build = POSTFIX_OPERATORS[ctx.op.text]
+        self._unary_expr(ctx, ctx.expression(), rtype, build)
+        return super().exitPostfixExpression(ctx)
 
     def exitSizeofExpression(self, ctx: SubCParser.SizeofExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'nat', "u'sizeof({})")
+        self._unary_expr(ctx, ctx.expression(), 'nat', applied("u'sizeof"))
         return super().exitSizeofExpression(ctx)
 
-    def exitLogicalNotExpression(self,
-            ctx: SubCParser.LogicalNotExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'bool', 'not({})')
-        return super().exitLogicalNotExpression(ctx)
-
-    def exitBitwiseNotExpression(self,
-            ctx: SubCParser.BitwiseNotExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'nat', "u'not({})")
-        return super().exitBitwiseNotExpression(ctx)
-
-    def exitUnaryMinusExpression(self,
-            ctx: SubCParser.UnaryMinusExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'nat', '0 - {}')
-        return super().exitUnaryMinusExpression(ctx)
-
-    def exitUnaryPlusExpression(self,
-            ctx: SubCParser.UnaryPlusExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'nat', '0 + {}')
-        return super().exitUnaryPlusExpression(ctx)
-
-    def exitDereferenceExpression(self,
-            ctx: SubCParser.DereferenceExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'bitstring', "u'deref({})")
-        return super().exitDereferenceExpression(ctx)
-
-    def exitAddressOfExpression(self,
-            ctx: SubCParser.AddressOfExpressionContext):
-        self._unary_expr(ctx, ctx.unaryExpression(), 'bitstring',
-                         "u'addressof({})")
-        return super().exitAddressOfExpression(ctx)
-
-    def exitBaseCastExpression(self,
-            ctx: SubCParser.BaseCastExpressionContext):
-        self._pass_state_to_parent(ctx.unaryExpression(), ctx)
-        return super().exitBaseCastExpression(ctx)
+    def exitUnaryExpression(self, ctx: SubCParser.UnaryExpressionContext):
+        rtype, build = UNARY_OPERATORS[ctx.op.text]
+        self._unary_expr(ctx, ctx.expression(), rtype, build,
+                         UNARY_FOLDINGS.get(ctx.op.text))
+        return super().exitUnaryExpression(ctx)
 
     def exitCast2TypeExpression(self,
             ctx: SubCParser.Cast2TypeExpressionContext):
         _type = self._tree[ctx.typeSpecifier()]
         caster = CASTER_NAME_TMPLT.format(_type)
+        self._shared = True
         if caster not in self._casters:
-            self._casters.add(caster)
-            self._globals.append(CASTER_TMPLT.format(caster, _type))
-        self._unary_expr(ctx, ctx.castExpression(), _type, caster + '({})')
+            self._casters[caster] = CASTER_TMPLT.format(caster, _type)
+            self._globals.append(self._casters[caster])
+        self._unary_expr(ctx, ctx.expression(), _type, applied(caster))
         return super().exitCast2TypeExpression(ctx)
@@ -1,31 +1,45 @@
 #!/usr/bin/env python3
+from typing import Any, Optional, Tuple, Union
+
+from processes import Call, New, Let
 from libs.SubCParser import SubCParser
 from listeners.TypesListener import TypesListener
 
 
 class VariablesListener(TypesListener):
-    NEW_VAR_TMPLT: str = 'new {}: {};'
-    LET_PAT_TMPLT: str = 'let {} = {} in'
-
     def __init__(self):
         super().__init__()
         self._exprs: list[str] = []
+        # types of the variables of the function, by their last declarations
+        self._variables: dict[str, str] = {}
+
+    def _enter_function(self, name: str):
+        self._variables = {}
+        super()._enter_function(name)
+
+    def _declare(self, ctx: Any, declaration: Union[New, Let],
+                 preceding: Optional[list] = None):
+        self._variables[declaration.name] = declaration.type
+        lines = preceding or []
+        lines.append(declaration)
+        self._tree[ctx] = lines
 
     def exitNoInitializerVariable(self,
             ctx: SubCParser.NoInitializerVariableContext):
-        self._tree[ctx] = [self.NEW_VAR_TMPLT.format(str(ctx.Identifier()),
-            self._tree[ctx.typeSpecifier()])]
+        self._declare(ctx, New(str(ctx.Identifier()),
+                               self._tree[ctx.typeSpecifier()]))
         return super().exitNoInitializerVariable(ctx)
 
     def exitObjectDeclarationVariable(self,
             ctx: SubCParser.ObjectDeclarationVariableContext):
-        self._tree[ctx] = [self.NEW_VAR_TMPLT.format(str(ctx.Identifier()),
-            self._tree[ctx.typeSpecifier()])]
+        self._declare(ctx, New(str(ctx.Identifier()),
+                               self._tree[ctx.typeSpecifier()]))
         self._exprs.pop()
         return super().exitObjectDeclarationVariable(ctx)
 
     def _fielded_init(self, type_name: str,
-            ctx: SubCParser.StructOrUnionInitializerContext) -> str:
+            ctx: SubCParser.StructOrUnionInitializerContext) \
+            -> Tuple[list, Call]:
         try:
             return self._fielded_types[type_name].init(
                 ctx.fieldInitializerList(), self)
@@ -35,12 +49,11 @@ class VariablesListener(TypesListener):
     def exitStructOrUnionInitializerVariable(self,
             ctx: SubCParser.StructOrUnionInitializerVariableContext):
         tname = self._tree[ctx.structOrUnionType()]
-        self._tree[ctx] = [self.LET_PAT_TMPLT.format(str(ctx.Identifier()) \
-            + ': ' + tname, self._fielded_init(tname, ctx.structOrUnionInitializer()))]
+        lines, term = self._fielded_init(tname, ctx.structOrUnionInitializer())
+        self._declare(ctx, Let(str(ctx.Identifier()), term, tname), lines)
         return super().exitStructOrUnionInitializerVariable(ctx)
 
     def exitArrayInitializerVariable(self,
             ctx: SubCParser.ArrayInitializerVariableContext):
-        self._tree[ctx] = [self.NEW_VAR_TMPLT.format(str(ctx.Identifier()),
-                                                    'bitstring')]
+        self._declare(ctx, New(str(ctx.Identifier()), 'bitstring'))
         return super().exitArrayInitializerVariable(ctx)
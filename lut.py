@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import pathlib
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, TextIO
 
-from model import Model
+if TYPE_CHECKING:
+    from model import Model
 
 
 class LookUpTable:
@@ -18,26 +19,45 @@ class LookUpTable:
     def extract(self, fname: str) -> bool:
         return bool(fname in self.rules.get('X', set()))
 
+    def add_extracts(self, fnames: Iterable[str]):
+        self.rules.setdefault('X', set()).update(fnames)
+
     def substitutes(self) -> dict[str, str]:
         return self.rules.get('S', {})
 
     def substitute(self, fname: str) -> Optional[str]:
         return self.rules.get('S', {}).get(fname, None)
 
+    def unrolls(self) -> dict[str, int]:
+        return self.rules.get('U', {})
+
     def paste(self) -> str:
         return self.rules.get('P', '')
 
-    def apply_rules(self, model: Model) -> str:
-        spec = [model.preamble, '']
+    def _spec(self, model: 'Model') -> Iterator[str]:
+        yield model.preamble
+        yield ''
         funcs = self.extracts()
         substitutions = self.substitutes()
         for fname, fbody in model.functions:
             if fname in funcs:
-                spec.extend([fbody, ''])
+                yield fbody
+                yield ''
             elif fname in substitutions:
-                spec.extend([substitutions.get(fname), ''])
-        spec.append(self.paste())
-        return '\n'.join(spec)
+                yield substitutions.get(fname)
+                yield ''
+        yield self.paste()
+
+    def apply_rules(self, model: 'Model') -> str:
+        return '\n'.join(self._spec(model))
+
+    # same as apply_rules, but every part is written out once it is ready
+    def write_rules(self, model: 'Model', out: TextIO):
+        parts = self._spec(model)
+        out.write(next(parts))
+        for part in parts:
+            out.write('\n')
+            out.write(part)
 
 
     class Parser:
@@ -85,6 +105,19 @@ class LookUpTable:
             self.rules['S'] = d
             return 1
 
+        # %U <fname> <bound>
+        def _accept_unroll(self, lines: list[str]) -> int:
+            parts = self._accept_single('U', lines)
+            if not parts:
+                return 0
+            if len(parts) < 3 or not parts[2].strip().isdigit():
+                return 1 # ignored, a bound is a number of iterations
+
+            d = self.rules.get('U', {})
+            d[parts[1].strip()] = int(parts[2])
+            self.rules['U'] = d
+            return 1
+
         # %P
         # ...
         # %%
@@ -114,6 +147,7 @@ class LookUpTable:
                 i += self._accept_file(lines[i:])
                 i += self._accept_extract(lines[i:])
                 i += self._accept_substitute(lines[i:])
+                i += self._accept_unroll(lines[i:])
                 i += self._accept_paste(lines[i:])
 
 
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-from typing import Tuple
+import tempfile
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
 
 
@@ -9,4 +11,49 @@ FunctionModel = Tuple[str, str]
 @dataclass
 class Model:
     preamble: str = ''
-    functions: list[FunctionModel] = field(default_factory=list)
+    functions: Iterable[FunctionModel] = field(default_factory=list)
+
+
+# Translated functions kept in a temporary file instead of memory. Only the
+# bodies of the functions passing keep are stored, others read as empty.
+class SpooledFunctions(MutableMapping):
+    def __init__(self, keep: Callable[[str], bool] = lambda _: True):
+        self._keep = keep
+        self._file = tempfile.TemporaryFile()
+        # name -> (offset, size) of the encoded body
+        self._bodies: dict[str, Optional[Tuple[int, int]]] = {}
+
+    def __setitem__(self, name: str, body: str):
+        if not self._keep(name):
+            self._bodies[name] = None
+            return
+        data = body.encode('utf-8')
+        self._file.seek(0, 2)
+        self._bodies[name] = (self._file.tell(), len(data))
+        self._file.write(data)
+
+    def __getitem__(self, name: str) -> str:
+        position = self._bodies[name]
+        if position is None:
+            return ''
+        offset, size = position
+        self._file.seek(offset)
+        return self._file.read(size).decode('utf-8')
+
+    def __delitem__(self, name: str):
+        del self._bodies[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._bodies)
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
-from typing import Optional
+from typing import Optional, Tuple
 
 from helpers import shadow_name
 
 
 class ObjectsCounter:
     def __init__(self, prefix: str, common_prefix: Optional[str] = None):
+        self._prefix = prefix
+        self._common_prefix = common_prefix
         self._counter = -1
-        self._template = shadow_name(prefix + '%d', common_prefix)
+        self._template = self._qualified(None)
+        self._outer: list[Tuple[int, str]] = []
+
+    def _qualified(self, scope: Optional[str]) -> str:
+        name = self._prefix + '%d' if scope is None \
+            else f'{scope}_{self._prefix}%d'
+        return shadow_name(name, self._common_prefix)
 
     def next(self) -> str:
         self._counter += 1
@@ -16,13 +24,23 @@ class ObjectsCounter:
     def reset(self):
         self._counter = -1
 
+    def enter(self, scope: Optional[str] = None):
+        # numbering restarts in the scope, names are qualified with the scope
+        # if given, so they stay unique outside of it
+        self._outer.append((self._counter, self._template))
+        self._counter = -1
+        if scope is not None:
+            self._template = self._qualified(scope)
+
+    def leave(self):
+        self._counter, self._template = self._outer.pop()
+
 
-class ObjectsGroupCounter:
+class ObjectsGroupCounter(ObjectsCounter):
     def __init__(self, group_prefix: str, groups: list[str],
                  common_prefix: Optional[str] = None):
-        self._counter = -1
         self._groups = groups
-        self._template = shadow_name(group_prefix + '_%s%d', common_prefix)
+        super().__init__(group_prefix + '_%s', common_prefix)
 
     def _format_group(self, group: str) -> str:
         return self._template % (group, self._counter)
@@ -30,6 +48,3 @@ class ObjectsGroupCounter:
     def next(self) -> list[str]:
         self._counter += 1
         return list(map(self._format_group, self._groups))
-
-    def reset(self):
-        self._counter = -1
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+import re
+import operator
+from collections import Counter
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, \
+    Tuple, Union
+
+from callgraph import CallGraph, callers
+from helpers import Parameter, shadow_name
+from lines import Lines
+from objects_counters import ObjectsCounter
+from processes import Bang, Call, Continue, Define, If, In, Infix, Jump, \
+    Let, Name, New, Out, Par, Select, Term
+
+
+# functions modelling the network, summarised loops never call them
+IO_FUNCTIONS = ('accept', 'connect', 'read', 'recv', 'recvfrom', 'send',
+                'sendto', 'write')
+
+
+# Optional rewritings of the translated processes, all off by default
+class Optimizations(NamedTuple):
+    inline: bool = False # inline the temporaries of expressions
+    fold: bool = False # compute the expressions of constants
+    fold_comments: bool = False # keep the C text of the computed ones
+    sequential_ifs: bool = False # continue in the branches of ifs
+    unroll: int = 0 # copies of every loop, replicated if 0
+    unrolled: Tuple[Tuple[str, int], ...] = () # the copies by function
+    havoc: bool = False # summarise the loops doing no I/O
+    io: Tuple[str, ...] = IO_FUNCTIONS # the functions doing I/O
+
+    def bound(self, function: str) -> int:
+        return dict(self.unrolled).get(function, self.unroll)
+
+    def with_callers(self, graph: CallGraph) -> 'Optimizations':
+        # the functions calling ones doing I/O do I/O as well
+        return self._replace(io=tuple(sorted(callers(graph, self.io))))
+
+
+# the temporaries of expressions are the names with this prefix
+TEMPORARY = shadow_name('tvar')
+
+
+# C integer constants, of any base and with any suffix
+INTEGER = re.compile(r'(0[xX][0-9a-fA-F]+|0[bB][01]+|0[0-7]*|[1-9][0-9]*)'
+                     r'[uUlL]*')
+
+Value = Union[int, bool]
+
+
+class Constant(str):
+    # the term of a folded expression, which knows its value
+    def __new__(cls, value: Value, text: Optional[str] = None):
+        term = ('true' if value else 'false') if isinstance(value, bool) \
+            else str(value)
+        if text is not None:
+            term += f' (* {text} *)'
+        constant = super().__new__(cls, term)
+        constant.value = value
+        return constant
+
+    def __reduce__(self):
+        return str, (str(self),)
+
+
+def constant(expr: Term) -> Optional[Value]:
+    # the value of the term, if it's a constant
+    if isinstance(expr, Constant):
+        return expr.value
+    if not isinstance(expr, str):
+        return None
+    if expr in ('true', 'false'):
+        return expr == 'true'
+    match = INTEGER.fullmatch(expr)
+    if match is None:
+        return None
+    digits = match[1]
+    return int(digits, 8) if digits[0] == '0' and digits[1:2].isdigit() \
+        else int(digits, 0)
+
+
+# operator -> its value on the values of the operands
+BINARY_FOLDINGS: dict[str, Callable[[int, int], Optional[Value]]] = {
+    '*':  operator.mul,
+    '/':  lambda a, b: a // b if b else None,
+    '%':  lambda a, b: a % b if b else None,
+    '+':  operator.add,
+    '-':  operator.sub,
+    '<<': lambda a, b: a << b if b < 64 else None,
+    '>>': operator.rshift,
+    '<':  operator.lt,
+    '>':  operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '|':  operator.or_,
+    '^':  operator.xor,
+    '&':  operator.and_,
+    '&&': lambda a, b: bool(a and b),
+    '||': lambda a, b: bool(a or b),
+}
+
+UNARY_FOLDINGS: dict[str, Callable[[int], Optional[Value]]] = {
+    '+': operator.pos,
+    '-': operator.neg,
+    '~': operator.invert,
+    '!': operator.not_,
+}
+
+
+def fold(folding: Callable[..., Optional[Value]],
+         *values: Value) -> Optional[Value]:
+    # booleans are 0 and 1 as in C; None if the value isn't a nat nor a bool
+    value = folding(*map(int, values))
+    if value is None or (not isinstance(value, bool) and value < 0):
+        return None
+    return value
+
+
+def names(term: Term) -> Iterator[str]:
+    # the names of the term, an atom may be one
+    if isinstance(term, Name):
+        yield term.name
+    elif isinstance(term, Call):
+        yield term.func
+        for arg in term.args:
+            yield from names(arg)
+    elif isinstance(term, Infix):
+        yield from names(term.left)
+        yield from names(term.right)
+    else:
+        yield term
+
+
+def substitute(term: Term, terms: dict[str, Term]) -> Term:
+    if isinstance(term, Name):
+        return terms.get(term.name, term)
+    if isinstance(term, Call):
+        return Call(term.func, [substitute(arg, terms) for arg in term.args])
+    if isinstance(term, Infix):
+        return Infix(term.op, substitute(term.left, terms),
+                     substitute(term.right, terms))
+    return terms.get(term, term)
+
+
+def _atomic(term: Term) -> bool:
+    # a name or a constant, copying it costs nothing
+    return isinstance(term, (Name, str))
+
+
+def _terms(item) -> list[Term]:
+    # terms evaluated by the item itself, before anything it binds
+    if isinstance(item, (Let, Out)):
+        return [item.term]
+    if isinstance(item, (If, Jump)):
+        return [item.cond]
+    if isinstance(item, Call):
+        return item.args
+    return []
+
+
+def _substituted(item, terms: dict[str, Term]):
+    if isinstance(item, Let):
+        return Let(item.name, substitute(item.term, terms), item.type)
+    if isinstance(item, Out):
+        return Out(item.channel, substitute(item.term, terms))
+    if isinstance(item, If):
+        return If(substitute(item.cond, terms), item.then, item.orelse)
+    if isinstance(item, Jump):
+        return Jump(substitute(item.cond, terms), item.then, item.orelse)
+    if isinstance(item, Call):
+        return substitute(item, terms)
+    return item
+
+
+def _bound(item) -> Optional[Tuple[str, ...]]:
+    # names bound by the item for the rest of the sequence, None if unknown
+    if isinstance(item, (Let, New, In)):
+        return (item.name,)
+    if isinstance(item, str):
+        return None
+    return ()
+
+
+class _Inliner:
+    def __init__(self):
+        # id of an item -> (the item, uses of names in it)
+        self._uses: dict[int, Tuple[object, Counter]] = {}
+        # id of a continuation -> (it, the inlined one)
+        self._continues: dict[int, Tuple[Continue, Continue]] = {}
+
+    def _sequence_uses(self, process: Iterable) -> Counter:
+        uses: Counter = Counter()
+        for item in Lines([process]):
+            uses.update(self.uses(item))
+        return uses
+
+    def uses(self, item) -> Counter:
+        # the processes nested in others are shared at times, so they are
+        # counted once
+        if id(item) in self._uses:
+            return self._uses[id(item)][1]
+        if isinstance(item, If):
+            uses = Counter(names(item.cond))
+            uses.update(self._sequence_uses(item.then))
+            uses.update(self._sequence_uses(item.orelse))
+        elif isinstance(item, Par):
+            uses = self._sequence_uses(item.processes)
+        elif isinstance(item, (Bang, Continue)):
+            uses = self._sequence_uses(item.process)
+        elif isinstance(item, Select):
+            uses = Counter(names(item.term))
+            for value, _ in item.cases:
+                if value is not None:
+                    uses.update(names(value))
+        else:
+            uses = Counter(name for term in _terms(item)
+                           for name in names(term))
+        self._uses[id(item)] = (item, uses)
+        return uses
+
+    def nested(self, item):
+        if isinstance(item, If):
+            return If(item.cond, self.sequence(item.then),
+                      self.sequence(item.orelse))
+        if isinstance(item, Par):
+            return Par([Bang(self.sequence(branch.process))
+                        if isinstance(branch, Bang) else self.sequence(branch)
+                        for branch in item.processes])
+        if isinstance(item, Continue):
+            # shared continuations stay shared
+            if id(item) not in self._continues:
+                self._continues[id(item)] = (
+                    item, Continue(self.sequence(item.process)))
+            return self._continues[id(item)][1]
+        return item
+
+    def _binding_uses(self, items: list) -> dict[int, int]:
+        # index of a let -> uses of its name up to the next binding of it
+        counts: dict[int, int] = {}
+        uses: Counter = Counter() # since the next binding of every name
+        for i in reversed(range(len(items))):
+            item = items[i]
+            if isinstance(item, Let):
+                counts[i] = uses[item.name]
+            for name in _bound(item) or ():
+                uses[name] = 0
+            uses.update(self.uses(item))
+        return counts
+
+    def sequence(self, process: Iterable) -> list:
+        # A temporary is inlined into the terms of the same sequence using
+        # it before it's bound again, if it's used once there or is a name or
+        # a constant, unless the names of its term get bound again in
+        # between. Its let is dropped once all the uses are inlined.
+        items = list(Lines([process]))
+        counts = self._binding_uses(items)
+        out: list = []
+        # temporary -> (index of its let, term, its names, uses left)
+        pending: dict[str, Tuple[int, Term, set[str], int]] = {}
+        for i, item in enumerate(items):
+            item = self.nested(item)
+            used = [name for term in _terms(item) for name in names(term)
+                    if name in pending]
+            if used:
+                item = _substituted(item, {name: pending[name][1]
+                                           for name in used})
+                for name in used:
+                    index, term, free, left = pending[name]
+                    if left > 1:
+                        pending[name] = (index, term, free, left - 1)
+                        continue
+                    out[index] = None
+                    del pending[name]
+            bound = _bound(item)
+            for name, (_, _, free, _) in list(pending.items()):
+                if bound is None or name in bound \
+                        or not free.isdisjoint(bound):
+                    del pending[name]
+            if isinstance(item, Let) and item.name.startswith(TEMPORARY):
+                uses = counts[i]
+                if uses == 1 or (uses and _atomic(item.term)):
+                    pending[item.name] = (len(out), item.term,
+                                          set(names(item.term)), uses)
+            out.append(item)
+        return [item for item in out if item is not None]
+
+
+def _branches(item) -> list:
+    # the processes nested in the item
+    if isinstance(item, If):
+        return [item.then, item.orelse]
+    if isinstance(item, Par):
+        return [branch.process if isinstance(branch, Bang) else branch
+                for branch in item.processes]
+    if isinstance(item, Continue):
+        return [item.process]
+    return []
+
+
+def temporaries(*processes: Iterable) -> list[str]:
+    # the temporaries bound in the processes, nested ones as well
+    bound: dict[str, None] = {}
+    stack = [iter(Lines(processes))]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, (Let, In)) and item.name.startswith(TEMPORARY):
+                bound[item.name] = None
+            branches = _branches(item)
+            if branches:
+                stack.append(iter(Lines(branches)))
+                break
+        else:
+            stack.pop()
+    return list(bound)
+
+
+class Renaming:
+    # Renames the names bound in processes, and their uses; the shared
+    # continuations of a process stay shared by the renamed one.
+    def __init__(self, names: dict[str, str]):
+        self._names = names
+        self._terms: dict[str, Term] = {old: Name(new)
+                                        for old, new in names.items()}
+        # id of a continuation -> (it, the renamed one)
+        self._continues: dict[int, Tuple[Continue, Continue]] = {}
+
+    def term(self, term: Term) -> Term:
+        return substitute(term, self._terms)
+
+    def process(self, process: Iterable) -> list:
+        return [self._item(item) for item in Lines([process])]
+
+    def _item(self, item):
+        if isinstance(item, Let):
+            return Let(self._names.get(item.name, item.name),
+                       self.term(item.term), item.type)
+        if isinstance(item, In):
+            return In(item.channel, self._names.get(item.name, item.name),
+                      item.type)
+        if isinstance(item, Out):
+            return Out(item.channel, self.term(item.term))
+        if isinstance(item, If):
+            return If(self.term(item.cond), self.process(item.then),
+                      self.process(item.orelse))
+        if isinstance(item, Jump):
+            return Jump(self.term(item.cond), item.then, item.orelse)
+        if isinstance(item, Select):
+            return Select(self.term(item.term),
+                          [(value if value is None else self.term(value), label)
+                           for value, label in item.cases], item.end)
+        if isinstance(item, Call):
+            return Call(item.func, [self.term(arg) for arg in item.args])
+        if isinstance(item, Par):
+            return Par([Bang(self.process(branch.process))
+                        if isinstance(branch, Bang) else self.process(branch)
+                        for branch in item.processes])
+        if isinstance(item, Continue):
+            if id(item) not in self._continues:
+                self._continues[id(item)] = (
+                    item, Continue(self.process(item.process)))
+            return self._continues[id(item)][1]
+        return item
+
+
+def inline(process: Iterable) -> list:
+    # single-use temporaries, and the ones renaming names or constants, are
+    # put right into the terms using them
+    return _Inliner().sequence(process)
+
+
+# shared continuations larger than this (in processes, as printed) are made
+# macros
+CONTINUATION_SIZE = 8
+
+
+def _channels(item) -> list[str]:
+    if isinstance(item, (In, Out)):
+        return [item.channel]
+    if isinstance(item, Jump):
+        return [item.then, item.orelse]
+    if isinstance(item, Select):
+        return [label for _, label in item.cases] + [item.end]
+    return []
+
+
+def _used(item) -> Iterator[str]:
+    # names the item uses itself, the ones of processes nested in it aside
+    if isinstance(item, Select):
+        yield from names(item.term)
+        for value, _ in item.cases:
+            if value is not None:
+                yield from names(value)
+    for term in _terms(item):
+        yield from names(term)
+    yield from _channels(item)
+
+
+def free_names(process: Iterable, bound: frozenset = frozenset()) \
+        -> Iterator[str]:
+    # names used by the process before it binds them, repeated at times
+    bound = set(bound)
+    for item in Lines([process]):
+        yield from (name for name in _used(item) if name not in bound)
+        if isinstance(item, If):
+            yield from free_names(item.then, frozenset(bound))
+            yield from free_names(item.orelse, frozenset(bound))
+        elif isinstance(item, Par):
+            for branch in item.processes:
+                yield from free_names(branch.process if isinstance(
+                    branch, Bang) else branch, frozenset(bound))
+        elif isinstance(item, Continue):
+            yield from free_names(item.process, frozenset(bound))
+        bound.update(_bound(item) or ())
+
+
+# name -> its type, None if unknown
+Scope = dict[str, Optional[str]]
+
+
+class _Continuations:
+    def __init__(self, function: str):
+        self.macros: list[Define] = []
+        self._names = ObjectsCounter('cont')
+        self._names.enter(function)
+        # id of a continuation -> (it, its macro if it's made one)
+        self._made: dict[int, Tuple[Continue, Optional[Define]]] = {}
+        self._sizes: dict[int, Tuple[object, int]] = {}
+        # name -> the type it's bound with in the function, None if several
+        self._types: Scope = {}
+
+    def _bind(self, scope: Scope, item):
+        if isinstance(item, (New, In)):
+            _type = item.type
+        elif isinstance(item, Let):
+            # a variable keeps its type when assigned, in macros as well
+            _type = item.type or scope.get(item.name) \
+                or self._types.get(item.name)
+        else:
+            return
+        scope[item.name] = _type
+        if _type is not None:
+            self._types[item.name] = _type \
+                if self._types.get(item.name, _type) == _type else None
+
+    def size(self, process: Iterable) -> int:
+        return sum(map(self._size, Lines([process])))
+
+    def _size(self, item) -> int:
+        # as printed, the shared processes are counted each time
+        if id(item) in self._sizes:
+            return self._sizes[id(item)][1]
+        if isinstance(item, If):
+            size = 1 + self.size(item.then) + self.size(item.orelse)
+        elif isinstance(item, Par):
+            size = sum(self.size(branch.process if isinstance(branch, Bang)
+                                 else branch) for branch in item.processes)
+        elif isinstance(item, Continue):
+            size = self.size(item.process)
+        else:
+            size = 1
+        self._sizes[id(item)] = (item, size)
+        return size
+
+    @staticmethod
+    def _params(process: Iterable,
+                scope: Scope) -> Optional[list[Parameter]]:
+        # the names of the scope the process uses, None if any of them has
+        # no known type
+        params: list[Parameter] = []
+        for name in dict.fromkeys(free_names(process)):
+            if name not in scope:
+                continue # global
+            if scope[name] is None:
+                return None
+            params.append((scope[name], name))
+        return params
+
+    def _macro(self, item: Continue, scope: Scope) -> Optional[Define]:
+        if id(item) not in self._made:
+            params = self._params(item.process, scope) \
+                if self.size(item.process) > CONTINUATION_SIZE else None
+            macro = None
+            if params is not None:
+                body = self.sequence(item.process, {name: _type for _type, name
+                                                    in params})
+                macro = Define(self._names.next(), params, body, False)
+                self.macros.append(macro)
+            self._made[id(item)] = (item, macro)
+        return self._made[id(item)][1]
+
+    def sequence(self, process: Iterable, scope: Scope) -> list:
+        scope = dict(scope)
+        out = []
+        for item in Lines([process]):
+            if isinstance(item, Continue):
+                macro = self._macro(item, scope)
+                # called where its parameters are bound the same way only
+                if macro is None or any(scope.get(name, '') != _type
+                                        for _type, name in macro.params):
+                    out.extend(self.sequence(item.process, scope))
+                else:
+                    out.append(Call(macro.name,
+                                    [name for _, name in macro.params]))
+                continue
+            if isinstance(item, If):
+                item = If(item.cond, self.sequence(item.then, scope),
+                          self.sequence(item.orelse, scope))
+            elif isinstance(item, Par):
+                item = Par([Bang(self.sequence(branch.process, scope))
+                            if isinstance(branch, Bang)
+                            else self.sequence(branch, scope)
+                            for branch in item.processes])
+            self._bind(scope, item)
+            out.append(item)
+        return out
+
+
+def continuations(function: str, params: list[Parameter],
+                  body: Iterable) -> Tuple[list[Define], list]:
+    # Shared continuations are printed in place, or made macros if they're
+    # large. Returns the macros, each defined before the ones calling it,
+    # and the body calling them.
+    extracted = _Continuations(function)
+    body = extracted.sequence(body, {name: _type for _type, name in params})
+    return extracted.macros, body
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# Prediction modes of the parser, kept apart from the translator, so the CLI
+# offers them without loading the parser
+
+SLL_THEN_LL = 'sll-ll' # SLL with fallback to LL
+SLL = 'sll'
+LL = 'll'
+PREDICTIONS = (SLL_THEN_LL, SLL, LL)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from helpers import Parameter
+from lines import Lines, split_last
+
+
+# Typed model of the emitted ProVerif processes. Listeners build these nodes
+# and only pretty() turns them into text, so nothing is parsed back from
+# strings. Terms are trees of names, calls and infix operators, a plain
+# string is an atom: a constant, or a channel of the translation.
+
+
+class Name:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return f'Name({self.name!r})'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Name) and other.name == self.name
+
+    def __hash__(self) -> int:
+        return hash(self.name)
+
+
+# a function or a constructor applied to terms, a process macro as a process
+class Call:
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: str, args: list['Term']):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return self.func + '(' + ', '.join(map(str, self.args)) + ')'
+
+
+class Infix:
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op: str, left: 'Term', right: 'Term'):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __str__(self) -> str:
+        return f'{_operand(self.left)} {self.op} {_operand(self.right)}'
+
+
+Term = Union[str, Name, Call, Infix]
+
+
+def _operand(term: Term) -> str:
+    # only infix operands of infix operators need parentheses
+    return f'({term})' if isinstance(term, Infix) else str(term)
+
+
+def applied(func: str):
+    # builds the calls of func on the terms
+    return lambda *args: Call(func, list(args))
+
+
+def infix(op: str):
+    # builds the applications of the operator to the two terms
+    return lambda left, right: Infix(op, left, right)
+
+
+class Nil:
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        return '0'
+
+
+class New:
+    __slots__ = ('name', 'type')
+
+    def __init__(self, name: str, type: str):
+        self.name = name
+        self.type = type
+
+    def __str__(self) -> str:
+        return f'new {self.name}: {self.type};'
+
+
+class Let:
+    __slots__ = ('name', 'term', 'type')
+
+    def __init__(self, name: str, term: Term, type: Optional[str] = None):
+        self.name = name
+        self.term = term
+        self.type = type
+
+    def __str__(self) -> str:
+        pattern = self.name if self.type is None \
+            else f'{self.name}: {self.type}'
+        return f'let {pattern} = {self.term} in'
+
+
+class In:
+    __slots__ = ('channel', 'name', 'type')
+
+    def __init__(self, channel: str, name: str, type: str = 'bool'):
+        self.channel = channel
+        self.name = name
+        self.type = type
+
+    def __str__(self) -> str:
+        return f'in({self.channel}, {self.name}: {self.type});'
+
+
+class Out:
+    __slots__ = ('channel', 'term')
+
+    def __init__(self, channel: str, term: Term):
+        self.channel = channel
+        self.term = term
+
+    def __str__(self) -> str:
+        return f'out({self.channel}, {self.term})'
+
+
+# passes control to the process waiting on the channel
+class Goto(Out):
+    __slots__ = ()
+
+    def __init__(self, channel: str):
+        super().__init__(channel, 'true')
+
+
+# if cond then goto then else goto orelse
+class Jump:
+    __slots__ = ('cond', 'then', 'orelse')
+
+    def __init__(self, cond: Term, then: str, orelse: str):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+    def __str__(self) -> str:
+        return f'if {self.cond} then {Goto(self.then)}' \
+            + f' else {Goto(self.orelse)}'
+
+
+# jumps to the channel of the first case equal to the term, falls to end
+# if there is none; a case without value is the default one
+class Select:
+    __slots__ = ('term', 'cases', 'end')
+
+    def __init__(self, term: Term, cases: list[Tuple[Optional[Term], str]],
+                 end: str):
+        self.term = term
+        self.cases = cases
+        self.end = end
+
+    def __str__(self) -> str:
+        selectors = [str(Goto(label)) if value is None
+                     else f'if {self.term} = {value} then {Goto(label)}'
+                     for value, label in self.cases]
+        if self.cases[-1][0] is not None:
+            selectors[-1] += f' else {Goto(self.end)}'
+        return '\nelse '.join(selectors)
+
+
+class If:
+    __slots__ = ('cond', 'then', 'orelse')
+
+    def __init__(self, cond: Term, then: Iterable, orelse: Iterable):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+    def parts(self) -> Iterator:
+        yield f'if {self.cond} then'
+        yield self.then
+        yield 'else'
+        yield self.orelse
+
+
+# a continuation several branches end with, printed in each of them or made
+# a macro they call
+class Continue:
+    __slots__ = ('process', '_extended')
+
+    def __init__(self, process: Iterable):
+        self.process = process
+        # id of a continuation -> (it, the node continuing with it)
+        self._extended: dict[int, Tuple[Iterable, 'Continue']] = {}
+
+    def extended(self, continuation: Iterable) -> 'Continue':
+        # the same node for the same continuation, so the branches still
+        # share it
+        if id(continuation) not in self._extended:
+            self._extended[id(continuation)] = (continuation, Continue(
+                sequenced(self.process, continuation)))
+        return self._extended[id(continuation)][1]
+
+
+class Comment:
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __str__(self) -> str:
+        return f'(* {self.text} *)'
+
+
+class Bang:
+    __slots__ = ('process',)
+
+    def __init__(self, process: Iterable):
+        self.process = process
+
+
+class Par:
+    __slots__ = ('processes',)
+
+    def __init__(self, processes: list[Union[Iterable, Bang]]):
+        self.processes = processes
+
+    def parts(self) -> Iterator:
+        yield '(('
+        for i, process in enumerate(self.processes):
+            if i:
+                yield REPLICATE if isinstance(process, Bang) else FORK
+            yield process.process if isinstance(process, Bang) else process
+            if i + 1 < len(self.processes):
+                yield CLOSE
+        yield '))'
+
+
+# process macro, a function returns on the u'end channel when it's done
+class Define:
+    __slots__ = ('name', 'params', 'body', 'returns')
+
+    def __init__(self, name: str, params: list[Parameter], body: Iterable,
+                 returns: bool = True):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.returns = returns
+
+
+# function symbol
+class Fun:
+    __slots__ = ('name', 'types', 'type')
+
+    def __init__(self, name: str, types: list[str], type: str):
+        self.name = name
+        self.types = types
+        self.type = type
+
+    def __str__(self) -> str:
+        return f'fun {self.name}({", ".join(self.types)}): {self.type}.'
+
+
+class Mark:
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+# layout marks of the parallel branches
+FORK, REPLICATE, CLOSE = Mark('| ('), Mark('| !('), Mark(')')
+
+# branches ended by a jump get closed on the same line
+INLINE_CLOSED = (Goto, Jump, Select)
+
+
+def pretty(process: Iterable) -> Iterator[str]:
+    line: Optional[str] = None # kept back to glue the closing parenthesis
+    prefix = ''
+    last = None
+    stack: list[Tuple[object, Iterator]] = [(None, iter(process))]
+    while stack:
+        for item in stack[-1][1]:
+            if isinstance(item, str):
+                text = item
+            elif isinstance(item, Mark):
+                if item is not CLOSE:
+                    prefix = item.text
+                    continue
+                if isinstance(last, INLINE_CLOSED):
+                    line += CLOSE.text
+                    continue
+                text = CLOSE.text
+            elif isinstance(item, (Lines, list)):
+                stack.append((None, iter(item)))
+                break
+            elif isinstance(item, (If, Par)):
+                stack.append((item, item.parts()))
+                break
+            elif isinstance(item, Jump) and isinstance(last, In):
+                # replicated dispatcher, kept on the line of its input
+                line += ' ' + str(item)
+                last = item
+                continue
+            else:
+                text = str(item)
+                last = item
+            if line is not None:
+                yield line
+            line, prefix = prefix + text, ''
+        else:
+            node, _ = stack.pop()
+            if node is not None:
+                last = node
+    if line is not None:
+        yield line
+
+
+def sequenced(process: Iterable, continuation: Iterable) -> Lines:
+    # the process followed by the continuation: a process ending with an if
+    # continues in both of its branches, one ending with a shared
+    # continuation in that one, and a 0 ending it is dropped
+    rest, last = split_last(process)
+    if isinstance(last, If):
+        rest.append(If(last.cond, sequenced(last.then, continuation),
+                       sequenced(last.orelse, continuation)))
+        return rest
+    if isinstance(last, Continue):
+        rest.append(last.extended(continuation))
+        return rest
+    if isinstance(last, Nil) and split_last(continuation)[1] is not None:
+        return Lines([rest, continuation])
+    return Lines([process, continuation])
+
+
+def define(macro: Define) -> Iterator[str]:
+    head = 'let {}({}) = '.format(macro.name, ', '.join(
+        name + ': ' + _type for _type, name in macro.params))
+    body = list(macro.body)
+    if body and isinstance(body[-1], Nil):
+        body.pop()
+    if not body:
+        yield head + ("out(u'end, true)." if macro.returns else '0.')
+        return
+    # the last process of a body continues with returning from the macro,
+    # unless it's an if, which returns in its branches
+    if not macro.returns or isinstance(body[-1], If):
+        tail = '.'
+    else:
+        tail = (' ' if isinstance(body[-1], (Let, New)) else '; ') \
+            + "out(u'end, true)."
+    lines = pretty(body)
+    line = head + next(lines)
+    for next_line in lines:
+        yield line
+        line = next_line
+    yield line + tail
+
+
+def render(node: Union[Define, Fun]) -> str:
+    return '\n'.join(define(node)) if isinstance(node, Define) else str(node)
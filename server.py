@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import os
+import json
+import socket
+import pathlib
+import tempfile
+import socketserver
+import concurrent.futures # loads the pool on use, clients don't need it
+from typing import Any, Callable, Optional
+
+
+# Requests and replies are JSON objects, one per line. A client may send
+# several requests over a connection, each one is replied in turn.
+Message = dict[str, Any]
+
+
+def default_socket() -> pathlib.Path:
+    path = os.environ.get('SUBC2PV_SOCKET')
+    if path:
+        return pathlib.Path(path)
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return pathlib.Path(runtime) / 'subc2pv.sock'
+    return pathlib.Path(tempfile.gettempdir()) / f'subc2pv-{os.getuid()}.sock'
+
+
+def request(path: pathlib.Path, message: Message) -> Optional[Message]:
+    # None if there is no daemon listening on the path
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(path))
+            client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            with client.makefile('rb') as replies:
+                reply = replies.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    return json.loads(reply) if reply else None
+
+
+def listening(path: pathlib.Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
+
+
+def failure(error: BaseException) -> Message:
+    # the reply to a request that failed, the client exits with the status
+    return {'error': f'{type(error).__name__}: {error}', 'status': 1}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self.server.pool.submit(self.server.handler,
+                                                json.loads(line)).result()
+            except Exception as e:
+                # the client waits for a reply anyway
+                reply = failure(e)
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+# Serves every client in its own thread, while requests are handled by the
+# long-lived processes of the pool, which keep the parser warm. handler must
+# be picklable, i.e. a module-level function.
+class Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: pathlib.Path, handler: Callable[[Message], Message],
+                 workers: int = 1, initializer: Optional[Callable] = None):
+        if listening(path):
+            raise Exception(f'Daemon is already running on {path}.')
+        path.unlink(missing_ok=True) # left by a daemon which didn't stop well
+        self.path = path
+        self.handler = handler
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=initializer)
+        super().__init__(str(path), RequestHandler)
+
+    def server_bind(self):
+        # only the owner may connect, the daemon writes files as them; made
+        # so by the umask, before anyone could connect
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+        self.path.unlink(missing_ok=True)
@@ -13,6 +13,18 @@ from tests.BranchingTestCase import BranchingTestCase
 from tests.ExpressionsTestCase import ExpressionsTestCase
 from tests.LoopsTestCase import LoopsTestCase
 from tests.FunctionCallTestCase import FunctionCallTestCase
+from tests.WalkersTestCase import WalkersTestCase
+from tests.LinesTestCase import LinesTestCase
+from tests.ProcessesTestCase import ProcessesTestCase
+from tests.CallGraphTestCase import CallGraphTestCase
+from tests.CacheTestCase import CacheTestCase
+from tests.ServerTestCase import ServerTestCase
+from tests.DFASnapshotTestCase import DFASnapshotTestCase
+from tests.InliningTestCase import InliningTestCase
+from tests.FoldingTestCase import FoldingTestCase
+from tests.SequentialIfsTestCase import SequentialIfsTestCase
+from tests.UnrollingTestCase import UnrollingTestCase
+from tests.HavocTestCase import HavocTestCase
 
 
 def lut_suite() -> list:
@@ -29,7 +41,19 @@ def translator_suite() -> list:
         BranchingTestCase,
         ExpressionsTestCase,
         LoopsTestCase,
-        FunctionCallTestCase
+        FunctionCallTestCase,
+        WalkersTestCase,
+        LinesTestCase,
+        ProcessesTestCase,
+        CallGraphTestCase,
+        CacheTestCase,
+        ServerTestCase,
+        DFASnapshotTestCase,
+        InliningTestCase,
+        FoldingTestCase,
+        SequentialIfsTestCase,
+        UnrollingTestCase,
+        HavocTestCase
     ]
 
 
@@ -44,7 +44,7 @@ class AssignmentsTestCase(TranslatorCommonTestCase):
             _id = len(unique) - 1
             expr = ''.join(map(lambda s: f'"{s}"', strings_case))
             source = 'void %s() { char *a; a = %s; }' % (name, expr)
-            expected = f'let {name}(u\'end: channel) = new a: bitstring;\nlet a = u\'strlit{_id} in out(u\'end, true).'
+            expected = f'let {name}(u\'end: channel) = new a: bitstring;\nlet a = u\'{name}_strlit{_id} in out(u\'end, true).'
             yield source, expected
 
     def test_single_assignment(self):
@@ -196,6 +196,38 @@ out(u'sw0_default, true))
 let selector = 16 in
 out(u'sw0_end, true))
 | (in(u'sw0_end, u'tvar5: bool);
+)); out(u'end, true).'''
+        return source, expected
+
+    def _subtest_nested_switches(self) -> Tuple[str, str]:
+        source = '''void main(int a, int b)
+{
+    switch (a) {
+        case 0: switch (b) case 1: b = 2;
+        default: a = 3;
+    }
+}'''
+        expected = '''let main(a: nat, b: nat, u'end: channel) = new u'sw1_end: channel;
+new u'sw1_default: channel;
+new u'sw1_case0: channel;
+((
+if a = 0 then out(u'sw1_case0, true)
+else out(u'sw1_default, true))
+| (in(u'sw1_case0, u'tvar3: bool);
+new u'sw0_end: channel;
+new u'sw0_case0: channel;
+((
+if b = 1 then out(u'sw0_case0, true) else out(u'sw0_end, true))
+| (in(u'sw0_case0, u'tvar0: bool);
+let b = 2 in
+out(u'sw0_end, true))
+| (in(u'sw0_end, u'tvar1: bool);
+))
+out(u'sw1_default, true))
+| (in(u'sw1_default, u'tvar2: bool);
+let a = 3 in
+out(u'sw1_end, true))
+| (in(u'sw1_end, u'tvar4: bool);
 )); out(u'end, true).'''
         return source, expected
 
@@ -203,3 +235,31 @@ out(u'sw0_end, true))
         self.check_single_function_subtest(self._subtest_switch_single_default)
         self.check_single_function_subtest(self._subtest_switch_single_case)
         self.check_single_function_subtest(self._subtest_multiple_cases_and_default)
+        self.check_single_function_subtest(self._subtest_nested_switches)
+
+    def _subtest_leading_branchings_with_rest(self) -> Tuple[str, str]:
+        source = 'void main(int a) { if (a) a = 1; switch (a) default: a = 2; a = 3; }'
+        expected = '''let main(a: nat, u'end: channel) = new u'if_end0: channel;
+((
+if a then
+let a = 1 in
+out(u'if_end0, true)
+else
+out(u'if_end0, true)
+)
+| (in(u'if_end0, u'tvar2: bool);
+new u'sw0_end: channel;
+new u'sw0_default: channel;
+((
+out(u'sw0_default, true))
+| (in(u'sw0_default, u'tvar0: bool);
+let a = 2 in
+out(u'sw0_end, true))
+| (in(u'sw0_end, u'tvar1: bool);
+let a = 3 in
+))
+)); out(u'end, true).'''
+        return source, expected
+
+    def test_branchings_in_block(self):
+        self.check_single_function_subtest(self._subtest_leading_branchings_with_rest)
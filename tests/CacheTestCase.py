@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import os
+import pathlib
+import tempfile
+import unittest
+
+import antlr4
+
+from libs.SubCLexer import SubCLexer
+from lexers import lexed
+from cache import Artifacts, DiskCache, function_keys
+from translator import Translator
+
+
+SOURCE = '''struct S { int x; };
+void foo(int x) { if (x) { x = 1; } else { x = bar(x); } }
+int bar(int y) { while (y) { y = y - 1; } }
+void baz(int z) { foo(z); z = 2; }'''
+
+EDITED = SOURCE.replace('y = y - 1;', 'y = y - 2; foo(y);')
+
+
+def keys(source: str) -> dict[str, str]:
+    return function_keys(lexed(SubCLexer(antlr4.InputStream(source))), 'v')
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = pathlib.Path(self._dir.name)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _entries(self) -> set[str]:
+        return set(os.listdir(self._path))
+
+    def test_function_keys(self):
+        original, edited = keys(SOURCE), keys(EDITED)
+        self.assertEqual(['foo', 'bar', 'baz'], list(original))
+        self.assertEqual(original['foo'], edited['foo'])
+        self.assertNotEqual(original['bar'], edited['bar'])
+        self.assertEqual(original['baz'], edited['baz'])
+        # whitespace doesn't matter, types do
+        self.assertEqual(original, keys(SOURCE.replace('; ', ';\n  ')))
+        retyped = keys(SOURCE.replace('int x; }', 'int x; int y; }'))
+        self.assertTrue(all(original[name] != retyped[name]
+                            for name in original))
+
+    def test_translation_reuse(self):
+        cache = DiskCache(self._path, version='v')
+        expected = Translator.from_line(SOURCE, False).translate()
+        self.assertEqual(expected,
+                         Translator.from_line(SOURCE, False,
+                                              cache=cache).translate())
+        self.assertEqual(set(keys(SOURCE).values()), self._entries())
+        self.assertEqual(expected,
+                         Translator.from_line(SOURCE, False,
+                                              cache=cache).translate())
+
+        expected = Translator.from_line(EDITED, False).translate()
+        self.assertEqual(expected,
+                         Translator.from_line(EDITED, False,
+                                              cache=cache).translate())
+        self.assertEqual(4, len(self._entries()))
+
+    def test_not_cached(self):
+        cache = DiskCache(self._path, version='v')
+        source = 'void foo(int x) { x = "a"; } void bar(int y) { y = 1; }'
+        Translator.from_line(source, False, selected={'foo', 'bar'},
+                             cache=cache).translate()
+        self.assertEqual({keys(source)['bar']}, self._entries())
+        # bodies which are not selected are not translated at all
+        Translator.from_line(SOURCE, False, selected={'foo'},
+                             cache=cache).translate()
+        self.assertEqual(2, len(self._entries()))
+
+    def test_eviction(self):
+        cache = DiskCache(self._path, limit=10, version='v')
+        cache.put('a', 'aaaa')
+        cache.put('b', 'bbbb')
+        os.utime(self._path / 'a', (1, 1))
+        os.utime(self._path / 'b', (2, 2))
+        self.assertEqual('aaaa', cache.get('a')) # a is the recent one now
+        cache.put('c', 'cccc')
+        self.assertEqual({'a', 'c'}, self._entries())
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(8, DiskCache(self._path, version='v')._size)
+
+    def test_parallel_reuse(self):
+        cache = DiskCache(self._path, version='v')
+        expected = Translator.from_line(EDITED, False).translate()
+        Translator.from_line(SOURCE, False, cache=cache, workers=2).translate()
+        self.assertEqual(set(keys(SOURCE).values()), self._entries())
+        self.assertEqual(expected,
+                         Translator.from_line(EDITED, False, cache=cache,
+                                              workers=2).translate())
+        self.assertEqual(4, len(self._entries()))
+
+    def test_artifacts(self):
+        artifacts = Artifacts(DiskCache(self._path, version='v'))
+        source, table = SOURCE.encode(), b'%X foo'
+        translator = Translator.from_line(SOURCE)
+        graph = translator.call_graph()
+        model = translator.translate()
+        self.assertIsNone(artifacts.call_graph(source))
+        artifacts.put_call_graph(source, graph)
+        self.assertEqual(graph, artifacts.call_graph(source))
+        self.assertEqual(list(graph), list(artifacts.call_graph(source)))
+
+        artifacts.put_model(source, {'foo', 'bar'}, model)
+        self.assertEqual(model, artifacts.model(source, ['bar', 'foo']))
+        self.assertIsNone(artifacts.model(source, {'foo'}))
+        self.assertIsNone(artifacts.model(EDITED.encode(), {'foo', 'bar'}))
+
+        artifacts.put_output(source, table, 'out')
+        self.assertEqual('out', artifacts.output(source, table))
+        self.assertIsNone(artifacts.output(source, table + b' bar'))
+        self.assertIsNone(Artifacts(DiskCache(self._path, version='w'))
+                          .output(source, table))
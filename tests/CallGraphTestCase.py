@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import unittest
+
+import antlr4
+
+from libs.SubCLexer import SubCLexer
+from lexers import lexed
+from callgraph import call_graph, callers, reachable
+from translator import Translator
+
+
+SOURCE = '''struct S { int x; };
+int foo(int x);
+int bar(int x) { if (x) { x = foo(x); } x = baz(x - 1); }
+int baz(int x) { x = bar(x) + qux(x); }
+int qux(int x) { x = 0; }
+void main() { int y = baz(1); while (y) { y = bar(y); } }
+void unused() { qux(2); }'''
+
+
+class CallGraphTestCase(unittest.TestCase):
+    def _subtest_call_graph(self):
+        graph = call_graph(lexed(SubCLexer(antlr4.InputStream(SOURCE))))
+        self.assertEqual({'bar': {'foo', 'baz'}, 'baz': {'bar', 'qux'},
+                          'qux': set(), 'main': {'baz', 'bar'},
+                          'unused': {'qux'}}, graph)
+        self.assertEqual(['bar', 'baz', 'qux', 'main', 'unused'], list(graph))
+
+    def _subtest_reachable(self):
+        graph = {'main': {'a', 'b'}, 'a': {'c'}, 'b': {'main'}, 'c': set(),
+                 'd': {'a'}}
+        self.assertEqual({'main', 'a', 'b', 'c'}, reachable(graph, ['main']))
+        self.assertEqual({'main', 'b'}, reachable(graph, ['main'], {'a'}))
+        self.assertEqual({'a', 'c'}, reachable(graph, ['a'], {'a'}))
+        self.assertEqual(set(), reachable(graph, []))
+
+    def _subtest_callers(self):
+        graph = {'main': {'a', 'b'}, 'a': {'send'}, 'b': {'c'}, 'c': set(),
+                 'd': {'a'}}
+        self.assertEqual({'send', 'a', 'main', 'd'},
+                         callers(graph, ['send']))
+        self.assertEqual({'c', 'b', 'main'}, callers(graph, ['c']))
+        self.assertEqual({'recv'}, callers(graph, ['recv']))
+
+    def _subtest_selected_reachable(self):
+        translator = Translator.from_line(SOURCE, False)
+        selected = reachable(translator.call_graph(), ['bar'])
+        self.assertEqual({'bar', 'baz', 'foo', 'qux'}, selected)
+        translator.select(selected)
+        expected = Translator.from_line(SOURCE, False,
+                                        selected=selected).translate()
+        model = translator.translate()
+        self.assertEqual(expected, model)
+        full = dict(Translator.from_line(SOURCE, False).translate().functions)
+        for name, body in model.functions:
+            if name in selected:
+                self.assertEqual(full[name], body)
+
+    def test_call_graph(self):
+        for subtest in (self._subtest_call_graph,
+                        self._subtest_reachable,
+                        self._subtest_callers,
+                        self._subtest_selected_reachable):
+            with self.subTest(subtest.__name__):
+                subtest()
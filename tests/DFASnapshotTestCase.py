@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import pickle
+import pathlib
+import tempfile
+import unittest
+
+import dfa
+from translator import Translator
+
+
+SOURCE = '''void foo(int x) { if (x > 1) { x = x + 1; } else { x = bar(x); } }
+int bar(int y) { while (y) { y = y - 1; } }'''
+
+
+def translated(source: str) -> str:
+    model = Translator.from_line(source).translate()
+    return model.preamble + ''.join(body for _, body in model.functions)
+
+
+class DFASnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = pathlib.Path(self._dir.name) / 'dfa.pickle'
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_missing(self):
+        self.assertFalse(dfa.load(self._path))
+
+    def test_other_grammar(self):
+        with open(self._path, 'wb') as snapshot:
+            pickle.dump(('other', []), snapshot)
+        self.assertFalse(dfa.load(self._path))
+
+    def _write_body(self, body: bytes):
+        with open(self._path, 'wb') as snapshot:
+            snapshot.write(dfa.grammar_hash().encode('ascii') + b'\n' + body)
+
+    def test_forbidden_class(self):
+        # the body of a snapshot never runs code
+        marker = pathlib.Path(self._dir.name) / 'ran'
+
+        class Touch:
+            def __reduce__(self):
+                return pathlib.Path.touch, (marker,)
+        self._write_body(pickle.dumps(Touch()))
+        self.assertFalse(dfa.load(self._path))
+        self.assertFalse(marker.exists())
+
+    def test_incompatible_body(self):
+        # unknown modules and corrupted data are taken for a missing snapshot
+        self._write_body(b'\x80\x04\x95\x00\x00\x00\x00\x00\x00\x00\x00'
+                         b'\x8c\x0eantlr4.missing\x8c\x01X\x93.')
+        self.assertFalse(dfa.load(self._path))
+        self._write_body(b'garbage')
+        self.assertFalse(dfa.load(self._path))
+
+    def test_round_trip(self):
+        expected = translated(SOURCE)
+        dfa.save(self._path)
+        known = dfa.states()
+        self.assertTrue(dfa.load(self._path))
+        self.assertEqual(dfa.states(), known)
+        self.assertEqual(translated(SOURCE), expected)
+
+    def test_preload(self):
+        known = dfa.preload(self._path)
+        self.assertTrue(self._path.exists())
+        self.assertEqual(dfa.preload(self._path), known)
@@ -32,7 +32,7 @@ class ExpressionsTestCase(TranslatorCommonTestCase):
     def _subtest_ternary_funcall(self, subc_tmplt: str,
                                  pv_tmplt: str) -> Tuple[str, str]:
         return (subc_tmplt % ('foo(42, true, "text")'),
-                pv_tmplt % ('let u\'tvar0 = foo(42, true, u\'strlit0) in\n',
+                pv_tmplt % ('let u\'tvar0 = foo(42, true, u\'foo_strlit0) in\n',
                             'u\'tvar0'))
 
     def _subtest_sizeof(self, subc_tmplt: str, pv_tmplt: str) -> Tuple[str, str]:
@@ -194,3 +194,49 @@ class ExpressionsTestCase(TranslatorCommonTestCase):
         self.check_single_function_subtest(self._subtest_disjunction, subc_tmplt, pv_tmplt)
         self.check_single_function_subtest(self._subtest_conjuction, subc_tmplt, pv_tmplt)
         self.check_single_function_subtest(self._subtest_conditional, subc_tmplt, pv_tmplt)
+
+    def _subtest_same_precedence(self) -> Tuple[str, str]:
+        source = 'void foo(int a, int b, int c) { a = a - b + c * 2 / b % 3; }'
+        expected = '''let foo(a: nat, b: nat, c: nat, u'end: channel) = let u'tvar0: nat = u'mod(b, 3) in
+let u'tvar1: nat = u'div(2, u'tvar0) in
+let u'tvar2: nat = u'mul(c, u'tvar1) in
+let u'tvar3: nat = b + u'tvar2 in
+let u'tvar4: nat = a - u'tvar3 in
+let a = u'tvar4 in out(u'end, true).'''
+        return source, expected
+
+    def _subtest_mixed_precedence(self) -> Tuple[str, str]:
+        source = 'void foo(int a, int b, int c) { a = -a * b++ + ~c - !a; }'
+        expected = '''let foo(a: nat, b: nat, c: nat, u'end: channel) = let u'tvar4: bool = not(a) in
+let u'tvar3: nat = u'not(c) in
+let u'tvar5: nat = u'tvar3 - u'tvar4 in
+let u'tvar1: nat = b + 1 in
+let u'tvar0: nat = 0 - a in
+let u'tvar2: nat = u'mul(u'tvar0, u'tvar1) in
+let u'tvar6: nat = u'tvar2 + u'tvar5 in
+let a = u'tvar6 in out(u'end, true).'''
+        return source, expected
+
+    def _subtest_nested_conditionals(self) -> Tuple[str, str]:
+        source = 'void foo(int a, int b, int c) { a = a ? b : c ? a + 1 : b; }'
+        expected = '''let foo(a: nat, b: nat, c: nat, u'end: channel) = let u'tvar0: nat = a + 1 in
+let u'tvar1 = u'ternary(c, u'tvar0, b) in
+let u'tvar2 = u'ternary(a, b, u'tvar1) in
+let a = u'tvar2 in out(u'end, true).'''
+        return source, expected
+
+    def _subtest_long_sum(self, terms: int) -> Tuple[str, str]:
+        source = 'void foo(int a) { a = %s; }' % ' + '.join(map(str, range(terms)))
+        lines, prev = [], str(terms - 1)
+        for i in range(terms - 1):
+            lines.append('let u\'tvar%d: nat = %d + %s in\n' % (i, terms - 2 - i, prev))
+            prev = 'u\'tvar%d' % i
+        expected = 'let foo(a: nat, u\'end: channel) = %slet a = %s in out(u\'end, true).' \
+            % (''.join(lines), prev)
+        return source, expected
+
+    def test_compound_expressions(self):
+        self.check_single_function_subtest(self._subtest_same_precedence)
+        self.check_single_function_subtest(self._subtest_mixed_precedence)
+        self.check_single_function_subtest(self._subtest_nested_conditionals)
+        self.check_single_function_subtest(self._subtest_long_sum, 10000)
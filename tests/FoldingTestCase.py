@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import pickle
+from typing import Tuple
+
+from optimizations import Constant, Optimizations, constant
+from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
+
+
+# the statements are translated in a function of their own
+SOURCE = 'void f(int a) {{ int x; {} }}'
+EXPECTED = "let f(a: nat, u'end: channel) = new x: nat;\n{} out(u'end, true)."
+
+
+def function(statements: str, expected: str) -> Tuple[str, str]:
+    return SOURCE.format(statements), EXPECTED.format(expected)
+
+
+class FoldingTestCase(TranslatorCommonTestCase):
+    optimizations = Optimizations(fold=True)
+
+    def _subtest_constants(self):
+        for literal, value in (('42', 42), ('0x1F', 31), ('010', 8),
+                               ('0b101', 5), ('7UL', 7), ('0', 0),
+                               ('true', True), ('a', None), ('1.5', None)):
+            self.assertEqual(value, constant(literal), literal)
+        self.assertEqual('16', pickle.loads(pickle.dumps(Constant(16))))
+
+    def test_constants(self):
+        self.at_subtest(self._subtest_constants)
+
+    def _subtest_arithmetic(self) -> list[Tuple[str, str]]:
+        return [function('x = 4 * 4 + 2;', 'let x = 18 in'),
+                function('x = (1 << 4) / 5 % 4 + (6 & 3);', 'let x = 5 in')]
+
+    def _subtest_left_grouping(self) -> list[Tuple[str, str]]:
+        # a - b - c is translated as a - (b - c), but folded as in C
+        return [function('x = 10 - 2 - 3 + a;',
+                         "let u'tvar0: nat = 5 + a in\nlet x = u'tvar0 in")]
+
+    def _subtest_booleans(self) -> list[Tuple[str, str]]:
+        return [function('x = !0 && 3 >= 2;', 'let x = true in'),
+                function('x = 1 == 2;', 'let x = false in')]
+
+    def _subtest_ternary(self) -> list[Tuple[str, str]]:
+        return [function('x = 2 > 1 ? a * 2 : a / 2;',
+                         "let u'tvar0: nat = u'mul(a, 2) in\n"
+                         "let x = u'tvar0 in"),
+                function('x = 0 ? a : 3;', 'let x = 3 in')]
+
+    def _subtest_not_nats(self) -> list[Tuple[str, str]]:
+        # nats of ProVerif aren't negative, and C doesn't define the rest
+        return [function('x = 1 - 2;',
+                         "let u'tvar0: nat = 1 - 2 in\nlet x = u'tvar0 in"),
+                function('x = 1 / 0;', "let u'tvar0: nat = u'div(1, 0) in\n"
+                         "let x = u'tvar0 in"),
+                function('x = ~0;',
+                         "let u'tvar0: nat = u'not(0) in\nlet x = u'tvar0 in")]
+
+    def test_folding(self):
+        self.check_single_function_subtests(self._subtest_arithmetic)
+        self.check_single_function_subtests(self._subtest_left_grouping)
+        self.check_single_function_subtests(self._subtest_booleans)
+        self.check_single_function_subtests(self._subtest_ternary)
+        self.check_single_function_subtests(self._subtest_not_nats)
+
+    def _subtest_comments(self) -> Tuple[str, str]:
+        return function('x = a + 2 * 3; x = 4 *\n (4) + 2;',
+                        "let u'tvar0: nat = a + 6 (* 2 * 3 *) in\n"
+                        "let x = u'tvar0 in\n"
+                        "let x = 18 (* 4 * (4) + 2 *) in")
+
+    def test_comments(self):
+        self.check_single_function_subtest(
+            self._subtest_comments,
+            optimizations=Optimizations(fold=True, fold_comments=True))
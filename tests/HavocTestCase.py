@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+from typing import Tuple
+
+from optimizations import Optimizations
+from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
+
+
+class HavocTestCase(TranslatorCommonTestCase):
+    optimizations = Optimizations(havoc=True)
+
+    def _subtest_while(self) -> Tuple[str, str]:
+        # the variables declared in the loop aren't bound again
+        source = '''void f(int a) {
+            int x;
+            while (a > 0) { int t; t = a * 2; x = x + t; a = a - 1; }
+            a = x;
+        }'''
+        expected = '''let f(a: nat, u'end: channel) = new x: nat;
+(* loop summarised, havoc x, a *)
+new x: nat;
+new a: nat;
+let a = x in out(u'end, true).'''
+        return source, expected
+
+    def _subtest_for(self) -> Tuple[str, str]:
+        source = 'void f(int a) { int i; for (i = 0; i < a; i += 1) ' \
+            '{ a = a - 1; } }'
+        expected = '''let f(a: nat, u'end: channel) = new i: nat;
+(* loop summarised, havoc i, a *)
+new i: nat;
+new a: nat; out(u'end, true).'''
+        return source, expected
+
+    def test_summaries(self):
+        self.check_single_function_subtest(self._subtest_while)
+        self.check_single_function_subtest(self._subtest_for)
+
+    def _subtest_io(self):
+        source = '''void f(int a, char *s) {
+            while (a > 0) { send(s, a); a = a - 1; }
+        }'''
+        _, text = self.translate(source).functions[0]
+        self.assertNotIn('summarised', text)
+        _, text = self.translate(source, Optimizations(
+            havoc=True, io=('recv',))).functions[0]
+        self.assertIn('summarised', text)
+
+    def _subtest_callers(self):
+        # g does I/O by calling send, h doesn't
+        model = self.translate('''void g(char *s, int x) { send(s, x); }
+            void h(int x) { x = x + 1; }
+            void f(int a, char *s) {
+                while (a > 0) { g(s, a); a = a - 1; }
+                while (a < 5) { h(a); a = a + 1; }
+            }''')
+        _, text = model.functions[-1]
+        self.assertEqual(1, text.count('summarised'))
+        self.assertIn("new u'while_begin0: channel;", text)
+
+    def _subtest_unknown_type(self):
+        # y isn't declared, its type is unknown
+        _, text = self.translate(
+            'void f(int a) { do { y = a; } while (a > 0); }').functions[0]
+        self.assertNotIn('summarised', text)
+
+    def test_kept_loops(self):
+        self.at_subtest(self._subtest_io)
+        self.at_subtest(self._subtest_callers)
+        self.at_subtest(self._subtest_unknown_type)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+from typing import Tuple
+
+from processes import Call, Continue, Goto, If, In, Infix, Let, Name, New, \
+    Out, Par, pretty
+from optimizations import Optimizations, inline
+from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
+
+
+T0, T1, T2 = "u'tvar0", "u'tvar1", "u'tvar2"
+A, B, C, E, X, Y = map(Name, 'abcexy')
+
+
+class InliningTestCase(TranslatorCommonTestCase):
+    optimizations = Optimizations(inline=True)
+
+    def _subtest_single_use(self):
+        process = [Let(T0, Call("u'mul", [A, B]), 'nat'),
+                   Let(T1, Infix('-', C, E), 'nat'),
+                   Let(T2, Infix('+', Name(T0), Name(T1)), 'nat'),
+                   Let('x', Name(T2)),
+                   If(Infix('>', X, '1'), [Goto('e')], [Goto('e')])]
+        self.assertEqual(["let x = u'mul(a, b) + (c - e) in", 'if x > 1 then',
+                          'out(e, true)', 'else', 'out(e, true)'],
+                         list(pretty(inline(process))))
+
+    def _subtest_renamings(self):
+        process = [Let(T0, A), Let('x', Infix('+', Name(T0), '1')),
+                   Out('c', Call('f', [Name(T0), Name(T0)]))]
+        self.assertEqual(['let x = a + 1 in', 'out(c, f(a, a))'],
+                         list(pretty(inline(process))))
+
+    def _subtest_rebound_names(self):
+        process = [Let(T0, Infix('+', X, '1'), 'nat'), Let('x', '2'),
+                   Let('y', Name(T0)), Let(T1, Y), New('y', 'nat'),
+                   Out('c', Name(T1))]
+        self.assertEqual(process, inline(process))
+
+    def _subtest_nested_uses(self):
+        # a term failing in a branch only would change the process
+        process = [Let(T0, Call("u'div", [A, B])),
+                   Par([[In('c', 'v'), Let('x', Name(T0))], [Goto('c')]])]
+        self.assertEqual(list(pretty(process)), list(pretty(inline(process))))
+
+    def _subtest_rebound_temporaries(self):
+        # the uses of a temporary are counted up to its next binding
+        process = [Let(T0, Infix('-', A, '1'), 'nat'), Let('a', Name(T0)),
+                   Let(T0, Infix('-', A, '1'), 'nat'), Let('a', Name(T0)),
+                   Out('c', Name(T0))]
+        self.assertEqual(['let a = a - 1 in', "let u'tvar0: nat = a - 1 in",
+                          "let a = u'tvar0 in", "out(c, u'tvar0)"],
+                         list(pretty(inline(process))))
+
+    def _subtest_continuations(self):
+        end = Continue([Let(T0, Infix('+', A, '1'), 'nat'),
+                        Out('c', Name(T0))])
+        inlined = inline([If(A, [Let('a', '1'), end], [end])])
+        self.assertIs(inlined[0].then[-1], inlined[0].orelse[-1])
+        self.assertEqual(['out(c, a + 1)'],
+                         list(pretty(inlined[0].orelse[-1].process)))
+
+    def test_inline(self):
+        self.at_subtest(self._subtest_single_use)
+        self.at_subtest(self._subtest_renamings)
+        self.at_subtest(self._subtest_rebound_names)
+        self.at_subtest(self._subtest_nested_uses)
+        self.at_subtest(self._subtest_rebound_temporaries)
+        self.at_subtest(self._subtest_continuations)
+
+    def _subtest_unrolled(self) -> Tuple[str, str]:
+        source = 'void f(int a) { do { a = a - 1; } while (a > 0); }'
+        expected = '''let f(a: nat, u'end: channel) = \
+(* loop unrolled, bound 2 *)
+let a = a - 1 in
+if a > 0 then
+let a = a - 1 in
+out(u'end, true)
+else
+out(u'end, true).'''
+        return source, expected
+
+    def _subtest_sequential_ifs(self) -> Tuple[str, str]:
+        # in the continuation macros as well
+        source = '''void f(int a) {
+            if (a > 0) { a = a - 1; }
+            a = a * 2; a = a + 3; a = a - 4; a = a * 5; a = a + 6;
+        }'''
+        expected = '''let u'f_cont0(a: nat, u'end: channel) = \
+let a = u'mul(a, 2) in
+let a = a + 3 in
+let a = a - 4 in
+let a = u'mul(a, 5) in
+let a = a + 6 in
+out(u'end, true).
+let f(a: nat, u'end: channel) = if a > 0 then
+let a = a - 1 in
+u'f_cont0(a, u'end)
+else
+u'f_cont0(a, u'end).'''
+        return source, expected
+
+    def _subtest_translation(self) -> Tuple[str, str]:
+        source = 'void f(int a, int b) { int x; x = a * b + 1; x += a; }'
+        expected = "let f(a: nat, b: nat, u'end: channel) = new x: nat;\n" \
+            "let x = u'mul(a, b) + 1 in\n" \
+            "let x = x + a in out(u'end, true)."
+        return source, expected
+
+    def test_translation(self):
+        self.check_single_function_subtest(self._subtest_translation)
+        self.check_functions_subtest(self._subtest_unrolled,
+                                     optimizations=Optimizations(
+                                         inline=True, unroll=2))
+        self.check_functions_subtest(self._subtest_sequential_ifs,
+                                     optimizations=Optimizations(
+                                         inline=True, sequential_ifs=True))
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
+import io
 import unittest
 import pathlib
 
 from lut import LookUpTable
+from model import Model
 
 
 class LUTBasicDirectivesTestCase(unittest.TestCase):
@@ -110,3 +112,22 @@ process
         for paste in self._stress_pastes:
             lut = LookUpTable.from_line(self._paste_template.format(paste))
             self.assertEqual(lut.paste(), paste + '\n')
+
+    def test_write_rules(self):
+        model = Model('type t.', [('client', 'let client() = 0.'),
+                                  ('server', 'let server() = 0.'),
+                                  ('main', 'let main() = 0.')])
+        lut = LookUpTable.from_line('%X client\n%S main fun main(): nat.\n'
+                                    + self._paste_template.format('process 0'))
+        out = io.StringIO()
+        lut.write_rules(model, out)
+        self.assertEqual(lut.apply_rules(model), out.getvalue())
+        self.assertEqual('type t.\n\nlet client() = 0.\n\nfun main(): nat.\n'
+                         '\nprocess 0\n', out.getvalue())
+
+    def test_add_extracts(self):
+        lut = LookUpTable.from_line('%S main fun main(): nat.')
+        lut.add_extracts({'client'})
+        self.assertTrue(lut.extract('client'))
+        lut.add_extracts(['server'])
+        self.assertEqual({'client', 'server'}, lut.extracts())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import unittest
+
+from lines import Lines
+
+
+class LinesTestCase(unittest.TestCase):
+    def _subtest_append_and_extend(self):
+        lines = Lines(['a'])
+        lines.append('b')
+        lines.extend(['c', 'd'])
+        lines.extend(Lines(['e']))
+        lines.extend(line for line in ['f'])
+        self.assertEqual(['a', 'b', 'c', 'd', 'e', 'f'], list(lines))
+
+    def _subtest_deep_nesting(self):
+        depth = 100000
+        lines = Lines(['0'])
+        for i in range(1, depth):
+            lines = Lines([str(i), lines, str(i)])
+        flattened = list(lines)
+        self.assertEqual(2 * depth - 1, len(flattened))
+        self.assertEqual(['1', '0', '1'], flattened[depth - 2:depth + 1])
+
+    def _subtest_shared_buffer(self):
+        shared = ['x']
+        lines = Lines()
+        lines.extend(shared)
+        lines.append('y')
+        lines.extend(shared)
+        self.assertEqual('x\ny\nx', '\n'.join(lines))
+
+    def test_lines(self):
+        for subtest in (self._subtest_append_and_extend,
+                        self._subtest_deep_nesting,
+                        self._subtest_shared_buffer):
+            with self.subTest(subtest.__name__):
+                subtest()
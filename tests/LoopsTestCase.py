@@ -92,7 +92,7 @@ out(u'while_cond0, false)
 )
 | !(in(u'while_cond0, u'while_var0: bool); if u'while_var0 then out(u'while_begin0, true) else out(u'while_end0, true))
 | !(in(u'while_begin0, u'tvar0: bool);
-let foo = u'strlit0 in
+let foo = u'main_strlit0 in
 out(u'while_cond0, false)
 )
 | (in(u'while_end0, u'tvar1: bool);
@@ -183,3 +183,37 @@ out(u'for_cond0, true)
         self.check_single_function_subtest(self._subtest_no_cond_for)
         self.check_single_function_subtest(self._subtest_no_iter_for)
         self.check_single_function_subtest(self._subtest_infinite_for)
+
+    def _subtest_leading_loops_with_rest(self) -> Tuple[str, str]:
+        source = 'void main(int a) { while (a) a = 1; for (;;) a = 2; a = 3; }'
+        expected = '''let main(a: nat, u'end: channel) = new u'while_begin0: channel;
+new u'while_end0: channel;
+new u'while_cond0: channel;
+((
+out(u'while_cond0, a)
+)
+| !(in(u'while_cond0, u'while_var0: bool); if u'while_var0 then out(u'while_begin0, true) else out(u'while_end0, true))
+| !(in(u'while_begin0, u'tvar2: bool);
+let a = 1 in
+out(u'while_cond0, a)
+)
+| (in(u'while_end0, u'tvar3: bool);
+new u'for_begin0: channel;
+new u'for_end0: channel;
+new u'for_cond0: channel;
+((
+out(u'for_cond0, true)
+)
+| !(in(u'for_cond0, u'for_var0: bool); if u'for_var0 then out(u'for_begin0, true) else out(u'for_end0, true))
+| !(in(u'for_begin0, u'tvar0: bool);
+let a = 2 in
+out(u'for_cond0, true)
+)
+| (in(u'for_end0, u'tvar1: bool);
+let a = 3 in
+))
+)); out(u'end, true).'''
+        return source, expected
+
+    def test_loops_in_block(self):
+        self.check_single_function_subtest(self._subtest_leading_loops_with_rest)
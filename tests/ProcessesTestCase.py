@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import unittest
+
+from lines import Lines
+from processes import Bang, Call, Define, Fun, Goto, If, In, Infix, Jump, \
+    Let, Name, New, Nil, Out, Par, Select, pretty, render, sequenced
+
+
+class ProcessesTestCase(unittest.TestCase):
+    def _subtest_parallel_branches(self):
+        process = [New('c', 'channel'), Par([
+            [Goto('c')],
+            Bang([In('c', 'v'), Jump('v', 'b', 'e')]),
+            [In('b', 't'), Call('f', ['x', 'e'])],
+            [In('e', 't'), Let('x', '1')]])]
+        self.assertEqual(['new c: channel;', '((', 'out(c, true))',
+                          '| !(in(c, v: bool); if v then out(b, true)'
+                          ' else out(e, true))',
+                          '| (in(b, t: bool);', 'f(x, e)', ')',
+                          '| (in(e, t: bool);', 'let x = 1 in', '))'],
+                         list(pretty(process)))
+
+    def _subtest_branches_and_selectors(self):
+        process = [If('a', [Goto('e')], [Let('x', 'y', 'nat'), Goto('e')]),
+                   Select('s', [('0', 'c0'), (None, 'd')], 'e'),
+                   Select('s', [('1', 'c1')], 'e')]
+        self.assertEqual(['if a then', 'out(e, true)', 'else',
+                          'let x: nat = y in', 'out(e, true)',
+                          'if s = 0 then out(c0, true)\nelse out(d, true)',
+                          'if s = 1 then out(c1, true) else out(e, true)'],
+                         list(pretty(process)))
+
+    def _subtest_definitions(self):
+        params = [('nat', 'a'), ('channel', "u'end")]
+        self.assertEqual("let f(a: nat, u'end: channel) = out(u'end, true).",
+                         render(Define('f', params, [Nil()])))
+        self.assertEqual("let f(a: nat, u'end: channel) = new x: nat;\n"
+                         "let x = a in out(u'end, true).",
+                         render(Define('f', params,
+                                       [New('x', 'nat'), Let('x', 'a')])))
+        self.assertEqual("let f(a: nat, u'end: channel) = new x: nat;"
+                         " out(u'end, true).",
+                         render(Define('f', params, [New('x', 'nat')])))
+        self.assertEqual("let f(a: nat, u'end: channel) = out(c, a);"
+                         " out(u'end, true).",
+                         render(Define('f', params, [Out('c', 'a')])))
+        self.assertEqual('fun g(nat, bool): nat.',
+                         render(Fun('g', ['nat', 'bool'], 'nat')))
+
+    def _subtest_deep_nesting(self):
+        depth = 20000
+        process = Lines([Goto('e')])
+        for _ in range(depth):
+            process = Lines([If('a', process, [Goto('e')])])
+        lines = list(pretty(process))
+        self.assertEqual(3 * depth + 1, len(lines))
+        self.assertEqual(['if a then', 'out(e, true)', 'else', 'out(e, true)'],
+                         lines[depth - 1:depth + 3])
+
+    def _subtest_sequenced(self):
+        process = Lines([Let('x', '1'), Lines([If('c', [Let('x', '2')],
+                                                  [Nil()]), Lines()])])
+        self.assertEqual(['let x = 1 in', 'if c then', 'let x = 2 in',
+                          'out(e, true)', 'else', 'out(e, true)'],
+                         list(pretty(sequenced(process, [Goto('e')]))))
+        self.assertEqual(['0'], list(pretty(sequenced([Nil()], Lines()))))
+        self.assertEqual(["let f(u'end: channel) = if c then", '0', 'else',
+                          '0.'], render(Define('f', [('channel', "u'end")],
+                                               [If('c', [Nil()], [Nil()])]))
+                         .split('\n'))
+
+    def _subtest_terms(self):
+        # infix operands of infix operators are put in parentheses only
+        a, b = Name('a'), Name('b')
+        term = Infix('-', Infix('+', a, '1'), Call("u'mul", [Infix('+', a, b),
+                                                              b]))
+        self.assertEqual("let x = (a + 1) - u'mul(a + b, b) in",
+                         str(Let('x', term)))
+        self.assertEqual(Name('a'), a)
+        self.assertNotEqual(Name('a'), 'a')
+
+    def test_processes(self):
+        for subtest in (self._subtest_parallel_branches,
+                        self._subtest_branches_and_selectors,
+                        self._subtest_definitions,
+                        self._subtest_deep_nesting,
+                        self._subtest_sequenced,
+                        self._subtest_terms):
+            with self.subTest(subtest.__name__):
+                subtest()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+from typing import Tuple
+
+from optimizations import Optimizations
+from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
+
+
+class SequentialIfsTestCase(TranslatorCommonTestCase):
+    optimizations = Optimizations(sequential_ifs=True)
+
+    def _subtest_continuation(self) -> Tuple[str, str]:
+        source = 'void f(int a) { int x; if (a > 1) ' \
+            '{ x = 1; } else { x = 2; } a = x; }'
+        expected = '''let f(a: nat, u'end: channel) = new x: nat;
+let u'tvar0: bool = a > 1 in
+if u'tvar0 then
+let x = 1 in
+let a = x in
+out(u'end, true)
+else
+let x = 2 in
+let a = x in
+out(u'end, true).'''
+        return source, expected
+
+    def _subtest_macro(self) -> Tuple[str, str]:
+        source = '''void f(int a, char *s) {
+            int x;
+            if (a > 1) { x = 1; }
+            a = x + a; x = a * 2; x = x / 3; x = x - a;
+            s = g(s, x); a = x + 1; x = a;
+        }'''
+        expected = '''let u'f_cont0(x: nat, a: nat, s: bitstring, u'end: channel) = \
+let u'tvar1: nat = x + a in
+let a = u'tvar1 in
+let u'tvar2: nat = u'mul(a, 2) in
+let x = u'tvar2 in
+let u'tvar3: nat = u'div(x, 3) in
+let x = u'tvar3 in
+let u'tvar4: nat = x - a in
+let x = u'tvar4 in
+let u'tvar5 = g(s, x) in
+let s = u'tvar5 in
+let u'tvar6: nat = x + 1 in
+let a = u'tvar6 in
+let x = a in
+out(u'end, true).
+let f(a: nat, s: bitstring, u'end: channel) = new x: nat;
+let u'tvar0: bool = a > 1 in
+if u'tvar0 then
+let x = 1 in
+u'f_cont0(x, a, s, u'end)
+else
+u'f_cont0(x, a, s, u'end).'''
+        return source, expected
+
+    def _subtest_nested_ifs(self) -> Tuple[str, str]:
+        # the continuation of the outer if goes on in both inner branches
+        source = 'void f(int a) { int x; if (a > 1) ' \
+            '{ if (a > 2) { x = 1; } } a = x; }'
+        expected = '''let f(a: nat, u'end: channel) = new x: nat;
+let u'tvar0: bool = a > 1 in
+if u'tvar0 then
+let u'tvar1: bool = a > 2 in
+if u'tvar1 then
+let x = 1 in
+let a = x in
+out(u'end, true)
+else
+let a = x in
+out(u'end, true)
+else
+let a = x in
+out(u'end, true).'''
+        return source, expected
+
+    def test_continuations(self):
+        self.check_single_function_subtest(self._subtest_continuation)
+        self.check_functions_subtest(self._subtest_macro)
+        self.check_single_function_subtest(self._subtest_nested_ifs)
+
+    def _subtest_loops(self):
+        # branches with loops synchronise on a channel as before, while ifs
+        # in loops go on with the loop
+        source = '''void f(int a) {
+            int x;
+            if (a) { while (x) { x = x - 1; } }
+        }'''
+        self.assertIn("in(u'if_end0, ", self.translate(source).functions[0][1])
+        source = '''void f(int a) {
+            int x;
+            while (a) { if (x) { x = 1; } }
+        }'''
+        self.assertIn('''if x then
+let x = 1 in
+out(u'while_cond0, a)
+else
+out(u'while_cond0, a)''', self.translate(source).functions[0][1])
+
+    def test_loops(self):
+        self.at_subtest(self._subtest_loops)
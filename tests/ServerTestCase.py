@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import pathlib
+import tempfile
+import threading
+import unittest
+
+from server import Message, Server, listening, request
+
+
+def echo(message: Message) -> Message:
+    return {'echo': message}
+
+
+def fail(message: Message) -> Message:
+    raise ValueError(f'cannot handle {message}')
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._socket = pathlib.Path(self._dir.name) / 'subc2pv.sock'
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_no_daemon(self):
+        self.assertFalse(listening(self._socket))
+        self.assertIsNone(request(self._socket, {'source': ''}))
+
+    def test_round_trip(self):
+        server = Server(self._socket, echo)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            self.assertTrue(listening(self._socket))
+            self.assertEqual(0o600, self._socket.stat().st_mode & 0o777)
+            with self.assertRaises(Exception):
+                Server(self._socket, echo)
+            message = {'source': 'void f() {}', 'lut': ''}
+            self.assertEqual(request(self._socket, message), {'echo': message})
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self.assertFalse(self._socket.exists())
+
+    def test_failed_request(self):
+        server = Server(self._socket, fail)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            # the client gets a reply with a failure status
+            self.assertEqual({'error': "ValueError: cannot handle {'a': 1}",
+                              'status': 1}, request(self._socket, {'a': 1}))
+            self.assertEqual(1, request(self._socket, {})['status'])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
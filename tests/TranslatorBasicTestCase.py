@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
+import sys
+import pathlib
+import tempfile
 from typing import Tuple
 
+from cache import DiskCache
 from translator import Translator
+from model import SpooledFunctions
 from auxilaries.globals import GLOBALS
 from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
 
@@ -17,3 +22,155 @@ class TranslatorBasicTestCase(TranslatorCommonTestCase):
     def test_empty_stream(self):
         self.check_preamble_subtest(self._subtest_empty_stream)
         self.at_subtest(self._subtest_empty_stream_with_helpers)
+
+    def _subtest_same_model_for_any_prediction(self):
+        source = 'enum E { A, B }; struct S { int x; }; int foo(enum E e);'
+        models = [Translator.from_line(source, False, prediction).translate()
+                  for prediction in Translator.PREDICTIONS]
+        for model in models[1:]:
+            self.assertEqual(models[0], model)
+
+    def _subtest_ll_fallback_on_syntax_error(self):
+        fallbacks = Translator.ll_fallbacks
+        Translator.from_line('enum E { A', False).translate()
+        self.assertEqual(fallbacks + 1, Translator.ll_fallbacks)
+        Translator.from_line('enum E { A };', False).translate()
+        self.assertEqual(fallbacks + 1, Translator.ll_fallbacks)
+
+    def test_prediction_modes(self):
+        self.at_subtest(self._subtest_same_model_for_any_prediction)
+        self.at_subtest(self._subtest_ll_fallback_on_syntax_error)
+
+    def _subtest_same_model_in_low_memory_mode(self):
+        source = '''enum E { A, B };
+struct S { int x; };
+int foo(enum E e);
+void bar(int x) { while (x) x = x - 1; baz(x); x = 2; }
+void baz(int y) { if (y > 1) y = foo(y) + 1; else y = 0; }'''
+        for prediction in Translator.PREDICTIONS:
+            self.assertEqual(
+                Translator.from_line(source, False, prediction).translate(),
+                Translator.from_line(source, False, prediction,
+                                     low_memory=True).translate())
+
+    def _subtest_low_memory_ll_fallback(self):
+        fallbacks = Translator.ll_fallbacks
+        source = 'enum E { A, B }; void foo(int x) { x = 1; } enum F { C'
+        model = Translator.from_line(source, False, low_memory=True).translate()
+        self.assertEqual(fallbacks + 1, Translator.ll_fallbacks)
+        self.assertEqual(['foo'], [name for name, _ in model.functions])
+
+    def _subtest_low_memory_passes(self, cache: pathlib.Path):
+        # the input is lexed again for every pass, no tokens are kept
+        source = 'void foo(int x) { bar(x); } void bar(int y) { y = 1; }'
+        expected = Translator.from_line(source, False).translate()
+        translator = Translator.from_line(source, False, low_memory=True,
+                                          cache=DiskCache(cache))
+        self.assertEqual({'foo': {'bar'}, 'bar': set()},
+                         translator.call_graph())
+        self.assertEqual(expected, translator.translate())
+        self.assertEqual({'foo': {'bar'}, 'bar': set()},
+                         translator.call_graph())
+        self.assertIsNone(translator._tokens)
+
+    def test_low_memory_mode(self):
+        self.at_subtest(self._subtest_same_model_in_low_memory_mode)
+        self.at_subtest(self._subtest_low_memory_ll_fallback)
+        with tempfile.TemporaryDirectory() as directory:
+            self.at_subtest(self._subtest_low_memory_passes,
+                            pathlib.Path(directory))
+
+    def _subtest_spooled_functions(self):
+        source = '''int foo(int x);
+void bar(int x) { x = foo(x); }
+void baz(int y) { bar(y); }'''
+        expected = Translator.from_line(source, False).translate()
+        with SpooledFunctions() as functions:
+            model = Translator.from_line(source, False).translate(functions)
+            self.assertEqual(expected.preamble, model.preamble)
+            self.assertEqual(expected.functions, list(model.functions))
+
+    def _subtest_spooled_functions_selection(self):
+        source = 'void bar(int x) { x = 1; } void baz(int y) { y = 2; }'
+        expected = dict(Translator.from_line(source, False).translate()
+                        .functions)
+        with SpooledFunctions(lambda name: name == 'baz') as functions:
+            model = Translator.from_line(source, False).translate(functions)
+            self.assertEqual([('bar', ''), ('baz', expected['baz'])],
+                             list(model.functions))
+
+    def _subtest_selected_bodies(self):
+        source = '''enum E { A, B };
+void bar(int x) { while (x) { x = x - 1; } }
+struct S { int x; };
+int foo(enum E e);
+int foo(enum E e) { if (e) { e = A; } else e = B; }
+void baz(int y) { y = 2; }'''
+        expected = Translator.from_line(source, False).translate()
+        model = Translator.from_line(source, False,
+                                     selected={'bar'}).translate()
+        self.assertEqual(expected.preamble, model.preamble)
+        self.assertEqual(expected.functions[0], model.functions[0])
+        self.assertEqual([
+            ('foo', "let foo(e: E, u'ret: channel, u'end: channel)"
+                    " = out(u'end, true)."),
+            ('baz', "let baz(y: nat, u'end: channel) = out(u'end, true).")
+        ], model.functions[1:])
+
+    def _subtest_unclosed_skipped_body(self):
+        model = Translator.from_line('void bar(int x) { if (x) {', False,
+                                     selected=set()).translate()
+        self.assertEqual(['bar'], [name for name, _ in model.functions])
+
+    def test_selected_bodies(self):
+        self.at_subtest(self._subtest_selected_bodies)
+        self.at_subtest(self._subtest_unclosed_skipped_body)
+
+    def test_spooled_functions(self):
+        self.at_subtest(self._subtest_spooled_functions)
+        self.at_subtest(self._subtest_spooled_functions_selection)
+
+    def test_functions_independence(self):
+        source = '''void foo(enum { A, B } e) { char *s; s = "a"; if (e) e = A; }
+void bar(enum { C, D } e) { char *s; s = "a"; while (e) { s = "b"; bar(e); }
+    switch (e) { case C: e = D; } }'''
+        edited = source.replace('if (e) e = A;', '''char *t; t = "c";
+    for (;e;) { if (e) { foo(e); } else e = B; } do e = A; while (e);''')
+        model = Translator.from_line(source, False).translate()
+        edited_model = Translator.from_line(edited, False).translate()
+        self.assertNotEqual(model.functions[0], edited_model.functions[0])
+        self.assertEqual(model.functions[1], edited_model.functions[1])
+        self.assertIn("u'bar_strlit0", model.functions[1][1])
+        self.assertIn("u'bar_anon_t0", model.functions[1][1])
+
+    def test_parallel_translation(self):
+        source = '''enum E { A, B };
+struct S { int x; };
+int foo(enum E e);
+void bar(int x) { while (x) { x = (bool) x; } baz(x); x = "s"; }
+struct T { bool b; };
+void baz(enum { C, D } y) { if (y > 1) y = foo(y) + (bool) y; else y = 0; }
+int qux(struct T t) { bool b; b = (int) true; }'''
+        for low_memory in (False, True):
+            expected = Translator.from_line(source,
+                                            low_memory=low_memory).translate()
+            self.assertEqual(expected, Translator.from_line(
+                source, low_memory=low_memory, workers=2).translate())
+        expected = Translator.from_line(source, selected={'baz'}).translate()
+        self.assertEqual(expected, Translator.from_line(
+            source, selected={'baz'}, workers=2).translate())
+
+    def _subtest_deep_nesting(self, low_memory: bool, workers: int):
+        # the parser recurses a few times per nesting level
+        limit = sys.getrecursionlimit()
+        source = 'void foo(int a) { ' + 'if (a) ' * 10000 + 'a = 1; }'
+        model = Translator.from_line(source, False,
+                                     low_memory=low_memory,
+                                     workers=workers).translate()
+        _, text = model.functions[0]
+        self.assertEqual(10000, text.count('if a then'))
+        self.assertEqual(limit, sys.getrecursionlimit())
+
+    def test_deep_nesting(self):
+        self.at_subtest(self._subtest_deep_nesting, False, 1)
+        self.at_subtest(self._subtest_deep_nesting, True, 2)
@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
-from typing import Callable
+from typing import Callable, Optional
 import unittest
 
 from model import Model
+from optimizations import Optimizations
 from translator import Translator
 
 
+MaybeOptimizations = Optional[Optimizations]
+
+
 class TranslatorCommonTestCase(unittest.TestCase):
+    # the optimizations sources are translated with, unless a check is given
+    # others
+    optimizations = Optimizations()
+
     def setUp(self):
         self._stress_identifiers = [ 'T', 'asdfadsfsdf', '____', 'Mtypes', '_',
             'A', 'asdfkljdsfn', '_tmp8', 'message', 'client', 'server', 'ASF',
@@ -41,10 +49,18 @@ class TranslatorCommonTestCase(unittest.TestCase):
         with self.subTest(subtest.__name__):
             subtest(*args)
 
-    def check_subtest_single(self, checker: Callable, subtest: Callable, *args):
+    def translate(self, source: str,
+                  optimizations: MaybeOptimizations = None) -> Model:
+        if optimizations is None:
+            optimizations = self.optimizations
+        return Translator.from_line(source, False,
+                                    optimizations=optimizations).translate()
+
+    def check_subtest_single(self, checker: Callable, subtest: Callable, *args,
+                             optimizations: MaybeOptimizations = None):
         with self.subTest(subtest.__name__):
             source, expected = subtest(*args)
-            model = Translator.from_line(source, False).translate()
+            model = self.translate(source, optimizations)
             self.maxDiff = None
             checker(expected, model)
 
@@ -52,8 +68,20 @@ class TranslatorCommonTestCase(unittest.TestCase):
         _, actual = model.functions[0]
         self.assertEqual(expected, actual)
 
-    def check_single_function_subtest(self, subtest: Callable, *args):
-        self.check_subtest_single(self.assert_single_function, subtest, *args)
+    def check_single_function_subtest(self, subtest: Callable, *args,
+                                      optimizations: MaybeOptimizations = None):
+        self.check_subtest_single(self.assert_single_function, subtest, *args,
+                                  optimizations=optimizations)
+
+    def assert_functions(self, expected: str, model: Model):
+        # the functions, macros included, in their order
+        self.assertEqual(expected,
+                         '\n'.join(text for _, text in model.functions))
+
+    def check_functions_subtest(self, subtest: Callable, *args,
+                                optimizations: MaybeOptimizations = None):
+        self.check_subtest_single(self.assert_functions, subtest, *args,
+                                  optimizations=optimizations)
 
     def assert_preamble(self, expected: str, model: Model):
         self.assertTrue(not model.functions)
@@ -62,14 +90,17 @@ class TranslatorCommonTestCase(unittest.TestCase):
     def check_preamble_subtest(self, subtest: Callable, *args):
         self.check_subtest_single(self.assert_preamble, subtest, *args)
 
-    def check_subtests(self, checker: Callable, subtest: Callable, *args):
+    def check_subtests(self, checker: Callable, subtest: Callable, *args,
+                       optimizations: MaybeOptimizations = None):
         with self.subTest(subtest.__name__):
             for source, expected in subtest(*args):
-                model = Translator.from_line(source, False).translate()
+                model = self.translate(source, optimizations)
                 checker(expected, model)
 
-    def check_single_function_subtests(self, subtest: Callable, *args):
-        self.check_subtests(self.assert_single_function, subtest, *args)
+    def check_single_function_subtests(self, subtest: Callable, *args,
+                                       optimizations: MaybeOptimizations = None):
+        self.check_subtests(self.assert_single_function, subtest, *args,
+                            optimizations=optimizations)
 
     def check_preamble_subtests(self, subtest: Callable, *args):
         self.check_subtests(self.assert_preamble, subtest, *args)
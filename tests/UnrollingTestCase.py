@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+from typing import Tuple
+
+from lut import LookUpTable
+from optimizations import Optimizations
+from tests.TranslatorCommonTestCase import TranslatorCommonTestCase
+
+
+class UnrollingTestCase(TranslatorCommonTestCase):
+    optimizations = Optimizations(unroll=2)
+
+    def _subtest_while(self) -> Tuple[str, str]:
+        source = 'void f(int a) { while (a > 0) { a = a - 1; } }'
+        expected = '''let f(a: nat, u'end: channel) = \
+(* loop unrolled, bound 1 *)
+let u'tvar0: bool = a > 0 in
+if u'tvar0 then
+let u'tvar1: nat = a - 1 in
+let a = u'tvar1 in
+out(u'end, true)
+else
+out(u'end, true).'''
+        return source, expected
+
+    def _subtest_do_while(self) -> Tuple[str, str]:
+        # the first iteration is always run, the copies bind temporaries of
+        # their own
+        source = 'void f(int a) { do { a = a - 1; } while (a > 0); }'
+        expected = '''let f(a: nat, u'end: channel) = \
+(* loop unrolled, bound 2 *)
+let u'tvar0: nat = a - 1 in
+let a = u'tvar0 in
+let u'tvar2: bool = a > 0 in
+if u'tvar2 then
+let u'tvar3: nat = a - 1 in
+let a = u'tvar3 in
+out(u'end, true)
+else
+out(u'end, true).'''
+        return source, expected
+
+    def _subtest_for(self) -> Tuple[str, str]:
+        source = 'void f(int a) { int i; for (i = 0; i < 2; i += 1) ' \
+            '{ a = a + i; } }'
+        expected = '''let f(a: nat, u'end: channel) = new i: nat;
+(* loop unrolled, bound 2 *)
+let i = 0 in
+let u'tvar0: bool = i < 2 in
+if u'tvar0 then
+let u'tvar2: nat = a + i in
+let a = u'tvar2 in
+let u'tvar1 = i + 1 in
+let i = u'tvar1 in
+let u'tvar3: bool = i < 2 in
+if u'tvar3 then
+let u'tvar4: nat = a + i in
+let a = u'tvar4 in
+let u'tvar5 = i + 1 in
+let i = u'tvar5 in
+out(u'end, true)
+else
+out(u'end, true)
+else
+out(u'end, true).'''
+        return source, expected
+
+    def test_loops(self):
+        self.check_single_function_subtest(self._subtest_while,
+                                           optimizations=Optimizations(
+                                               unroll=1))
+        self.check_single_function_subtest(self._subtest_do_while)
+        self.check_single_function_subtest(self._subtest_for)
+
+    def _subtest_consecutive_loops(self):
+        # the loops following one are shared by its copies, each is written
+        # once
+        model = self.translate('''void f(int a) {
+            while (a > 0) { a = a - 1; }
+            while (a < 5) { a = a + 2; }
+            while (a > 3) { a = a - 3; }
+        }''', Optimizations(unroll=3))
+        text = '\n'.join(text for _, text in model.functions)
+        self.assertIn("let u'f_cont0(", text)
+        self.assertEqual(3, text.count('(* loop unrolled, bound 3 *)'))
+
+    def _subtest_lut(self):
+        lut = LookUpTable.from_line('%U f 1\n%U g 0\n%U h x\n')
+        self.assertEqual({'f': 1, 'g': 0}, lut.unrolls())
+        source = '''void f(int a) { while (a > 0) { a = a - 1; } }
+            void g(int a) { while (a > 0) { a = a - 1; } }'''
+        model = self.translate(source, Optimizations(
+            unroll=2, unrolled=tuple(sorted(lut.unrolls().items()))))
+        text = '\n'.join(text for _, text in model.functions)
+        self.assertIn('(* loop unrolled, bound 1 *)', text)
+        self.assertIn("new u'while_cond", text)
+        self.assertNotIn('bound 2', text)
+
+    def test_consecutive_loops(self):
+        self.at_subtest(self._subtest_consecutive_loops)
+
+    def test_lut(self):
+        self.at_subtest(self._subtest_lut)
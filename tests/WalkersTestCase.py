@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import unittest
+
+import antlr4
+
+from libs.SubCListener import SubCListener
+from libs.SubCParser import SubCParser
+from translator import Translator
+from walker import DispatchWalker
+
+
+class EventsRecorder(SubCListener):
+    def __init__(self):
+        self.events = []
+
+    def enterIfStatement(self, ctx):
+        self.events.append(('enter', ctx))
+
+    def exitIfStatement(self, ctx):
+        self.events.append(('exit', ctx))
+
+    def exitAdditiveExpression(self, ctx):
+        self.events.append(('exit', ctx))
+
+
+class GenericEventsRecorder(EventsRecorder):
+    def enterEveryRule(self, ctx):
+        self.events.append(('enter every', ctx))
+
+    def exitEveryRule(self, ctx):
+        self.events.append(('exit every', ctx))
+
+    def visitTerminal(self, node):
+        self.events.append(('terminal', node))
+
+
+class WalkersTestCase(unittest.TestCase):
+    def setUp(self):
+        source = '''void foo(int a, int b)
+{
+    if (a) if (b) a = a + b + 1; else b = 2;
+    while (a > b) a = a - 1;
+}'''
+        self._tree = Translator(antlr4.InputStream(source))._parse()
+        return super().setUp()
+
+    def _check_same_events(self, listener_cls: type):
+        expected, actual = listener_cls(), listener_cls()
+        antlr4.ParseTreeWalker().walk(expected, self._tree)
+        DispatchWalker().walk(actual, self._tree)
+        self.assertTrue(expected.events)
+        self.assertEqual(expected.events, actual.events)
+
+    def _subtest_handlers_only(self):
+        self._check_same_events(EventsRecorder)
+        self.assertEqual(DispatchWalker.table(SubCListener), {})
+
+    def _subtest_generic_events(self):
+        self._check_same_events(GenericEventsRecorder)
+
+    def _subtest_deep_tree(self):
+        terms = 20000
+        source = 'void foo(int a) { a = %s; }' % ' + '.join(['a'] * terms)
+        tree = Translator(antlr4.InputStream(source))._parse()
+        listener = EventsRecorder()
+        DispatchWalker().walk(listener, tree)
+        self.assertEqual(terms - 1, len(listener.events))
+        # post-order: the innermost sum is exited first, the outermost last
+        _, innermost = listener.events[0]
+        _, outermost = listener.events[-1]
+        self.assertIsInstance(innermost.expression(0),
+                              SubCParser.BaseExpressionContext)
+        self.assertNotIsInstance(outermost.parentCtx,
+                                 SubCParser.AdditiveExpressionContext)
+
+    def test_dispatch_walker(self):
+        for subtest in (self._subtest_handlers_only,
+                        self._subtest_generic_events,
+                        self._subtest_deep_tree):
+            with self.subTest(subtest.__name__):
+                subtest()
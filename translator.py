@@ -1,19 +1,61 @@
 #!/usr/bin/env python3
 import pathlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Collection, Iterable, Iterator, \
+    MutableMapping, Optional, Tuple
 import antlr4
+from antlr4.ListTokenSource import ListTokenSource
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 
+import predictions
 from libs.SubCLexer import SubCLexer
 from libs.SubCParser import SubCParser
+from lexers import BodiesSkippingLexer, lexed, skip_bodies, top_level_items
+from callgraph import CallGraph, call_graph
 from listeners.SubC2PVListener import SubC2PVListener
 from auxilaries.globals import GLOBALS
 from model import Model
+from optimizations import Optimizations
+from cache import DiskCache, function_keys
+from deep import deeply
+from walker import DispatchWalker, release
 
 
 class Translator:
+    SLL_THEN_LL: str = predictions.SLL_THEN_LL
+    SLL: str = predictions.SLL
+    LL: str = predictions.LL
+    PREDICTIONS = predictions.PREDICTIONS
+
+    # how many times two-stage parsing had to re-parse with full LL
+    ll_fallbacks: int = 0
+
+    # selected: functions whose bodies are translated, all by default; the
+    # others are translated as if their bodies were empty
+    # cache: where translated functions are looked up and stored
+    # workers: how many processes translate function definitions
+    # optimizations: rewritings of the translated functions
     def __init__(self, stream: antlr4.InputStream,
-                 predefine_helpers: bool = True):
+                 predefine_helpers: bool = True,
+                 prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                 selected: Optional[Collection[str]] = None,
+                 cache: Optional[DiskCache] = None, workers: int = 1,
+                 optimizations: Optimizations = Optimizations()):
+        if prediction not in self.PREDICTIONS:
+            raise ValueError(f'Unknown prediction mode {prediction}.')
         self._stream = stream
         self._predefine_helpers = predefine_helpers
+        self._prediction = prediction
+        self._low_memory = low_memory
+        self._selected = selected
+        self._cache = cache
+        self._workers = workers
+        self._optimizations = optimizations
+        self._tokens: Optional[list[antlr4.Token]] = None
 
     def _preamble(self, listener: SubC2PVListener) -> str:
         _globals = []
@@ -23,32 +65,304 @@ class Translator:
         return '\n'.join(_globals)
 
     def _listener2model(self, listener: SubC2PVListener) -> Model:
-        return Model(self._preamble(listener),
-                     list(listener._functions.items()))
+        functions = listener._functions
+        return Model(self._preamble(listener), list(functions.items())
+                     if isinstance(functions, dict) else functions.items())
+
+    def _lexed(self) -> Iterable[antlr4.Token]:
+        # the whole input is lexed once, parsing reuses the tokens; in the
+        # low-memory mode it's lexed again for every pass over the tokens
+        # instead, so they are never all alive
+        if self._tokens is not None:
+            return self._tokens
+        if self._low_memory:
+            self._stream.reset()
+            return lexed(SubCLexer(self._stream))
+        self._tokens = list(lexed(SubCLexer(self._stream)))
+        return self._tokens
+
+    def call_graph(self) -> CallGraph:
+        return call_graph(self._lexed())
+
+    def select(self, selected: Optional[Collection[str]]):
+        self._selected = selected
+
+    def _parser(self, selected: Optional[Collection[str]] = None) \
+            -> SubCParser:
+        if self._tokens is not None:
+            tokens = self._tokens if selected is None \
+                else skip_bodies(self._tokens, selected.__contains__)
+            source = ListTokenSource(list(tokens))
+        else:
+            # the input may have been lexed by another pass already
+            self._stream.reset()
+            source = SubCLexer(self._stream) if selected is None \
+                else BodiesSkippingLexer(self._stream, selected.__contains__)
+        return SubCParser(antlr4.CommonTokenStream(source))
+
+    def _parse_rule(self, parser: SubCParser,
+                    rule: Callable[[], antlr4.ParserRuleContext]) \
+            -> antlr4.ParserRuleContext:
+        if self._prediction == self.LL:
+            return rule()
+
+        parser._interp.predictionMode = PredictionMode.SLL
+        if self._prediction == self.SLL:
+            return rule()
 
+        # stage 1: SLL prediction, give up on the first syntax error
+        start = parser.getTokenStream().index
+        parser._errHandler = BailErrorStrategy()
+        parser.removeErrorListeners()
+        try:
+            return rule()
+        except ParseCancellationException:
+            Translator.ll_fallbacks += 1
 
-    def translate(self) -> Model:
-        lexer = SubCLexer(self._stream)
-        token_stream = antlr4.CommonTokenStream(lexer)
-        parser = SubCParser(token_stream)
+        # stage 2: rewind and re-parse with full LL and the usual reporting
+        # (Parser.reset() would rewind to the very first token, which may
+        # already be released in the low-memory mode)
+        parser.getTokenStream().seek(start)
+        parser._ctx = None
+        parser._precedenceStack = [0]
+        parser._errHandler = DefaultErrorStrategy()
+        parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+        parser._interp.predictionMode = PredictionMode.LL
+        return rule()
 
-        root_node = parser.compilationUnit()
-        listener = SubC2PVListener()
-        walker = antlr4.ParseTreeWalker()
-        walker.walk(listener, root_node)
+    def _parse(self, selected: Optional[Collection[str]] = None) \
+            -> SubCParser.CompilationUnitContext:
+        parser = self._parser(selected)
+        return self._parse_rule(parser, parser.compilationUnit)
+
+    def _parse_definitions(self,
+                           selected: Optional[Collection[str]] = None) \
+            -> Iterator[SubCParser.DeclarationOrDefinitionContext]:
+        # parse top-level declarations and definitions one by one, so only
+        # the subtree being translated is alive
+        parser = self._parser(selected)
+        tokens = parser.getTokenStream()
+        released = 0
+        while tokens.LA(1) != antlr4.Token.EOF:
+            start = tokens.index
+            # tokens of the already translated definitions aren't needed
+            # anymore, only the last one could be looked back at
+            for i in range(released, start - 1):
+                tokens.tokens[i] = None
+            released = max(released, start - 1)
+            yield self._parse_rule(parser, parser.declarationOrDefinition)
+            if tokens.index == start:
+                # nothing was recognized, skip the offending token
+                parser.consume()
+
+    def translate(self,
+                  functions: Optional[MutableMapping[str, str]] = None) -> Model:
+        # functions: where to put translated functions instead of a dict
+        return deeply(self._translate, functions)
+
+    def _translate(self, functions: Optional[MutableMapping[str, str]]) \
+            -> Model:
+        if self._optimizations.havoc:
+            self._optimizations = self._optimizations.with_callers(
+                self.call_graph())
+        listener = SubC2PVListener(self._low_memory, self._optimizations)
+        if functions is not None:
+            listener._functions = functions
+        selected = self._selected
+        keys: dict[str, str] = {}
+        if self._cache is not None:
+            version = self._cache.version
+            if self._optimizations != Optimizations():
+                # translations differ by the optimizations
+                version += repr(self._optimizations)
+            keys = function_keys(self._lexed(), version)
+            for name, key in keys.items():
+                if selected is None or name in selected:
+                    text = self._cache.get(key)
+                    if text is not None:
+                        listener._cached[name] = text
+            listener._fresh = {}
+            # only the functions missed in the cache are walked
+            selected = {name for name in keys
+                        if (selected is None or name in selected)
+                        and name not in listener._cached}
+        walker = DispatchWalker()
+        fresh = listener._fresh
+        if self._workers > 1:
+            fresh = self._walk_parallel(listener, selected)
+        elif self._low_memory:
+            for definition in self._parse_definitions(selected):
+                walker.walk(listener, definition)
+                # don't keep the subtree alive while parsing the next one
+                release(definition)
+                del definition
+        else:
+            walker.walk(listener, self._parse(selected))
+        if self._cache is not None:
+            for name, text in fresh.items():
+                if name in selected:
+                    self._cache.put(keys[name], text)
         return self._listener2model(listener)
 
+    def _walk_parallel(self, listener: SubC2PVListener,
+                       selected: Optional[Collection[str]]) -> dict[str, str]:
+        # Selected function definitions are parsed and walked by the workers
+        # on top of the declarations, while everything is walked here with
+        # the bodies skipped. Then the results of the workers are put in the
+        # source order. Returns the translations to cache.
+        # the tokens are gone over twice
+        tokens = list(self._lexed())
+        definitions = [(name, item) for name, item in top_level_items(tokens)
+                       if name is not None
+                       and (selected is None or name in selected)]
+        skeleton = ' '.join(
+            token.text for token in skip_bodies(tokens, lambda _: False)
+            if token.channel == antlr4.Token.DEFAULT_CHANNEL
+            and token.type != antlr4.Token.EOF)
+        texts = [self._stream.getText(item[0].start, item[-1].stop)
+                 for _, item in definitions]
+
+        walker = DispatchWalker()
+        parts: list[Tuple[Optional[str], list[str], Functions]] = []
+        results: dict[str, list[DefinitionResult]] = {}
+        functions = listener._functions
+        listener._functions = {}
+        with ProcessPoolExecutor(self._workers, initializer=_start_worker,
+                                 initargs=(skeleton, self._prediction,
+                                           self._optimizations)) \
+                as pool:
+            translated = pool.map(_walk_definition, texts, chunksize=max(
+                1, len(texts) // (4 * self._workers)))
+            for definition in self._parse_definitions(set()):
+                count = len(listener._globals)
+                functions_count = len(listener._functions)
+                walker.walk(listener, definition)
+                function = definition.functionDefinition()
+                name = None if function is None else str(function.Identifier())
+                parts.append((name, listener._globals[count:],
+                              _added_functions(listener, functions_count,
+                                               name)))
+                release(definition)
+                del definition
+            for (name, _), result in zip(definitions, translated):
+                results.setdefault(name, []).append(result)
+
+        fresh: dict[str, str] = {}
+        casters: set[str] = set()
+        listener._globals = []
+        listener._functions = functions
+        for name, _globals, added in parts:
+            if results.get(name):
+                added, _globals, added_casters, cacheable = \
+                    results[name].pop(0)
+                if cacheable:
+                    fresh[name] = added[-1][1]
+                # a caster is declared by the first function using it only
+                _globals = [line for line in _globals
+                            if line not in added_casters or line not in casters]
+                casters.update(added_casters)
+            listener._globals.extend(_globals)
+            for fname, text in added:
+                functions[fname] = text
+        return fresh
+
 
     @classmethod
     def from_path(cls, implementation: pathlib.Path,
-                  predefine_helpers: bool = True):
+                  predefine_helpers: bool = True,
+                  prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                  selected: Optional[Collection[str]] = None,
+                  cache: Optional[DiskCache] = None, workers: int = 1,
+                  optimizations: Optimizations = Optimizations()):
         return cls(antlr4.FileStream(implementation, encoding='utf-8'),
-                   predefine_helpers)
+                   predefine_helpers, prediction, low_memory, selected, cache,
+                   workers, optimizations)
+
+    @classmethod
+    def from_stdin(cls, predefine_helpers: bool = True,
+                   prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                   selected: Optional[Collection[str]] = None,
+                   cache: Optional[DiskCache] = None, workers: int = 1,
+                   optimizations: Optimizations = Optimizations()):
+        return cls(antlr4.StdinStream(encoding='utf-8'), predefine_helpers,
+                   prediction, low_memory, selected, cache, workers,
+                   optimizations)
 
     @classmethod
-    def from_lines(cls, lines: list[str], predefine_helpers: bool = True):
-        return cls(antlr4.InputStream('\n'.join(lines)), predefine_helpers)
+    def from_lines(cls, lines: list[str], predefine_helpers: bool = True,
+                   prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                   selected: Optional[Collection[str]] = None,
+                   cache: Optional[DiskCache] = None, workers: int = 1,
+                   optimizations: Optimizations = Optimizations()):
+        return cls(antlr4.InputStream('\n'.join(lines)), predefine_helpers,
+                   prediction, low_memory, selected, cache, workers,
+                   optimizations)
 
     @classmethod
-    def from_line(cls, line: str, predefine_helpers: bool = True):
-        return cls(antlr4.InputStream(line), predefine_helpers)
+    def from_line(cls, line: str, predefine_helpers: bool = True,
+                  prediction: str = SLL_THEN_LL, low_memory: bool = False,
+                  selected: Optional[Collection[str]] = None,
+                  cache: Optional[DiskCache] = None, workers: int = 1,
+                  optimizations: Optimizations = Optimizations()):
+        return cls(antlr4.InputStream(line), predefine_helpers, prediction,
+                   low_memory, selected, cache, workers, optimizations)
+
+
+
+Functions = list[Tuple[str, str]]
+
+
+def _added_functions(listener: SubC2PVListener, count: int,
+                     name: Optional[str]) -> Functions:
+    # functions added to the dict of the listener since it had count of them,
+    # and the defined one, in the order they were put there
+    added = list(itertools.islice(reversed(listener._functions.items()),
+                                  len(listener._functions) - count))[::-1]
+    if name is not None and (not added or added[-1][0] != name):
+        added.append((name, listener._functions[name]))
+    return added
+
+
+# translated functions (the defined one is the last), global declarations,
+# the casters among them and whether the defined function can be cached
+DefinitionResult = Tuple[Functions, list[str], list[str], bool]
+
+# state of a worker process of the parallel translation
+_worker_listener: Optional[SubC2PVListener] = None
+_worker_prediction: str = Translator.SLL_THEN_LL
+
+
+def _start_worker(skeleton: str, prediction: str,
+                  optimizations: Optimizations):
+    # declarations are walked once, every definition is walked on top of them
+    global _worker_listener, _worker_prediction
+    _worker_listener = SubC2PVListener(True, optimizations)
+    _worker_prediction = prediction
+    translator = Translator.from_line(skeleton, False, prediction)
+    DispatchWalker().walk(_worker_listener, translator._parse())
+
+
+def _walk_definition(text: str) -> DefinitionResult:
+    return deeply(_translate_definition, text)
+
+
+def _translate_definition(text: str) -> DefinitionResult:
+    listener = _worker_listener
+    count, casters = len(listener._globals), dict(listener._casters)
+    functions_count = len(listener._functions)
+    listener._fresh = {}
+    translator = Translator.from_line(text, False, _worker_prediction)
+    parser = translator._parser()
+    definition = translator._parse_rule(parser, parser.declarationOrDefinition)
+    DispatchWalker().walk(listener, definition)
+    name = str(definition.functionDefinition().Identifier())
+    functions = _added_functions(listener, functions_count, name)
+    # leave the declarations only for the next definition
+    for fname, _ in functions[:-1]:
+        del listener._functions[fname]
+    _globals = listener._globals[count:]
+    del listener._globals[count:]
+    added_casters = [line for caster, line in listener._casters.items()
+                     if caster not in casters]
+    listener._casters = casters
+    return functions, _globals, added_casters, name in listener._fresh
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+from typing import Any, Callable, Optional
+
+import antlr4
+from antlr4.tree.Tree import ParseTreeListener, TerminalNodeImpl, \
+    ErrorNodeImpl
+
+from libs.SubCParser import SubCParser
+from libs.SubCListener import SubCListener
+
+
+Handler = Optional[Callable[[Any, Any], Any]]
+
+RULE_CONTEXTS = [cls for cls in vars(SubCParser).values()
+                 if isinstance(cls, type)
+                 and issubclass(cls, antlr4.ParserRuleContext)]
+
+
+def overridden(listener_cls: type, name: str, base: type) -> Handler:
+    handler = getattr(listener_cls, name, None)
+    if handler is None or handler is getattr(base, name, None):
+        return None
+    return handler
+
+
+def release(t: Any):
+    # Parse trees are full of parent <-> children reference cycles, so a
+    # dropped subtree lingers until the cyclic garbage collector runs. Cutting
+    # the children links lets reference counting free it right away.
+    stack = [t]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, 'children', None)
+        if children:
+            stack.extend(children)
+            node.children = None
+
+
+def enter_every_rule(listener: ParseTreeListener, ctx: Any):
+    listener.enterEveryRule(ctx)
+    ctx.enterRule(listener)
+
+
+def exit_every_rule(listener: ParseTreeListener, ctx: Any):
+    ctx.exitRule(listener)
+    listener.exitEveryRule(ctx)
+
+
+# Drop-in replacement for antlr4.ParseTreeWalker: instead of sending the
+# generic and the rule specific events to every node, it calls only handlers
+# overridden by the listener class, so nodes without handlers are just
+# descended. The handlers are looked up once per listener class, and the
+# tree is walked without recursion.
+class DispatchWalker:
+    NO_HANDLERS: tuple[Handler, Handler] = (None, None)
+
+    # listener class -> node class -> (enter, exit)
+    _tables: dict[type, dict[type, tuple[Handler, Handler]]] = {}
+
+    @classmethod
+    def table(cls, listener_cls: type) -> dict[type, tuple[Handler, Handler]]:
+        table = cls._tables.get(listener_cls)
+        if table is not None:
+            return table
+
+        table = {}
+        if overridden(listener_cls, 'enterEveryRule', ParseTreeListener) \
+                or overridden(listener_cls, 'exitEveryRule', ParseTreeListener):
+            # generic events need every rule, fall back to the usual order
+            for ctx_cls in RULE_CONTEXTS:
+                table[ctx_cls] = (enter_every_rule, exit_every_rule)
+        else:
+            for ctx_cls in RULE_CONTEXTS:
+                name = ctx_cls.__name__.removesuffix('Context')
+                handlers = (
+                    overridden(listener_cls, 'enter' + name, SubCListener),
+                    overridden(listener_cls, 'exit' + name, SubCListener))
+                if handlers != cls.NO_HANDLERS:
+                    table[ctx_cls] = handlers
+        for node_cls, name in ((TerminalNodeImpl, 'visitTerminal'),
+                               (ErrorNodeImpl, 'visitErrorNode')):
+            handler = overridden(listener_cls, name, ParseTreeListener)
+            if handler is not None:
+                table[node_cls] = (handler, None)
+        cls._tables[listener_cls] = table
+        return table
+
+    def walk(self, listener: ParseTreeListener, t: Any):
+        self._walk(listener, self.table(type(listener)), t)
+
+    def _walk(self, listener: ParseTreeListener,
+              table: dict[type, tuple[Handler, Handler]], t: Any):
+        # explicit stack of (exit handler, node, remaining children), so the
+        # depth of a tree is not bounded by the interpreter's recursion limit
+        get = table.get
+        enter, exit = get(type(t), self.NO_HANDLERS)
+        if enter is not None:
+            enter(listener, t)
+        stack = [(exit, t, iter(getattr(t, 'children', None) or ()))]
+        while stack:
+            exit, node, children = stack[-1]
+            for child in children:
+                enter, child_exit = get(type(child), self.NO_HANDLERS)
+                if enter is not None:
+                    enter(listener, child)
+                # terminal nodes have no children at all
+                grandchildren = getattr(child, 'children', None)
+                if grandchildren:
+                    stack.append((child_exit, child, iter(grandchildren)))
+                    break
+                if child_exit is not None:
+                    child_exit(listener, child)
+            else:
+                stack.pop()
+                if exit is not None:
+                    exit(listener, node)